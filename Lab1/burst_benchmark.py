@@ -0,0 +1,45 @@
+from main import SelectiveRepeat, GoBackN, print_table
+from simulation import simulate, SimulatedSender, SimulatedSlidingSender
+from impairments import GilbertElliottLoss
+
+
+def main():
+    data_size = 1000
+    window = 8
+    timeout_ns = 5000000
+    time_to_pass_ns = 1000000
+    seed = 0
+
+    # the same mean loss either independent per message or in bursts of mean length burst_length
+    loss_probs = [0.05, 0.1, 0.2, 0.3]
+    burst_lengths = [1, 2, 4, 8, 16]
+    columns = ['bernoulli'] + burst_lengths
+    senders = [('', SimulatedSender), (' sliding', SimulatedSlidingSender)]
+
+    for policy in [SelectiveRepeat, GoBackN]:
+        for suffix, sender_type in senders:
+            name = policy.name() + suffix
+            resultsK = []
+            goodput = []
+            resultsTimeouts = []
+            for i, loss_prob in enumerate(loss_probs):
+                resultsK.append([])
+                goodput.append([])
+                resultsTimeouts.append([])
+                cells = [(loss_prob, None)]
+                for burst_length in burst_lengths:
+                    bad_to_good = 1.0 / burst_length
+                    cells.append((0.0, [GilbertElliottLoss(loss_prob * bad_to_good / (1.0 - loss_prob), bad_to_good)]))
+                for bernoulli_loss, impairments in cells:
+                    result = simulate(data_size, window, timeout_ns, policy, bernoulli_loss, time_to_pass_ns, seed=seed, sender_type=sender_type, impairments=impairments)
+                    resultsK[i].append(data_size / result.message_count)
+                    goodput[i].append(data_size / (result.time_ns / 1000000000))
+                    resultsTimeouts[i].append(result.timeouts)
+
+            print_table(name + ' K', columns, loss_probs, resultsK)
+            print_table(name + ' goodput', columns, loss_probs, goodput)
+            print_table(name + ' timeouts', columns, loss_probs, resultsTimeouts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import time
+from multiprocessing import Process, Event
+from impairments import RandomBlock
+from main import OneWayChanel, ChanelTransport, Message, MessageType, repeat_until
+
+
+def produce(put_batch, message_count : int, batch_size : int) -> None:
+    for start in range(0, message_count, batch_size):
+        put_batch([Message(MessageType.DATA, pos) for pos in range(start, min(start + batch_size, message_count))])
+
+
+def measure(message_count : int, batch_size : int, transport : ChanelTransport) -> float:
+    chanelStoped = Event()
+    chanel = OneWayChanel(0, 0.0, RandomBlock(), transport)
+    producerThread = Process(target=produce, args=(chanel.put_batch, message_count, batch_size))
+    chanelThread = Process(target=repeat_until, args=(chanel.process, chanelStoped))
+
+    start_time = time.perf_counter()
+    chanelThread.start()
+    producerThread.start()
+    received = 0
+    while received < message_count:
+        received += len(chanel.get_batch())
+    elapsed = time.perf_counter() - start_time
+
+    chanelStoped.set()
+    producerThread.join()
+    chanelThread.join()
+    chanel.close()
+    return message_count / elapsed
+
+
+def main():
+    message_count = 100000
+    batch_sizes = [1, 4, 16, 64, 256, 1024]
+
+    print('batch size', *[transport.name + ' messages/s' for transport in ChanelTransport], sep = ';')
+    for batch_size in batch_sizes:
+        print(batch_size, *[measure(message_count, batch_size, transport) for transport in ChanelTransport], sep = ';')
+
+
+if __name__ == '__main__':
+    main()
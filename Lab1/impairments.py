@@ -0,0 +1,140 @@
+# Lab1 and Lab2 keep the same copy of this module, every lab runs on its own from its folder and the
+# impairments are pickled to its processes by this module name. A change goes into both, test_impairments checks it
+import numpy as np
+
+
+class RandomBlock:
+    # hands out uniform [0, 1) numbers from a block generated in one numpy call
+    def __init__(self, rng = None, size : int = 4096) -> None:
+        self.rng = rng if not rng is None else np.random.default_rng()
+        self.size = size
+        self.refill()
+
+    def refill(self) -> None:
+        self.block = self.rng.random(self.size).tolist()
+        self.pos = 0
+
+    def __call__(self) -> float:
+        if self.pos >= self.size:
+            self.refill()
+        value = self.block[self.pos]
+        self.pos += 1
+        return value
+
+
+# every impairment takes the deliveries made of one message so far, a list of [deliver_time_ns, message],
+# and returns the deliveries that are left, port tells apart the outputs of a chanel with several of them
+class Impairment:
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        return deliveries
+
+class BernoulliLoss(Impairment):
+    def __init__(self, loss_probability) -> None:
+        self.loss_probability = loss_probability
+        self.dropped = 0
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        if rand() > self.loss_probability:
+            return deliveries
+        self.dropped += len(deliveries)
+        return []
+
+class GilbertElliottLoss(Impairment):
+    # two state markov chain, losses come in bursts while the link stays in the bad state
+    def __init__(self, good_to_bad, bad_to_good, good_loss = 0.0, bad_loss = 1.0) -> None:
+        self.good_to_bad = good_to_bad
+        self.bad_to_good = bad_to_good
+        self.good_loss = good_loss
+        self.bad_loss = bad_loss
+        self.bad = {}
+        self.dropped = 0
+
+    def mean_loss(self) -> float:
+        bad_share = self.good_to_bad / (self.good_to_bad + self.bad_to_good)
+        return bad_share * self.bad_loss + (1 - bad_share) * self.good_loss
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        bad = self.bad.get(port, False)
+        bad = rand() >= self.bad_to_good if bad else rand() < self.good_to_bad
+        self.bad[port] = bad
+        if rand() >= (self.bad_loss if bad else self.good_loss):
+            return deliveries
+        self.dropped += len(deliveries)
+        return []
+
+class Bandwidth(Impairment):
+    # the link sends one message at a time, the next one starts once the previous is serialized
+    def __init__(self, bandwidth_bps : int, message_size : int = 64) -> None:
+        self.serialization_ns = message_size * 8 * 1000000000 // bandwidth_bps
+        self.link_free_time_ns = {}
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        for delivery in deliveries:
+            delivery[0] = max(delivery[0], self.link_free_time_ns.get(port, 0)) + self.serialization_ns
+            self.link_free_time_ns[port] = delivery[0]
+        return deliveries
+
+class Jitter(Impairment):
+    def __init__(self, jitter_ns : int) -> None:
+        self.jitter_ns = jitter_ns
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        for delivery in deliveries:
+            delivery[0] += int(rand() * self.jitter_ns)
+        return deliveries
+
+class Reordering(Impairment):
+    # holds a message back so the ones sent after it overtake it
+    def __init__(self, reorder_probability, delay_ns : int) -> None:
+        self.reorder_probability = reorder_probability
+        self.delay_ns = delay_ns
+        self.reordered = 0
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        if rand() < self.reorder_probability:
+            self.reordered += len(deliveries)
+            for delivery in deliveries:
+                delivery[0] += self.delay_ns
+        return deliveries
+
+class Duplication(Impairment):
+    def __init__(self, duplicate_probability, delay_ns : int = 0) -> None:
+        self.duplicate_probability = duplicate_probability
+        self.delay_ns = delay_ns
+        self.duplicated = 0
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        if rand() >= self.duplicate_probability:
+            return deliveries
+        self.duplicated += len(deliveries)
+        return deliveries + [[deliver_time_ns + self.delay_ns, message] for deliver_time_ns, message in deliveries]
+
+class Corruption(Impairment):
+    # messages carry no checksum, a corrupted one is counted and dropped as the receiver would discard it
+    def __init__(self, corrupt_probability) -> None:
+        self.corrupt_probability = corrupt_probability
+        self.corrupted = 0
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        if rand() >= self.corrupt_probability:
+            return deliveries
+        self.corrupted += len(deliveries)
+        return []
+
+
+def make_impairments(loss_probability = 0.0, jitter_ns : int = 0, bandwidth_bps : int = 0, message_size : int = 64) -> list[Impairment]:
+    impairments = [BernoulliLoss(loss_probability)]
+    if bandwidth_bps > 0:
+        impairments.append(Bandwidth(bandwidth_bps, message_size))
+    if jitter_ns > 0:
+        impairments.append(Jitter(jitter_ns))
+    return impairments
+
+
+def apply_impairments(impairments : list[Impairment], message, now_ns : int, rand, port : int = 0) -> list:
+    deliveries = [[now_ns, message]]
+    for impairment in impairments:
+        deliveries = impairment.apply(deliveries, rand, port)
+        if len(deliveries) == 0:
+            break
+    return deliveries
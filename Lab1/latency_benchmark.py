@@ -0,0 +1,84 @@
+import time
+import resource
+import numpy as np
+from multiprocessing import Process, Event
+from queue import Empty
+from impairments import RandomBlock
+from main import OneWayChanel, Message, MessageType, Receiver, SelectiveRepeat, SlidingSender, repeat_until, run_cell, wait_message, CHANEL_IDLE_WAIT_NS
+
+
+def cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def ping(ping_count : int, event_driven : bool):
+    # one message at a time through both chanels, the receiver answers each with a conformation
+    stop = Event()
+    forwardChanel = OneWayChanel(0, 0.0, RandomBlock())
+    backwardChanel = OneWayChanel(0, 0.0, RandomBlock())
+    receiver = Receiver(False, event_driven)
+    threads = [Process(target=receiver.run, args=(backwardChanel.put_batch, forwardChanel.get, stop)),
+               Process(target=repeat_until, args=(forwardChanel.process, stop)),
+               Process(target=repeat_until, args=(backwardChanel.process, stop))]
+
+    cpu_start = cpu_seconds()
+    for thread in threads:
+        thread.start()
+    round_trips = []
+    for index in range(ping_count):
+        start_time_ns = time.time_ns()
+        forwardChanel.put(Message(MessageType.DATA, index))
+        while True:
+            try:
+                if wait_message(backwardChanel.get, event_driven, CHANEL_IDLE_WAIT_NS).index == index:
+                    break
+            except Empty:
+                pass
+        round_trips.append(time.time_ns() - start_time_ns)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    forwardChanel.close()
+    backwardChanel.close()
+    return np.array(round_trips) / 1000000, cpu_seconds() - cpu_start
+
+
+def idle_cpu(idle_s : float, event_driven : bool) -> float:
+    stop = Event()
+    forwardChanel = OneWayChanel(0, 0.0, RandomBlock())
+    backwardChanel = OneWayChanel(0, 0.0, RandomBlock())
+    receiver = Receiver(False, event_driven)
+    threads = [Process(target=receiver.run, args=(backwardChanel.put_batch, forwardChanel.get, stop)),
+               Process(target=repeat_until, args=(forwardChanel.process, stop)),
+               Process(target=repeat_until, args=(backwardChanel.process, stop))]
+
+    cpu_start = cpu_seconds()
+    for thread in threads:
+        thread.start()
+    time.sleep(idle_s)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return (cpu_seconds() - cpu_start) / idle_s
+
+
+def main():
+    ping_count = 500
+    idle_s = 2.0
+    data_size = 1000
+    window = 8
+    timeout_ns = 5000000
+    loss_prob = 0.1
+
+    print('mode', 'rtt mean ms', 'rtt p50 ms', 'rtt p99 ms', 'cpu s per ping', 'idle cpu share', 'cell K', 'cell s', sep = ';')
+    for name, event_driven in [('spin', False), ('event driven', True)]:
+        round_trips, cpu = ping(ping_count, event_driven)
+        idle = idle_cpu(idle_s, event_driven)
+        k, elapsed = run_cell(SelectiveRepeat, loss_prob, window, data_size, timeout_ns, SlidingSender, event_driven=event_driven)
+        print(name, round_trips.mean(), np.percentile(round_trips, 50), np.percentile(round_trips, 99), cpu / ping_count, idle, k, elapsed, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
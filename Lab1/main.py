@@ -1,11 +1,17 @@
-import numpy as np
+import abc
 import enum
+import functools
 import time
-from multiprocessing import Process, Event, Queue, Value
-from queue import Empty
-import matplotlib.pyplot as plt
+from multiprocessing import Process, Event, Queue, Value, shared_memory
+from queue import Empty, Full
+from collections import deque
+import heapq
+from array import array
 import matplotlib
 import ctypes
+import pickle
+import struct
+from impairments import RandomBlock, make_impairments, apply_impairments
 
 matplotlib.use('TkAgg')
 
@@ -15,73 +21,290 @@ class MessageState(enum.Enum):
     RECEIVED = enum.auto()
     CONFIRMED = enum.auto()
 
+MESSAGE_STATES = {state.value: state for state in MessageState}
+
 class MessageType(enum.Enum):
     DATA = enum.auto()
     CONFORMATION = enum.auto()
     END = enum.auto()
+    CUMULATIVE_CONFORMATION = enum.auto()
+
+MESSAGE_TYPES = {type.value: type for type in MessageType}
 
 class Message:
+    __slots__ = ('type', 'index', 'payload')
+
     def __init__(self, type : MessageType, index : int, payload = None) -> None:
         self.type = type
         self.index = index
         self.payload = payload
 
+    def __reduce__(self):
+        return (Message, (self.type, self.index, self.payload))
+
 class FlyingMessage:
+    __slots__ = ('message', 'start_time_ns')
+
     def __init__(self, message : Message, start_time_ns : int) -> None:
         self.message = message
         self.start_time_ns = start_time_ns
 
+    def __reduce__(self):
+        return (FlyingMessage, (self.message, self.start_time_ns))
+
+MESSAGE_RECORD = struct.Struct('<Bq')
+
+def encode_message(message : Message) -> bytes:
+    record = MESSAGE_RECORD.pack(message.type.value, message.index)
+    if message.payload is None:
+        return record
+    return record + pickle.dumps(message.payload, pickle.HIGHEST_PROTOCOL)
+
+def decode_message(record) -> Message:
+    type, index = MESSAGE_RECORD.unpack_from(record)
+    payload = pickle.loads(record[MESSAGE_RECORD.size:]) if len(record) > MESSAGE_RECORD.size else None
+    return Message(MESSAGE_TYPES[type], index, payload)
+
+class ChanelTransport(enum.Enum):
+    QUEUE = enum.auto()
+    SHARED_MEMORY = enum.auto()
+
+class RingBuffer:
+    # single producer / single consumer ring of fixed size records in shared memory,
+    # the producer only writes head and the consumer only writes tail, so no lock is needed
+    RECORD_HEADER = struct.Struct('I')
+    # counters are read and written through a 'q' view, struct.pack_into zero fills first and tears them
+    HEAD = 0
+    TAIL = 8
+    DATA_OFFSET = 128
+    # an empty ring is polled with yields first and then with short sleeps, there is no way to be woken up
+    SPIN_POLLS = 100
+    POLL_INTERVAL = 0.00005
+
+    def __init__(self, capacity : int = 1024, record_size : int = 128, lock = None, encode = None, decode = None) -> None:
+        self.capacity = capacity
+        self.record_size = record_size
+        self.lock = lock
+        self.encode = encode if not encode is None else functools.partial(pickle.dumps, protocol=pickle.HIGHEST_PROTOCOL)
+        self.decode = decode if not decode is None else pickle.loads
+        self.memory = shared_memory.SharedMemory(create=True, size=RingBuffer.DATA_OFFSET + capacity * record_size)
+        self.counters = self.memory.buf[:RingBuffer.DATA_OFFSET].cast('q')
+        self.counters[RingBuffer.HEAD] = 0
+        self.counters[RingBuffer.TAIL] = 0
+
+    def __getstate__(self) -> dict:
+        # a process started by spawn or forkserver gets the name of the shared memory and attaches to it again
+        return {'name': self.memory.name, 'capacity': self.capacity, 'record_size': self.record_size, 'lock': self.lock, 'encode': self.encode, 'decode': self.decode}
+
+    def __setstate__(self, state : dict) -> None:
+        self.capacity = state['capacity']
+        self.record_size = state['record_size']
+        self.lock = state['lock']
+        self.encode = state['encode']
+        self.decode = state['decode']
+        self.memory = shared_memory.SharedMemory(name=state['name'])
+        self.counters = self.memory.buf[:RingBuffer.DATA_OFFSET].cast('q')
+
+    def __del__(self) -> None:
+        # the shared memory can not be closed while the view is there, an attached process never calls close
+        self.counters.release()
+
+    def put(self, messages : list, block=True) -> None:
+        if not self.lock is None:
+            with self.lock:
+                self.put_records(messages, block)
+        else:
+            self.put_records(messages, block)
+
+    def put_records(self, messages : list, block=True) -> None:
+        buf = self.memory.buf
+        counters = self.counters
+        head = counters[RingBuffer.HEAD]
+        tail = counters[RingBuffer.TAIL]
+        if not block and head + len(messages) - tail > self.capacity:
+            raise Full
+        for message in messages:
+            record = self.encode(message)
+            if len(record) > self.record_size - RingBuffer.RECORD_HEADER.size:
+                raise ValueError(f"Message does not fit into a {self.record_size} byte record")
+            while head - tail >= self.capacity:
+                counters[RingBuffer.HEAD] = head
+                time.sleep(0)
+                tail = counters[RingBuffer.TAIL]
+            offset = RingBuffer.DATA_OFFSET + (head % self.capacity) * self.record_size
+            RingBuffer.RECORD_HEADER.pack_into(buf, offset, len(record))
+            start = offset + RingBuffer.RECORD_HEADER.size
+            buf[start:start + len(record)] = record
+            head += 1
+        # records are written before head moves past them
+        counters[RingBuffer.HEAD] = head
+
+    def get(self, block=True, timeout = None) -> list:
+        buf = self.memory.buf
+        counters = self.counters
+        tail = counters[RingBuffer.TAIL]
+        head = counters[RingBuffer.HEAD]
+        deadline = None if timeout is None else time.time() + timeout
+        polls = 0
+        while head == tail:
+            if not block or (not deadline is None and time.time() >= deadline):
+                raise Empty
+            time.sleep(0 if polls < RingBuffer.SPIN_POLLS else RingBuffer.POLL_INTERVAL)
+            polls += 1
+            head = counters[RingBuffer.HEAD]
+        messages = []
+        for pos in range(tail, head):
+            offset = RingBuffer.DATA_OFFSET + (pos % self.capacity) * self.record_size
+            length = RingBuffer.RECORD_HEADER.unpack_from(buf, offset)[0]
+            start = offset + RingBuffer.RECORD_HEADER.size
+            messages.append(self.decode(buf[start:start + length]))
+        counters[RingBuffer.TAIL] = head
+        return messages
+
+    def get_nowait(self) -> list:
+        return self.get(False)
+
+    def close(self) -> None:
+        self.counters.release()
+        self.memory.close()
+        self.memory.unlink()
+
+def make_transport(transport : ChanelTransport, capacity : int, record_size : int, lock = None, encode = None, decode = None):
+    if transport == ChanelTransport.SHARED_MEMORY:
+        return RingBuffer(capacity, record_size, lock, encode, decode)
+    return Queue()
+
+CHANEL_IDLE_WAIT_NS = 10000000
+
 class OneWayChanel:
-    def __init__(self, time_to_pass_ns : int, loss_probability, rand) -> None:
-        self.input_queue = Queue()
-        self.flying_queue = Queue()
-        self.output_queue = Queue()
+    def __init__(self, time_to_pass_ns : int, loss_probability, rand, transport : ChanelTransport = ChanelTransport.QUEUE, capacity : int = 1024, record_size : int = 128, jitter_ns : int = 0, reorder : bool = True, bandwidth_bps : int = 0, message_size : int = 64, impairments : list = None) -> None:
+        # every queue item is a list of messages, so one pickle and one pipe write carry a whole batch
+        self.transport = transport
+        self.input_queue = make_transport(transport, capacity, record_size, encode=encode_message, decode=decode_message)
+        self.output_queue = make_transport(transport, capacity, record_size, encode=encode_message, decode=decode_message)
+        # min heap of (deliver_time_ns, sequence, message), the sequence keeps equal times in fifo order
+        self.flying_messages = []
+        self.flying_count = 0
+        self.received_messages = deque()
         self.rand = rand
         self.time_to_pass_ns = time_to_pass_ns
-        self.loss_probability = loss_probability
-        self.flying_message = None
-        self.put = self.input_queue.put
-        self.get = self.output_queue.get
+        self.impairments = make_impairments(loss_probability, jitter_ns, bandwidth_bps, message_size) + (impairments if not impairments is None else [])
+        self.reorder = reorder
+        self.last_deliver_time_ns = 0
+
+    def put(self, message : Message, block=True) -> None:
+        self.input_queue.put([message], block)
+
+    def put_batch(self, messages : list[Message], block=True) -> None:
+        if len(messages) > 0:
+            self.input_queue.put(messages, block)
+
+    def get(self, block=True, timeout = None) -> Message:
+        if len(self.received_messages) == 0:
+            self.received_messages.extend(self.output_queue.get(block, timeout))
+        return self.received_messages.popleft()
+
+    def get_batch(self, block=True, timeout = None) -> list[Message]:
+        if len(self.received_messages) == 0:
+            return self.output_queue.get(block, timeout)
+        messages = list(self.received_messages)
+        self.received_messages.clear()
+        return messages
+
+    def schedule(self, messages : list[Message]) -> None:
+        now = time.time_ns()
+        for message in messages:
+            for start_time_ns, message in apply_impairments(self.impairments, message, now, self.rand):
+                deliver_time_ns = start_time_ns + self.time_to_pass_ns
+                if not self.reorder:
+                    deliver_time_ns = max(deliver_time_ns, self.last_deliver_time_ns)
+                    self.last_deliver_time_ns = deliver_time_ns
+                heapq.heappush(self.flying_messages, (deliver_time_ns, self.flying_count, message))
+                self.flying_count += 1
+
+    def wait_time(self) -> float:
+        if len(self.flying_messages) == 0:
+            return CHANEL_IDLE_WAIT_NS / 1000000000
+        return max(0, self.flying_messages[0][0] - time.time_ns()) / 1000000000
 
     def process_input(self) -> None:
+        # sleeps until the next delivery is due or new messages come in
         try:
+            new_messages = self.input_queue.get(True, self.wait_time())
             while True:
-                new_message = self.input_queue.get_nowait()
-                self.flying_queue.put(FlyingMessage(new_message, time.time_ns()))
+                self.schedule(new_messages)
+                new_messages = self.input_queue.get_nowait()
         except Empty:
             pass
 
     def process_output(self) -> None:
-        while True:
-            try:
-                if self.flying_message is None:
-                    self.flying_message = self.flying_queue.get_nowait()
-            except Empty:
-                break
-            if time.time_ns() < self.flying_message.start_time_ns + self.time_to_pass_ns:
-                break
-            if self.rand() > self.loss_probability:
-                self.output_queue.put(self.flying_message.message)
-            self.flying_message = None
+        delivered = []
+        now = time.time_ns()
+        while len(self.flying_messages) > 0 and now >= self.flying_messages[0][0]:
+            deliver_time_ns, count, message = heapq.heappop(self.flying_messages)
+            delivered.append(message)
+        if len(delivered) > 0:
+            self.output_queue.put(delivered)
     
     def process(self) -> None:
         self.process_input()
         self.process_output()
 
+    def close(self) -> None:
+        if self.transport == ChanelTransport.SHARED_MEMORY:
+            self.input_queue.close()
+            self.output_queue.close()
+
 def repeat_until(work, stop) -> None:
     while(not stop.is_set()):
         work()
 
+def wait_message(get, event_driven : bool, timeout_ns):
+    # event driven callers block until a message comes or timeout_ns passes, the others only peek
+    if event_driven:
+        return get(True, max(timeout_ns, 0) / 1000000000)
+    return get(False)
+
+
+class MessageWindow:
+    def __init__(self, data_size : int, window_size : int) -> None:
+        self.data_size = data_size
+        self.size = window_size
+        self.start = 0
+        self.states = bytearray([MessageState.PENDING.value]) * window_size
+
+    def __len__(self) -> int:
+        return self.data_size
+
+    def __getitem__(self, pos : int) -> MessageState:
+        if pos < self.start:
+            return MessageState.CONFIRMED
+        if pos >= self.start + self.size:
+            return MessageState.PENDING
+        return MESSAGE_STATES[self.states[pos % self.size]]
+
+    def __setitem__(self, pos : int, state : MessageState) -> None:
+        self.states[pos % self.size] = state.value
+
+    def slot(self, pos : int) -> int:
+        return pos % self.size
+
+    def end(self) -> int:
+        return min(self.start + self.size, self.data_size)
+
+    def advance(self) -> int:
+        while self.start < self.data_size and self.states[self.start % self.size] == MessageState.CONFIRMED.value:
+            self.states[self.start % self.size] = MessageState.PENDING.value
+            self.start += 1
+        return self.start
+
 
 class GoBackN:
     def name():
         return 'GoBackN'
 
-    def move_window(prev_pos, message_states) -> int:
-        for pos in range(prev_pos, len(message_states)):
-            if message_states[pos] != MessageState.CONFIRMED:
-                return pos
-        return len(message_states)
+    def move_window(window : MessageWindow) -> int:
+        return window.advance()
             
     def need_send(state : MessageState) -> bool:
         return True
@@ -90,84 +313,336 @@ class SelectiveRepeat:
     def name():
         return 'SelectiveRepeat'
     
-    def move_window(prev_pos, message_states) -> int:
-        for pos in range(prev_pos, len(message_states)):
-            if message_states[pos] != MessageState.CONFIRMED:
-                return pos
-        return len(message_states)
+    def move_window(window : MessageWindow) -> int:
+        return window.advance()
             
     def need_send(state : MessageState) -> bool:
         return state != MessageState.CONFIRMED
 
+class TimeoutPolicy(abc.ABC):
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    MAX_BACKOFF = 16
+
+    def __init__(self) -> None:
+        self.srtt_ns = None
+        self.rttvar_ns = None
+        self.samples = 0
+        self.backoffs = 0
+        self.rto_count = 0
+        self.rto_sum = 0
+        self.rto_min = None
+        self.rto_max = None
+        # the RTO is backed off for the whole sender as in RFC 6298, the next message keeps the doubled RTO
+        # until a new sample or, once there is an estimate, an ACK for new data
+        self.backoff = 0
+
+    @abc.abstractmethod
+    def current(self, backoff : int) -> int:
+        pass
+
+    def timeout(self) -> int:
+        rto = self.current(self.backoff)
+        self.rto_count += 1
+        self.rto_sum += rto
+        self.rto_min = rto if self.rto_min is None else min(self.rto_min, rto)
+        self.rto_max = rto if self.rto_max is None else max(self.rto_max, rto)
+        return rto
+
+    def on_sample(self, rtt_ns : int) -> None:
+        self.samples += 1
+        if self.srtt_ns is None:
+            self.srtt_ns = rtt_ns
+            self.rttvar_ns = rtt_ns / 2
+        else:
+            self.rttvar_ns = (1 - self.BETA) * self.rttvar_ns + self.BETA * abs(self.srtt_ns - rtt_ns)
+            self.srtt_ns = (1 - self.ALPHA) * self.srtt_ns + self.ALPHA * rtt_ns
+        self.backoff = 0
+
+    def on_progress(self) -> None:
+        # with an estimate the timeouts come from loss, without one the RTO may still be too short
+        if not self.srtt_ns is None:
+            self.backoff = 0
+
+    def on_timeout(self, armed_backoff : int = None) -> None:
+        # a timer armed before the last back off does not back off again, timers that run out together double the RTO once
+        self.backoffs += 1
+        if armed_backoff is None or armed_backoff >= self.backoff:
+            self.backoff = min(self.backoff + 1, self.MAX_BACKOFF)
+
+    def stats(self) -> list:
+        return [self.samples, self.backoffs, self.rto_sum / max(self.rto_count, 1), self.rto_min or 0, self.rto_max or 0, self.srtt_ns or 0]
+
+RTO_STATS_SIZE = 6
+
+class FixedTimeout(TimeoutPolicy):
+    def __init__(self, timeout_ns : int) -> None:
+        super().__init__()
+        # the timers are kept in integer ns arrays, a timeout like 0.01 * 1000000000 is a float
+        self.timeout_ns = int(timeout_ns)
+
+    def name(self):
+        return 'Fixed'
+
+    def current(self, backoff : int) -> int:
+        return self.timeout_ns
+
+class AdaptiveTimeout(TimeoutPolicy):
+    K = 4
+
+    def __init__(self, initial_timeout_ns : int, min_timeout_ns : int = 100000, max_timeout_ns : int = 1000000000, granularity_ns : int = 100000) -> None:
+        super().__init__()
+        self.initial_timeout_ns = initial_timeout_ns
+        self.min_timeout_ns = min_timeout_ns
+        self.max_timeout_ns = max_timeout_ns
+        self.granularity_ns = granularity_ns
+
+    def name(self):
+        return 'Adaptive'
+
+    def current(self, backoff : int) -> int:
+        if self.srtt_ns is None:
+            rto = self.initial_timeout_ns
+        else:
+            rto = max(self.min_timeout_ns, self.srtt_ns + max(self.granularity_ns, self.K * self.rttvar_ns))
+        return int(min(self.max_timeout_ns, rto * (1 << min(backoff, self.MAX_BACKOFF))))
+
+def make_timeout_policy(timeout) -> TimeoutPolicy:
+    if isinstance(timeout, TimeoutPolicy):
+        return timeout
+    return FixedTimeout(timeout)
+
 class Sender:
-    def __init__(self, timeouts, message_count) -> None:
+    def __init__(self, timeouts, message_count, rto_stats = None, event_driven : bool = False) -> None:
         self.timeouts = timeouts
         self.message_count = message_count
+        self.rto_stats = rto_stats
+        self.event_driven = event_driven
 
     def run(self, data_size : int, window_size : int, timeout_ns : int, put, get, repeat_policy, senderStoped) -> None:
-        message_states = [MessageState.PENDING for i in range(data_size)]
+        timeout_policy = make_timeout_policy(timeout_ns)
+        window = MessageWindow(data_size, window_size)
+        send_times = array('q', [-1]) * window_size
         timeouts = 0
         message_count = 0
-        window_start = 0
         while True:
-            window_start = repeat_policy.move_window(window_start, message_states)
-            window_end = min(window_start + window_size, data_size)
+            window_start = repeat_policy.move_window(window)
+            window_end = window.end()
 
             if window_start >= data_size:
                 break
 
-            window_states = [(MessageState.PENDING if repeat_policy.need_send(message_states[pos]) else MessageState.CONFIRMED) for pos in range(window_start, window_end)]
-
             current_send_count = 0
+            batch = []
 
             for pos in range(window_start, window_end):
-                if window_states[pos - window_start] == MessageState.PENDING:
-                    put(Message(MessageType.DATA, pos))
-                    window_states[pos - window_start] = message_states[pos] = MessageState.SENT
+                state = window[pos]
+                if repeat_policy.need_send(state):
+                    send_times[window.slot(pos)] = time.time_ns() if state == MessageState.PENDING else -1
+                    batch.append(Message(MessageType.DATA, pos))
+                    window[pos] = MessageState.SENT
                     message_count += 1
                     current_send_count += 1
+            put(batch)
             
+            current_timeout_ns = timeout_policy.timeout()
             last_sync_time_ns = time.time_ns()
 
-            while time.time_ns() < last_sync_time_ns + timeout_ns and current_send_count > 0:
+            while time.time_ns() < last_sync_time_ns + current_timeout_ns and current_send_count > 0:
                 try:
-                    message = get(False)
+                    message = wait_message(get, self.event_driven, last_sync_time_ns + current_timeout_ns - time.time_ns())
                     if message.type == MessageType.CONFORMATION:
-                        if message.index in range(window_start, window_end):
-                            if window_states[message.index - window_start] == MessageState.SENT:
-                                window_states[message.index - window_start] = message_states[message.index] = MessageState.CONFIRMED
-                                current_send_count -= 1
-                                last_sync_time_ns = time.time_ns()
+                        confirmed = [message.index] if message.index in range(window_start, window_end) else []
+                    elif message.type == MessageType.CUMULATIVE_CONFORMATION:
+                        # every message before the index got through
+                        confirmed = range(window_start, min(message.index, window_end))
+                    else:
+                        confirmed = []
+                    for pos in confirmed:
+                        if window[pos] == MessageState.SENT:
+                            window[pos] = MessageState.CONFIRMED
+                            current_send_count -= 1
+                            last_sync_time_ns = time.time_ns()
+                            if send_times[window.slot(pos)] >= 0:
+                                timeout_policy.on_sample(last_sync_time_ns - send_times[window.slot(pos)])
+                            timeout_policy.on_progress()
+                            current_timeout_ns = timeout_policy.timeout()
                 except Empty:
                     pass
             if current_send_count > 0:
                 timeouts += 1
+                timeout_policy.on_timeout()
         senderStoped.set()
         with self.timeouts.get_lock():
             self.timeouts.value = timeouts
         with self.message_count.get_lock():
             self.message_count.value = message_count
+        if not self.rto_stats is None:
+            self.rto_stats[:] = timeout_policy.stats()
         
+class SlidingSender:
+    def __init__(self, timeouts, message_count, rto_stats = None, event_driven : bool = False) -> None:
+        self.timeouts = timeouts
+        self.message_count = message_count
+        self.rto_stats = rto_stats
+        self.event_driven = event_driven
+
+    def run(self, data_size : int, window_size : int, timeout_ns : int, put, get, repeat_policy, senderStoped) -> None:
+        timeout_policy = make_timeout_policy(timeout_ns)
+        window = MessageWindow(data_size, window_size)
+        deadlines = array('q', [-1]) * window_size
+        send_times = array('q', [-1]) * window_size
+        timers = []
+        go_back = repeat_policy.need_send(MessageState.CONFIRMED)
+        timeouts = 0
+        message_count = 0
+        next_pos = 0
+        outgoing = []
+
+        def send(pos):
+            now = time.time_ns()
+            slot = window.slot(pos)
+            # Karn's rule: only messages sent exactly once give a round trip sample
+            if window[pos] == MessageState.PENDING:
+                send_times[slot] = now
+            else:
+                send_times[slot] = -1
+            outgoing.append(Message(MessageType.DATA, pos))
+            if window[pos] != MessageState.CONFIRMED:
+                window[pos] = MessageState.SENT
+            deadlines[slot] = now + timeout_policy.timeout()
+            heapq.heappush(timers, (deadlines[slot], pos, timeout_policy.backoff))
+
+        def flush():
+            nonlocal outgoing
+            # the queue pickles in a feeder thread, so a sent batch must not be reused
+            if len(outgoing) > 0:
+                put(outgoing)
+                outgoing = []
+
+        def confirm(pos):
+            if window[pos] == MessageState.SENT:
+                if send_times[window.slot(pos)] >= 0:
+                    timeout_policy.on_sample(time.time_ns() - send_times[window.slot(pos)])
+                timeout_policy.on_progress()
+            window[pos] = MessageState.CONFIRMED
+
+        while True:
+            window_start = repeat_policy.move_window(window)
+            if window_start >= data_size:
+                break
+
+            while next_pos < window.end():
+                send(next_pos)
+                message_count += 1
+                next_pos += 1
+            flush()
+
+            try:
+                message = wait_message(get, self.event_driven, timers[0][0] - time.time_ns() if len(timers) > 0 else CHANEL_IDLE_WAIT_NS)
+                if message.type == MessageType.CONFORMATION:
+                    if message.index in range(window_start, next_pos):
+                        confirm(message.index)
+                elif message.type == MessageType.CUMULATIVE_CONFORMATION:
+                    for pos in range(window_start, min(message.index, next_pos)):
+                        confirm(pos)
+            except Empty:
+                pass
+
+            now = time.time_ns()
+            while len(timers) > 0 and timers[0][0] <= now:
+                deadline, pos, armed_backoff = heapq.heappop(timers)
+                if window[pos] != MessageState.SENT or deadlines[window.slot(pos)] != deadline:
+                    continue
+                timeouts += 1
+                timeout_policy.on_timeout(armed_backoff)
+                for resend_pos in range(pos, next_pos if go_back else pos + 1):
+                    send(resend_pos)
+                    message_count += 1
+            flush()
+        senderStoped.set()
+        with self.timeouts.get_lock():
+            self.timeouts.value = timeouts
+        with self.message_count.get_lock():
+            self.message_count.value = message_count
+        if not self.rto_stats is None:
+            self.rto_stats[:] = timeout_policy.stats()
+
 class Receiver:
+    def __init__(self, cumulative : bool = False, event_driven : bool = False) -> None:
+        self.cumulative = cumulative
+        self.event_driven = event_driven
+
     def run(self, put, get, senderStoped) -> None:
+        received = set()
+        next_expected = 0
         while not senderStoped.is_set():
+            batch = []
             try:
-                message = get(False)
-                if message.type == MessageType.DATA:
-                    put(Message(MessageType.CONFORMATION, message.index))
+                message = wait_message(get, self.event_driven, CHANEL_IDLE_WAIT_NS)
+                while True:
+                    if message.type == MessageType.DATA:
+                        if not self.cumulative:
+                            batch.append(Message(MessageType.CONFORMATION, message.index))
+                        else:
+                            if message.index >= next_expected:
+                                received.add(message.index)
+                            while next_expected in received:
+                                received.remove(next_expected)
+                                next_expected += 1
+                            batch.append(Message(MessageType.CUMULATIVE_CONFORMATION, next_expected))
+                    message = get(False)
             except Empty:
                 pass
+            put(batch)
 
 
-def main():
+def run_cell(policy, loss_prob, window : int, data_size : int, timeout_ns : int, sender_type = Sender, cumulative_ack : bool = False, transport : ChanelTransport = ChanelTransport.QUEUE, event_driven : bool = False):
     senderStoped = Event()
 
     timeouts = Value(ctypes.c_uint32)
     message_count = Value(ctypes.c_uint32)
 
-    sender = Sender(timeouts, message_count)
-    receiver = Receiver()
+    sender = sender_type(timeouts, message_count, event_driven=event_driven)
+    receiver = Receiver(cumulative_ack, event_driven)
+
+    forwardChanel = OneWayChanel(0, loss_prob, RandomBlock(), transport)
+    backwardChanel = OneWayChanel(0, 0.0, RandomBlock(), transport)
+
+    senderThread = Process(target=sender.run, args=(data_size, window, timeout_ns, forwardChanel.put_batch, backwardChanel.get, policy, senderStoped))
+    receiverThread = Process(target=receiver.run, args=(backwardChanel.put_batch, forwardChanel.get, senderStoped))
+    forwardChanelThread = Process(target=repeat_until, args=(forwardChanel.process, senderStoped))
+    backwardChanelThread = Process(target=repeat_until, args=(backwardChanel.process, senderStoped))
+
+    start_time = time.time()
+
+    forwardChanelThread.start()
+    backwardChanelThread.start()
+    receiverThread.start()
+    senderThread.start()
+
+    senderThread.join()
+    receiverThread.join()
+    forwardChanelThread.join()
+    backwardChanelThread.join()
+    forwardChanel.close()
+    backwardChanel.close()
+
+    return data_size / message_count.value, time.time() - start_time
+
 
+def print_table(name, window_sizes, loss_probs, results) -> None:
+    print(*([name] + window_sizes), sep = ';')
+    for i, loss_prob in enumerate(loss_probs):
+        print(*([loss_prob] + results[i]), sep = ';')
+
+
+def print_tables(policy_name, window_sizes, loss_probs, resultsK, resultsTime) -> None:
+    print_table(policy_name, window_sizes, loss_probs, resultsK)
+    print_table(policy_name, window_sizes, loss_probs, resultsTime)
+
+
+def main():
     data_size = 1000
     timeout_ns = 5000000
 
@@ -182,42 +657,15 @@ def main():
         for i, loss_prob in enumerate(loss_probs):
             resultsK.append([])
             resultsTime.append([])
-            forwardChanel = OneWayChanel(0, loss_prob, np.random.rand)
-            backwardChanel = OneWayChanel(0, 0.0, np.random.rand)
 
             for window in window_sizes:
                 print(policy.name(), loss_prob, window)
-                senderStoped.clear()
-                timeouts.value = 0
-                message_count.value = 0
-                senderThread = Process(target=sender.run, args=(data_size, window, timeout_ns, forwardChanel.put, backwardChanel.get, policy, senderStoped))
-                receiverThread = Process(target=receiver.run, args=(backwardChanel.put, forwardChanel.get, senderStoped))
-                forwardChanelThread = Process(target=repeat_until, args=(forwardChanel.process, senderStoped))
-                backwardChanelThread = Process(target=repeat_until, args=(backwardChanel.process, senderStoped))
-
-                start_time = time.time()
-
-                forwardChanelThread.start()
-                backwardChanelThread.start()
-                receiverThread.start()
-                senderThread.start()
-
-                senderThread.join()
-                receiverThread.join()
-                forwardChanelThread.join()
-                backwardChanelThread.join()
-
-                resultsK[i].append(data_size / message_count.value)
-                resultsTime[i].append(time.time() - start_time)
+                k, elapsed = run_cell(policy, loss_prob, window, data_size, timeout_ns)
+                resultsK[i].append(k)
+                resultsTime[i].append(elapsed)
             
         
-        print(*([policy.name()] + window_sizes), sep = ';')
-        for i, loss_prob in enumerate(loss_probs):
-            print(*([loss_prob] + resultsK[i]), sep = ';')
-            
-        print(*([policy.name()] + window_sizes), sep = ';')
-        for i, loss_prob in enumerate(loss_probs):
-            print(*([loss_prob] + resultsTime[i]), sep = ';')
+        print_tables(policy.name(), window_sizes, loss_probs, resultsK, resultsTime)
 
 
 if __name__ == '__main__':
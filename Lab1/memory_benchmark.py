@@ -0,0 +1,73 @@
+import time
+import pickle
+import tracemalloc
+from array import array
+from main import Message, MessageType, MessageState, MessageWindow, FlyingMessage
+
+
+class DictMessage:
+    def __init__(self, type : MessageType, index : int, payload = None) -> None:
+        self.type = type
+        self.index = index
+        self.payload = payload
+
+class DictFlyingMessage:
+    def __init__(self, message, start_time_ns : int) -> None:
+        self.message = message
+        self.start_time_ns = start_time_ns
+
+
+def allocated_bytes(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def list_bookkeeping(data_size : int, window_size : int):
+    # window sized lists of state objects and ints, as the senders kept them before the bytearray and the arrays
+    now = time.time_ns()
+    window = MessageWindow(data_size, window_size)
+    window.states = [MessageState.SENT for i in range(window_size)]
+    deadlines = [now + i for i in range(window_size)]
+    send_times = [now + i for i in range(window_size)]
+    return window, deadlines, send_times
+
+
+def window_bookkeeping(data_size : int, window_size : int):
+    now = time.time_ns()
+    window = MessageWindow(data_size, window_size)
+    deadlines = array('q', [-1]) * window_size
+    send_times = array('q', [-1]) * window_size
+    for pos in range(window_size):
+        window[pos] = MessageState.SENT
+        deadlines[pos] = now + pos
+        send_times[pos] = now + pos
+    return window, deadlines, send_times
+
+
+def main():
+    count = 100000
+    data_size = 1000000
+    window_sizes = [10, 1000, 100000]
+
+    now = time.time_ns()
+    dict_flying = allocated_bytes(lambda: [DictFlyingMessage(DictMessage(MessageType.DATA, i), now + i) for i in range(count)])
+    slots_flying = allocated_bytes(lambda: [FlyingMessage(Message(MessageType.DATA, i), now + i) for i in range(count)])
+    dict_pickled = len(pickle.dumps(DictMessage(MessageType.DATA, 123456)))
+    slots_pickled = len(pickle.dumps(Message(MessageType.DATA, 123456)))
+
+    print('item', 'before', 'after', sep = ';')
+    print('in-flight FlyingMessage + Message bytes', dict_flying / count, slots_flying / count, sep = ';')
+    print('pickled Message bytes', dict_pickled, slots_pickled, sep = ';')
+    for window_size in window_sizes:
+        list_state = allocated_bytes(lambda: list_bookkeeping(data_size, window_size))
+        window_state = allocated_bytes(lambda: window_bookkeeping(data_size, window_size))
+        print(f'sender bookkeeping bytes per slot, window {window_size}', list_state / window_size, window_state / window_size, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
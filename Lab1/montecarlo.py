@@ -0,0 +1,105 @@
+import numpy as np
+import time
+from main import MessageState, GoBackN, SelectiveRepeat, print_table
+
+
+class MonteCarloResult:
+    def __init__(self, k, timeouts, confidence_z : float) -> None:
+        self.k_mean = float(k.mean())
+        self.k_ci = confidence_z * float(k.std(ddof=1)) / np.sqrt(len(k)) if len(k) > 1 else 0.0
+        self.timeouts_mean = float(timeouts.mean())
+        self.timeouts_ci = confidence_z * float(timeouts.std(ddof=1)) / np.sqrt(len(timeouts)) if len(timeouts) > 1 else 0.0
+
+
+def go_back_n_batch(data_size : int, window_size : int, loss_probabilities, rng):
+    replicas = len(loss_probabilities)
+    window_start = np.zeros(replicas, dtype=np.int64)
+    message_count = np.zeros(replicas, dtype=np.int64)
+    timeouts = np.zeros(replicas, dtype=np.int64)
+    lossy = loss_probabilities > 0
+    geometric_probabilities = np.where(lossy, loss_probabilities, 1.0)
+
+    active = np.arange(replicas)
+    while len(active) > 0:
+        # every round resends the whole window and advances up to its first lost message
+        expected_advance = np.mean(np.minimum(1.0 / geometric_probabilities[active] - 1.0, window_size))
+        rounds = int((data_size - window_start[active].min()) / max(expected_advance, 1.0)) + 1
+        first_lost = np.minimum(rng.geometric(geometric_probabilities[active, None], size=(len(active), rounds)) - 1, window_size)
+        first_lost[~lossy[active]] = window_size
+        starts = window_start[active, None] + np.concatenate((np.zeros((len(active), 1), dtype=np.int64), np.cumsum(first_lost, axis=1)[:, :-1]), axis=1)
+        sent = np.clip(data_size - starts, 0, window_size)
+        message_count[active] += sent.sum(axis=1)
+        timeouts[active] += (first_lost < sent).sum(axis=1)
+        window_start[active] = starts[:, -1] + first_lost[:, -1]
+        active = active[window_start[active] < data_size]
+
+    return data_size / message_count, timeouts
+
+
+def selective_repeat_batch(data_size : int, window_size : int, loss_probabilities, rng):
+    replicas = len(loss_probabilities)
+    # each message is resent on every round until its first delivery, independent of the others
+    sends = rng.geometric(1.0 - loss_probabilities, size=(data_size, replicas))
+
+    # running maximum of the rounds in which messages up to pos got confirmed
+    last_confirmed = np.zeros((data_size, replicas), dtype=np.int64)
+    timeouts = np.zeros(replicas, dtype=np.int64)
+    reach = np.zeros(replicas, dtype=np.int64)
+    for pos in range(data_size):
+        # a message enters the window once everything window_size positions behind it is confirmed
+        first_round = 1 if pos < window_size else last_confirmed[pos - window_size] + 1
+        confirmed = first_round + sends[pos] - 1
+        # rounds in which this message was sent and lost, not already counted for earlier messages
+        timeouts += np.maximum(0, confirmed - np.maximum(first_round, reach))
+        np.maximum(reach, confirmed, out=reach)
+        last_confirmed[pos] = reach
+
+    return data_size / sends.sum(axis=0), timeouts
+
+
+def simulate_batch(data_size : int, window_size : int, repeat_policy, loss_probabilities, rng, backward_loss_probability = 0.0):
+    # with zero chanel delay a lost conformation is indistinguishable from a lost message
+    loss_probabilities = 1.0 - (1.0 - np.asarray(loss_probabilities, dtype=float)) * (1.0 - backward_loss_probability)
+    if repeat_policy.need_send(MessageState.CONFIRMED):
+        return go_back_n_batch(data_size, window_size, loss_probabilities, rng)
+    return selective_repeat_batch(data_size, window_size, loss_probabilities, rng)
+
+
+def estimate(data_size : int, window_size : int, repeat_policy, loss_probability, replicas : int = 1000, seed = None, confidence_z : float = 1.96) -> MonteCarloResult:
+    rng = np.random.default_rng(seed)
+    k, timeouts = simulate_batch(data_size, window_size, repeat_policy, np.full(replicas, loss_probability), rng)
+    return MonteCarloResult(k, timeouts, confidence_z)
+
+
+def estimate_grid(data_size : int, window_sizes : list[int], repeat_policy, loss_probs : list, replicas : int = 1000, seed = None, confidence_z : float = 1.96) -> list[list[MonteCarloResult]]:
+    # all loss probabilities for one window size advance together as a single batch
+    rng = np.random.default_rng(seed)
+    results = [[None for window in window_sizes] for loss_prob in loss_probs]
+    for j, window in enumerate(window_sizes):
+        k, timeouts = simulate_batch(data_size, window, repeat_policy, np.repeat(loss_probs, replicas), rng)
+        for i in range(len(loss_probs)):
+            cell = slice(i * replicas, (i + 1) * replicas)
+            results[i][j] = MonteCarloResult(k[cell], timeouts[cell], confidence_z)
+    return results
+
+
+def main():
+    data_size = 1000
+    replicas = 1000
+    seed = 0
+
+    window_sizes = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    loss_probs = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+    for policy in [SelectiveRepeat, GoBackN]:
+
+        start_time = time.time()
+        results = estimate_grid(data_size, window_sizes, policy, loss_probs, replicas, seed)
+        print(policy.name(), replicas, 'replicas estimated in', time.time() - start_time)
+
+        print_table(policy.name(), window_sizes, loss_probs, [[cell.k_mean for cell in row] for row in results])
+        print_table(policy.name() + ' CI', window_sizes, loss_probs, [[cell.k_ci for cell in row] for row in results])
+        print_table(policy.name() + ' timeouts', window_sizes, loss_probs, [[cell.timeouts_mean for cell in row] for row in results])
+
+
+if __name__ == '__main__':
+    main()
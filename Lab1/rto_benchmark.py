@@ -0,0 +1,44 @@
+from main import SelectiveRepeat, GoBackN, FixedTimeout, AdaptiveTimeout, print_table
+from simulation import simulate, SimulatedSender, SimulatedSlidingSender
+
+
+def main():
+    data_size = 1000
+    window = 8
+    timeout_ns = 5000000
+    seed = 0
+
+    times_to_pass_ns = [100000, 500000, 1000000, 2500000, 5000000, 10000000]
+    loss_probs = [0.0, 0.1, 0.3, 0.5]
+    timeout_policies = [lambda: FixedTimeout(timeout_ns), lambda: AdaptiveTimeout(timeout_ns)]
+    senders = [('', SimulatedSender), (' sliding', SimulatedSlidingSender)]
+
+    for policy in [SelectiveRepeat, GoBackN]:
+        for suffix, sender_type in senders:
+            for make_timeout in timeout_policies:
+                name = policy.name() + suffix + ' ' + make_timeout().name()
+                goodput = []
+                resultsTimeouts = []
+                resultsRTO = []
+                resultsSRTT = []
+                for i, loss_prob in enumerate(loss_probs):
+                    goodput.append([])
+                    resultsTimeouts.append([])
+                    resultsRTO.append([])
+                    resultsSRTT.append([])
+                    for time_to_pass_ns in times_to_pass_ns:
+                        result = simulate(data_size, window, make_timeout(), policy, loss_prob, time_to_pass_ns, seed=seed, sender_type=sender_type)
+                        samples, backoffs, rto_mean, rto_min, rto_max, srtt = result.rto_stats
+                        goodput[i].append(data_size / (result.time_ns / 1000000000))
+                        resultsTimeouts[i].append(result.timeouts)
+                        resultsRTO[i].append(rto_mean / 1000000)
+                        resultsSRTT[i].append(srtt / 1000000)
+
+                print_table(name + ' goodput', times_to_pass_ns, loss_probs, goodput)
+                print_table(name + ' timeouts', times_to_pass_ns, loss_probs, resultsTimeouts)
+                print_table(name + ' mean RTO ms', times_to_pass_ns, loss_probs, resultsRTO)
+                print_table(name + ' SRTT ms', times_to_pass_ns, loss_probs, resultsSRTT)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+import numpy as np
+import heapq
+import time
+from array import array
+from impairments import apply_impairments
+from main import Message, MessageType, MessageState, MessageWindow, GoBackN, SelectiveRepeat, print_tables, make_timeout_policy
+
+
+class EventScheduler:
+    def __init__(self) -> None:
+        self.now_ns = 0
+        self.events = []
+        self.counter = 0
+
+    def schedule(self, delay_ns : int, action, *args) -> list:
+        event = [self.now_ns + delay_ns, self.counter, action, args, True]
+        self.counter += 1
+        heapq.heappush(self.events, event)
+        return event
+
+    def cancel(self, event : list) -> None:
+        event[4] = False
+
+    def run(self, until_ns = None) -> None:
+        while self.events:
+            if (not until_ns is None) and self.events[0][0] > until_ns:
+                break
+            time_ns, _, action, args, active = heapq.heappop(self.events)
+            if not active:
+                continue
+            self.now_ns = time_ns
+            action(*args)
+
+
+class SimulatedChanel:
+    def __init__(self, scheduler : EventScheduler, time_to_pass_ns : int, loss_probability, rand, impairments : list = None) -> None:
+        self.scheduler = scheduler
+        self.time_to_pass_ns = time_to_pass_ns
+        self.loss_probability = loss_probability
+        self.rand = rand
+        self.impairments = impairments if not impairments is None else []
+        self.receive = None
+
+    def connect(self, receive) -> None:
+        self.receive = receive
+
+    def put(self, message : Message) -> None:
+        if self.rand() > self.loss_probability:
+            now_ns = self.scheduler.now_ns
+            for start_time_ns, message in apply_impairments(self.impairments, message, now_ns, self.rand):
+                self.scheduler.schedule(start_time_ns - now_ns + self.time_to_pass_ns, self.receive, message)
+
+
+class SimulatedSender:
+    def __init__(self, scheduler : EventScheduler, data_size : int, window_size : int, timeout_ns : int, put, repeat_policy) -> None:
+        self.scheduler = scheduler
+        self.data_size = data_size
+        self.timeout_policy = make_timeout_policy(timeout_ns)
+        self.put = put
+        self.repeat_policy = repeat_policy
+        self.window = MessageWindow(data_size, window_size)
+        self.send_times = array('q', [-1]) * window_size
+        self.window_start = 0
+        self.window_end = 0
+        self.current_send_count = 0
+        self.timeout_event = None
+        self.timeouts = 0
+        self.message_count = 0
+        self.stop_time_ns = None
+
+    def start(self) -> None:
+        self.send_window()
+
+    def send_window(self) -> None:
+        self.window_start = self.repeat_policy.move_window(self.window)
+        self.window_end = self.window.end()
+
+        if self.window_start >= self.data_size:
+            self.stop_time_ns = self.scheduler.now_ns
+            return
+
+        self.current_send_count = 0
+
+        for pos in range(self.window_start, self.window_end):
+            state = self.window[pos]
+            if self.repeat_policy.need_send(state):
+                self.send_times[self.window.slot(pos)] = self.scheduler.now_ns if state == MessageState.PENDING else -1
+                self.put(Message(MessageType.DATA, pos))
+                self.window[pos] = MessageState.SENT
+                self.message_count += 1
+                self.current_send_count += 1
+
+        if self.current_send_count > 0:
+            self.restart_timer()
+        else:
+            self.scheduler.schedule(0, self.send_window)
+
+    def restart_timer(self) -> None:
+        if not self.timeout_event is None:
+            self.scheduler.cancel(self.timeout_event)
+        self.timeout_event = self.scheduler.schedule(self.timeout_policy.timeout(), self.on_timeout)
+
+    def on_timeout(self) -> None:
+        self.timeout_event = None
+        self.timeouts += 1
+        self.timeout_policy.on_timeout()
+        self.send_window()
+
+    def on_message(self, message : Message) -> None:
+        if not self.stop_time_ns is None:
+            return
+        if message.type == MessageType.CONFORMATION:
+            confirmed = [message.index] if message.index in range(self.window_start, self.window_end) else []
+        elif message.type == MessageType.CUMULATIVE_CONFORMATION:
+            # every message before the index got through
+            confirmed = range(self.window_start, min(message.index, self.window_end))
+        else:
+            return
+        confirmed = [pos for pos in confirmed if self.window[pos] == MessageState.SENT]
+        if len(confirmed) == 0:
+            return
+        for pos in confirmed:
+            self.window[pos] = MessageState.CONFIRMED
+            if self.send_times[self.window.slot(pos)] >= 0:
+                self.timeout_policy.on_sample(self.scheduler.now_ns - self.send_times[self.window.slot(pos)])
+            self.timeout_policy.on_progress()
+            self.current_send_count -= 1
+        if self.current_send_count > 0:
+            self.restart_timer()
+            return
+        self.scheduler.cancel(self.timeout_event)
+        self.timeout_event = None
+        self.send_window()
+
+
+class SimulatedSlidingSender:
+    def __init__(self, scheduler : EventScheduler, data_size : int, window_size : int, timeout_ns : int, put, repeat_policy) -> None:
+        self.scheduler = scheduler
+        self.data_size = data_size
+        self.timeout_policy = make_timeout_policy(timeout_ns)
+        self.put = put
+        self.repeat_policy = repeat_policy
+        self.go_back = repeat_policy.need_send(MessageState.CONFIRMED)
+        self.window = MessageWindow(data_size, window_size)
+        self.timers = [None for i in range(window_size)]
+        self.send_times = array('q', [-1]) * window_size
+        self.window_start = 0
+        self.next_pos = 0
+        self.timeouts = 0
+        self.message_count = 0
+        self.stop_time_ns = None
+
+    def start(self) -> None:
+        self.fill_window()
+
+    def send(self, pos : int) -> None:
+        slot = self.window.slot(pos)
+        if self.window[pos] == MessageState.PENDING:
+            self.send_times[slot] = self.scheduler.now_ns
+        else:
+            self.send_times[slot] = -1
+        self.put(Message(MessageType.DATA, pos))
+        self.message_count += 1
+        if self.window[pos] != MessageState.CONFIRMED:
+            self.window[pos] = MessageState.SENT
+        if not self.timers[slot] is None:
+            self.scheduler.cancel(self.timers[slot])
+        self.timers[slot] = self.scheduler.schedule(self.timeout_policy.timeout(), self.on_timeout, pos, self.timeout_policy.backoff)
+
+    def fill_window(self) -> None:
+        self.window_start = self.repeat_policy.move_window(self.window)
+        if self.window_start >= self.data_size:
+            self.stop_time_ns = self.scheduler.now_ns
+            return
+        while self.next_pos < self.window.end():
+            self.send(self.next_pos)
+            self.next_pos += 1
+
+    def confirm(self, pos : int) -> None:
+        slot = self.window.slot(pos)
+        if self.window[pos] == MessageState.SENT:
+            if self.send_times[slot] >= 0:
+                self.timeout_policy.on_sample(self.scheduler.now_ns - self.send_times[slot])
+            self.timeout_policy.on_progress()
+        self.window[pos] = MessageState.CONFIRMED
+        if not self.timers[slot] is None:
+            self.scheduler.cancel(self.timers[slot])
+            self.timers[slot] = None
+
+    def on_timeout(self, pos : int, armed_backoff : int) -> None:
+        slot = self.window.slot(pos)
+        self.timers[slot] = None
+        if self.window[pos] != MessageState.SENT:
+            return
+        self.timeouts += 1
+        self.timeout_policy.on_timeout(armed_backoff)
+        for resend_pos in range(pos, self.next_pos if self.go_back else pos + 1):
+            self.send(resend_pos)
+
+    def on_message(self, message : Message) -> None:
+        if not self.stop_time_ns is None:
+            return
+        if message.type == MessageType.CONFORMATION:
+            if message.index in range(self.window_start, self.next_pos):
+                self.confirm(message.index)
+        elif message.type == MessageType.CUMULATIVE_CONFORMATION:
+            for pos in range(self.window_start, min(message.index, self.next_pos)):
+                self.confirm(pos)
+        else:
+            return
+        self.fill_window()
+
+
+class SimulatedReceiver:
+    def __init__(self, put, cumulative : bool = False) -> None:
+        self.put = put
+        self.cumulative = cumulative
+        self.received = set()
+        self.next_expected = 0
+
+    def on_message(self, message : Message) -> None:
+        if message.type != MessageType.DATA:
+            return
+        if not self.cumulative:
+            self.put(Message(MessageType.CONFORMATION, message.index))
+            return
+        if message.index >= self.next_expected:
+            self.received.add(message.index)
+        while self.next_expected in self.received:
+            self.received.remove(self.next_expected)
+            self.next_expected += 1
+        self.put(Message(MessageType.CUMULATIVE_CONFORMATION, self.next_expected))
+
+
+class SimulationResult:
+    def __init__(self, timeouts : int, message_count : int, time_ns : int, rto_stats : list = None) -> None:
+        self.timeouts = timeouts
+        self.message_count = message_count
+        self.time_ns = time_ns
+        self.rto_stats = rto_stats
+
+
+def simulate(data_size : int, window_size : int, timeout_ns : int, repeat_policy, loss_probability, time_to_pass_ns : int = 0, backward_loss_probability = 0.0, seed = None, sender_type = SimulatedSender, cumulative_ack : bool = False, impairments : list = None) -> SimulationResult:
+    rng = np.random.default_rng(seed)
+    scheduler = EventScheduler()
+    forwardChanel = SimulatedChanel(scheduler, time_to_pass_ns, loss_probability, rng.random, impairments)
+    backwardChanel = SimulatedChanel(scheduler, time_to_pass_ns, backward_loss_probability, rng.random)
+    sender = sender_type(scheduler, data_size, window_size, timeout_ns, forwardChanel.put, repeat_policy)
+    receiver = SimulatedReceiver(backwardChanel.put, cumulative_ack)
+    forwardChanel.connect(receiver.on_message)
+    backwardChanel.connect(sender.on_message)
+
+    sender.start()
+    scheduler.run()
+
+    return SimulationResult(sender.timeouts, sender.message_count, sender.stop_time_ns, sender.timeout_policy.stats())
+
+
+def main():
+    data_size = 1000
+    timeout_ns = 5000000
+    time_to_pass_ns = 1000000
+    seed = 0
+
+    window_sizes = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    loss_probs = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+    senders = [('', SimulatedSender, False), (' sliding', SimulatedSlidingSender, False), (' sliding cumulative', SimulatedSlidingSender, True)]
+    for policy in [SelectiveRepeat, GoBackN]:
+        for suffix, sender_type, cumulative_ack in senders:
+
+            resultsK = []
+            resultsTime = []
+
+            start_time = time.time()
+            for i, loss_prob in enumerate(loss_probs):
+                resultsK.append([])
+                resultsTime.append([])
+                for window in window_sizes:
+                    result = simulate(data_size, window, timeout_ns, policy, loss_prob, time_to_pass_ns, seed=seed, sender_type=sender_type, cumulative_ack=cumulative_ack)
+                    resultsK[i].append(data_size / result.message_count)
+                    resultsTime[i].append(result.time_ns / 1000000000)
+            print(policy.name() + suffix, 'simulated in', time.time() - start_time)
+
+            print_tables(policy.name() + suffix, window_sizes, loss_probs, resultsK, resultsTime)
+
+
+if __name__ == '__main__':
+    main()
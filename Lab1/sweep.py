@@ -0,0 +1,98 @@
+import os
+import zlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from main import GoBackN, SelectiveRepeat, run_cell, print_tables
+from simulation import simulate
+
+
+POLICIES = {policy.name(): policy for policy in [SelectiveRepeat, GoBackN]}
+
+# every realtime cell keeps sender, receiver and both chanels spinning on their own core
+REALTIME_CELL_PROCESSES = 4
+
+
+def run_realtime_cell(policy_name : str, loss_prob, window : int, data_size : int, timeout_ns : int):
+    return run_cell(POLICIES[policy_name], loss_prob, window, data_size, timeout_ns)
+
+def run_simulated_cell(policy_name : str, loss_prob, window : int, data_size : int, timeout_ns : int):
+    result = simulate(data_size, window, timeout_ns, POLICIES[policy_name], loss_prob, seed=zlib.crc32(f"{policy_name};{loss_prob};{window}".encode()))
+    return data_size / result.message_count, result.time_ns / 1000000000
+
+
+def default_workers(realtime : bool) -> int:
+    cpu_count = os.cpu_count() or 1
+    if realtime:
+        return max(1, cpu_count // REALTIME_CELL_PROCESSES)
+    return cpu_count
+
+
+def load_results(path : str) -> dict:
+    results = {}
+    if (path is None) or (not os.path.exists(path)):
+        return results
+    with open(path, "rt") as f:
+        for line in f:
+            fields = line.strip().split(';')
+            if len(fields) != 5:
+                continue
+            policy_name, loss_prob, window, k, elapsed = fields
+            results[(policy_name, float(loss_prob), int(window))] = (float(k), float(elapsed))
+    return results
+
+
+def sweep(policy_names : list[str], window_sizes : list[int], loss_probs : list, data_size : int, timeout_ns : int, run, results_path : str = None, max_workers : int = None):
+    results = load_results(results_path)
+    for cell, result in results.items():
+        yield cell, result
+
+    cells = [(policy_name, loss_prob, window) for policy_name in policy_names for loss_prob in loss_probs for window in window_sizes]
+    cells = [cell for cell in cells if not cell in results]
+    if len(cells) == 0:
+        return
+
+    out = None if results_path is None else open(results_path, "at")
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run, *cell, data_size, timeout_ns): cell for cell in cells}
+            for future in as_completed(futures):
+                cell = futures[future]
+                result = future.result()
+                if not out is None:
+                    print(*(list(cell) + list(result)), sep = ';', file=out, flush=True)
+                yield cell, result
+    finally:
+        if not out is None:
+            out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--simulated", action="store_true")
+    parser.add_argument("--results", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    data_size = 1000
+    timeout_ns = 5000000
+
+    window_sizes = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    loss_probs = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+    policy_names = list(POLICIES)
+
+    run = run_simulated_cell if args.simulated else run_realtime_cell
+    max_workers = args.workers if not args.workers is None else default_workers(not args.simulated)
+
+    results = {}
+    for cell, result in sweep(policy_names, window_sizes, loss_probs, data_size, timeout_ns, run, args.results, max_workers):
+        print(*cell, sep = ' ')
+        results[cell] = result
+
+    for policy_name in policy_names:
+        resultsK = [[results[(policy_name, loss_prob, window)][0] for window in window_sizes] for loss_prob in loss_probs]
+        resultsTime = [[results[(policy_name, loss_prob, window)][1] for window in window_sizes] for loss_prob in loss_probs]
+        print_tables(policy_name, window_sizes, loss_probs, resultsK, resultsTime)
+
+
+if __name__ == '__main__':
+    main()
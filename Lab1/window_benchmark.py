@@ -0,0 +1,80 @@
+import random
+import time
+import tracemalloc
+from main import MessageState, MessageWindow, GoBackN, SelectiveRepeat
+
+
+def scan_move_window(prev_pos, message_states) -> int:
+    for pos in range(prev_pos, len(message_states)):
+        if message_states[pos] != MessageState.CONFIRMED:
+            return pos
+    return len(message_states)
+
+
+def run_list(data_size : int, window_size : int, repeat_policy, loss_probability, rand) -> int:
+    # per message state list and per round window_states, as Sender.run kept them before MessageWindow
+    message_states = [MessageState.PENDING for i in range(data_size)]
+    rounds = 0
+    window_start = 0
+    while True:
+        window_start = scan_move_window(window_start, message_states)
+        window_end = min(window_start + window_size, data_size)
+        if window_start >= data_size:
+            return rounds
+        window_states = [(MessageState.PENDING if repeat_policy.need_send(message_states[pos]) else MessageState.CONFIRMED) for pos in range(window_start, window_end)]
+        for pos in range(window_start, window_end):
+            if window_states[pos - window_start] == MessageState.PENDING:
+                window_states[pos - window_start] = message_states[pos] = MessageState.SENT
+        for pos in range(window_start, window_end):
+            if window_states[pos - window_start] == MessageState.SENT and rand() > loss_probability:
+                window_states[pos - window_start] = message_states[pos] = MessageState.CONFIRMED
+        rounds += 1
+
+
+def run_window(data_size : int, window_size : int, repeat_policy, loss_probability, rand) -> int:
+    window = MessageWindow(data_size, window_size)
+    rounds = 0
+    while True:
+        window_start = repeat_policy.move_window(window)
+        window_end = window.end()
+        if window_start >= data_size:
+            return rounds
+        for pos in range(window_start, window_end):
+            if repeat_policy.need_send(window[pos]):
+                window[pos] = MessageState.SENT
+        for pos in range(window_start, window_end):
+            if window[pos] == MessageState.SENT and rand() > loss_probability:
+                window[pos] = MessageState.CONFIRMED
+        rounds += 1
+
+
+def measure(run, data_size : int, window_size : int, repeat_policy, loss_probability, seed : int):
+    rand = random.Random(seed).random
+    start_time = time.perf_counter()
+    run(data_size, window_size, repeat_policy, loss_probability, rand)
+    elapsed = time.perf_counter() - start_time
+
+    rand = random.Random(seed).random
+    tracemalloc.start()
+    run(data_size, window_size, repeat_policy, loss_probability, rand)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    window_size = 10
+    loss_probability = 0.1
+    seed = 0
+    data_sizes = [1000, 10000, 100000, 1000000, 10000000]
+
+    print('policy', 'data_size', 'list s', 'window s', 'list ns/msg', 'window ns/msg', 'list peak bytes', 'window peak bytes', sep = ';')
+    for policy in [SelectiveRepeat, GoBackN]:
+        for data_size in data_sizes:
+            list_time, list_peak = measure(run_list, data_size, window_size, policy, loss_probability, seed)
+            window_time, window_peak = measure(run_window, data_size, window_size, policy, loss_probability, seed)
+            print(policy.name(), data_size, list_time, window_time, list_time / data_size * 1e9, window_time / data_size * 1e9, list_peak, window_peak, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
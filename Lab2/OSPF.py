@@ -1,185 +1,1328 @@
 import numpy as np
+import abc
 import enum
+import functools
 import time
-from multiprocessing import Process, Event, Queue, Value
-from queue import Empty
-from queue import Queue as SimpleQueue
+from multiprocessing import Process, Event, Queue, Value, Array, Lock, shared_memory
+from queue import Empty, Full
+from collections import deque
+import heapq
+import math
+from array import array
 import ctypes
-import copy
+import pickle
+import struct
+from impairments import RandomBlock, make_impairments, apply_impairments
 
 class ChanelMessage:
+    __slots__ = ('adress_id', 'payload')
+
     def __init__(self, adress_id : int, payload = None) -> None:
         self.adress_id = adress_id
         self.payload = payload
 
+    def __reduce__(self):
+        return (ChanelMessage, (self.adress_id, self.payload))
+
+class ChanelMulticast:
+    # one payload for several adresses, it crosses the input queue once and is fanned out by the chanel,
+    # so a flood to N adresses is pickled once instead of N times
+    __slots__ = ('adress_ids', 'payload')
+
+    def __init__(self, adress_ids, payload = None) -> None:
+        self.adress_ids = adress_ids
+        self.payload = payload
+
+    def __reduce__(self):
+        return (ChanelMulticast, (self.adress_ids, self.payload))
+
+    def messages(self) -> list[ChanelMessage]:
+        return [ChanelMessage(adress_id, self.payload) for adress_id in self.adress_ids]
+
 class FlyingMessage:
+    __slots__ = ('message', 'start_time_ns')
+
     def __init__(self, message : ChanelMessage, start_time_ns : int) -> None:
         self.message = message
         self.start_time_ns = start_time_ns
 
+    def __reduce__(self):
+        return (FlyingMessage, (self.message, self.start_time_ns))
+
+class ChanelTransport(enum.Enum):
+    QUEUE = enum.auto()
+    SHARED_MEMORY = enum.auto()
+    LOCAL = enum.auto()
+
+class RingBuffer:
+    # single producer / single consumer ring of fixed size records in shared memory,
+    # the producer only writes head and the consumer only writes tail, so no lock is needed
+    RECORD_HEADER = struct.Struct('I')
+    # counters are read and written through a 'q' view, struct.pack_into zero fills first and tears them
+    HEAD = 0
+    TAIL = 8
+    DATA_OFFSET = 128
+    # an empty ring is polled with yields first and then with short sleeps, there is no way to be woken up
+    SPIN_POLLS = 100
+    POLL_INTERVAL = 0.00005
+
+    def __init__(self, capacity : int = 1024, record_size : int = 128, lock = None, encode = None, decode = None) -> None:
+        self.capacity = capacity
+        self.record_size = record_size
+        self.lock = lock
+        self.encode = encode if not encode is None else functools.partial(pickle.dumps, protocol=pickle.HIGHEST_PROTOCOL)
+        self.decode = decode if not decode is None else pickle.loads
+        self.memory = shared_memory.SharedMemory(create=True, size=RingBuffer.DATA_OFFSET + capacity * record_size)
+        self.counters = self.memory.buf[:RingBuffer.DATA_OFFSET].cast('q')
+        self.counters[RingBuffer.HEAD] = 0
+        self.counters[RingBuffer.TAIL] = 0
+
+    def __getstate__(self) -> dict:
+        # a process started by spawn or forkserver gets the name of the shared memory and attaches to it again
+        return {'name': self.memory.name, 'capacity': self.capacity, 'record_size': self.record_size, 'lock': self.lock, 'encode': self.encode, 'decode': self.decode}
+
+    def __setstate__(self, state : dict) -> None:
+        self.capacity = state['capacity']
+        self.record_size = state['record_size']
+        self.lock = state['lock']
+        self.encode = state['encode']
+        self.decode = state['decode']
+        self.memory = shared_memory.SharedMemory(name=state['name'])
+        self.counters = self.memory.buf[:RingBuffer.DATA_OFFSET].cast('q')
+
+    def __del__(self) -> None:
+        # the shared memory can not be closed while the view is there, an attached process never calls close
+        self.counters.release()
+
+    def put(self, messages : list, block=True) -> None:
+        if not self.lock is None:
+            with self.lock:
+                self.put_records(messages, block)
+        else:
+            self.put_records(messages, block)
+
+    def put_records(self, messages : list, block=True) -> None:
+        buf = self.memory.buf
+        counters = self.counters
+        head = counters[RingBuffer.HEAD]
+        tail = counters[RingBuffer.TAIL]
+        if not block and head + len(messages) - tail > self.capacity:
+            raise Full
+        for message in messages:
+            record = self.encode(message)
+            if len(record) > self.record_size - RingBuffer.RECORD_HEADER.size:
+                raise ValueError(f"Message does not fit into a {self.record_size} byte record")
+            while head - tail >= self.capacity:
+                counters[RingBuffer.HEAD] = head
+                time.sleep(0)
+                tail = counters[RingBuffer.TAIL]
+            offset = RingBuffer.DATA_OFFSET + (head % self.capacity) * self.record_size
+            RingBuffer.RECORD_HEADER.pack_into(buf, offset, len(record))
+            start = offset + RingBuffer.RECORD_HEADER.size
+            buf[start:start + len(record)] = record
+            head += 1
+        # records are written before head moves past them
+        counters[RingBuffer.HEAD] = head
+
+    def get(self, block=True, timeout = None) -> list:
+        buf = self.memory.buf
+        counters = self.counters
+        tail = counters[RingBuffer.TAIL]
+        head = counters[RingBuffer.HEAD]
+        deadline = None if timeout is None else time.time() + timeout
+        polls = 0
+        while head == tail:
+            if not block or (not deadline is None and time.time() >= deadline):
+                raise Empty
+            time.sleep(0 if polls < RingBuffer.SPIN_POLLS else RingBuffer.POLL_INTERVAL)
+            polls += 1
+            head = counters[RingBuffer.HEAD]
+        messages = []
+        for pos in range(tail, head):
+            offset = RingBuffer.DATA_OFFSET + (pos % self.capacity) * self.record_size
+            length = RingBuffer.RECORD_HEADER.unpack_from(buf, offset)[0]
+            start = offset + RingBuffer.RECORD_HEADER.size
+            messages.append(self.decode(buf[start:start + length]))
+        counters[RingBuffer.TAIL] = head
+        return messages
+
+    def get_nowait(self) -> list:
+        return self.get(False)
+
+    def close(self) -> None:
+        self.counters.release()
+        self.memory.close()
+        self.memory.unlink()
+
+class LocalQueue:
+    # in memory queue for a chanel whose nodes all run in one thread, get never blocks as nothing
+    # could put meanwhile, notify is called on every put so a waiting coroutine can be woken up
+    def __init__(self) -> None:
+        self.items = deque()
+        self.notify = None
+
+    def put(self, item, block=True) -> None:
+        self.items.append(item)
+        if not self.notify is None:
+            self.notify()
+
+    def get(self, block=True, timeout = None):
+        if len(self.items) == 0:
+            raise Empty
+        return self.items.popleft()
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def empty(self) -> bool:
+        return len(self.items) == 0
+
+    def close(self) -> None:
+        pass
+
+class RecordQueue:
+    # a multiprocessing queue that carries a batch as its records joined into one bytes object, each after its length,
+    # so the pipe gets the bytes of the records and no object graph is pickled
+    def __init__(self, encode, decode) -> None:
+        self.queue = Queue()
+        self.encode = encode
+        self.decode = decode
+
+    def put(self, messages : list, block=True) -> None:
+        data = bytearray()
+        for message in messages:
+            record = self.encode(message)
+            data += RingBuffer.RECORD_HEADER.pack(len(record))
+            data += record
+        self.queue.put(bytes(data), block)
+
+    def get(self, block=True, timeout = None) -> list:
+        data = memoryview(self.queue.get(block, timeout))
+        messages = []
+        pos = 0
+        while pos < len(data):
+            length = RingBuffer.RECORD_HEADER.unpack_from(data, pos)[0]
+            pos += RingBuffer.RECORD_HEADER.size
+            messages.append(self.decode(data[pos:pos + length]))
+            pos += length
+        return messages
+
+    def get_nowait(self) -> list:
+        return self.get(False)
+
+def make_transport(transport : ChanelTransport, capacity : int, record_size : int, lock = None, encode = None, decode = None):
+    if transport == ChanelTransport.SHARED_MEMORY:
+        return RingBuffer(capacity, record_size, lock, encode, decode)
+    if transport == ChanelTransport.LOCAL:
+        return LocalQueue()
+    if not encode is None:
+        return RecordQueue(encode, decode)
+    return Queue()
+
+CHANEL_IDLE_WAIT_NS = 0.01 * 1000000000
+
 class ManyWayChanel:
-    def __init__(self, adress_count, time_to_pass_ns : int, loss_probability, rand) -> None:
+    def __init__(self, adress_count, time_to_pass_ns : int, loss_probability, rand, transport : ChanelTransport = ChanelTransport.QUEUE, capacity : int = 1024, record_size : int = 512, jitter_ns : int = 0, reorder : bool = True, bandwidth_bps : int = 0, message_size : int = 64, impairments : list = None, binary : bool = True) -> None:
+        # every queue item is a list of messages, so one pipe write carries a whole batch, with binary the messages
+        # cross as records of the wire format and are pickled otherwise, the local transport passes the objects
         self.adress_count = adress_count
-        self.input_queue = Queue()
-        self.flying_queue = Queue()
-        self.output_queues = [Queue() for i in range(adress_count)]
+        self.transport = transport
+        encode = encode_record if binary else None
+        # every router and its sender write the shared input, so its producers take turns on a lock
+        self.input_queue = make_transport(transport, capacity, record_size, Lock(), encode, decode_record if binary else None)
+        self.output_queues = [make_transport(transport, capacity, record_size, None, encode, decode_delivered if binary else None) for i in range(adress_count)]
+        # min heap of (deliver_time_ns, sequence, message), the sequence keeps equal times in fifo order
+        self.flying_messages = []
+        self.flying_count = 0
+        self.received_messages = [deque() for i in range(adress_count)]
         self.rand = rand
         self.time_to_pass_ns = time_to_pass_ns
-        self.loss_probability = loss_probability
-        self.flying_message = None
+        # every output port is its own link for the impairments and keeps its own order
+        self.impairments = make_impairments(loss_probability, jitter_ns, bandwidth_bps, message_size) + (impairments if not impairments is None else [])
+        self.reorder = reorder
+        self.last_deliver_time_ns = [0 for i in range(adress_count)]
 
     def put(self, msg : ChanelMessage, block=True):
         if msg.adress_id >= self.adress_count:
             raise ValueError(f"Invalid adress id")
-        self.input_queue.put(msg, block)
+        self.input_queue.put([msg], block)
+
+    def put_batch(self, msgs : list, block=True):
+        # ChanelMessage and ChanelMulticast items can go together
+        for msg in msgs:
+            adress_ids = msg.adress_ids if isinstance(msg, ChanelMulticast) else [msg.adress_id]
+            if any(adress_id >= self.adress_count for adress_id in adress_ids):
+                raise ValueError(f"Invalid adress id")
+        if len(msgs) > 0:
+            self.input_queue.put(msgs, block)
 
-    def get(self, adress_id, block=True) -> ChanelMessage:
+    def put_multicast(self, adress_ids, payload, block=True):
+        # adress_ids may be a range, a broadcast to every router then pickles as two numbers
+        if len(adress_ids) > 0:
+            self.put_batch([ChanelMulticast(adress_ids, payload)], block)
+
+    def get(self, adress_id, block=True, timeout = None) -> ChanelMessage:
         if adress_id >= self.adress_count:
             raise ValueError(f"Invalid adress id")
-        return self.output_queues[adress_id].get(block)
+        if len(self.received_messages[adress_id]) == 0:
+            self.received_messages[adress_id].extend(self.output_queues[adress_id].get(block, timeout))
+        return self.received_messages[adress_id].popleft()
+
+    def schedule(self, msgs : list[ChanelMessage]) -> None:
+        now = time.time_ns()
+        for item in msgs:
+            # every adress of a multicast gets its own copy of the message and its own impairments
+            for msg in (item.messages() if isinstance(item, ChanelMulticast) else [item]):
+                for start_time_ns, msg in apply_impairments(self.impairments, msg, now, self.rand, msg.adress_id):
+                    deliver_time_ns = start_time_ns + self.time_to_pass_ns
+                    if not self.reorder:
+                        deliver_time_ns = max(deliver_time_ns, self.last_deliver_time_ns[msg.adress_id])
+                        self.last_deliver_time_ns[msg.adress_id] = deliver_time_ns
+                    heapq.heappush(self.flying_messages, (deliver_time_ns, self.flying_count, msg))
+                    self.flying_count += 1
+
+    def wait_time(self) -> float:
+        if len(self.flying_messages) == 0:
+            return CHANEL_IDLE_WAIT_NS / 1000000000
+        return max(0, self.flying_messages[0][0] - time.time_ns()) / 1000000000
 
     def process_input(self) -> None:
+        # sleeps until the next delivery is due or new messages come in
         try:
+            new_messages = self.input_queue.get(True, self.wait_time())
             while True:
-                new_message = self.input_queue.get_nowait()
-                self.flying_queue.put(FlyingMessage(new_message, time.time_ns()))
+                self.schedule(new_messages)
+                new_messages = self.input_queue.get_nowait()
         except Empty:
             pass
 
     def process_output(self) -> None:
-        while True:
-            try:
-                if self.flying_message is None:
-                    self.flying_message = self.flying_queue.get_nowait()
-            except Empty:
-                break
-            if time.time_ns() < self.flying_message.start_time_ns + self.time_to_pass_ns:
-                break
-            if self.rand() > self.loss_probability:
-                self.output_queues[self.flying_message.message.adress_id].put(self.flying_message.message)
-            self.flying_message = None
+        delivered = {}
+        now = time.time_ns()
+        while len(self.flying_messages) > 0 and now >= self.flying_messages[0][0]:
+            deliver_time_ns, count, message = heapq.heappop(self.flying_messages)
+            delivered.setdefault(message.adress_id, []).append(message)
+        for adress_id, messages in delivered.items():
+            self.output_queues[adress_id].put(messages)
     
     def process(self) -> None:
-        time.sleep(0.0001)
         self.process_input()
         self.process_output()
 
+    def close(self) -> None:
+        if self.transport == ChanelTransport.SHARED_MEMORY:
+            self.input_queue.close()
+            for output_queue in self.output_queues:
+                output_queue.close()
+
 class OSPFMessageType(enum.Enum):
     DATA = enum.auto()
     HELLOW = enum.auto()
     LSA = enum.auto()
     DB = enum.auto()
     DB_REQUEST = enum.auto()
+    DB_DELTA = enum.auto()
+    PROBE = enum.auto()
     
 class OSPFMessage:
-    def __init__(self, type : OSPFMessageType, router_id : int, payload = None) -> None:
+    # flow tells apart the DATA messages that have to take the same path, the others leave it None
+    __slots__ = ('type', 'router_id', 'payload', 'flow')
+
+    def __init__(self, type : OSPFMessageType, router_id : int, payload = None, flow = None) -> None:
         self.type = type
         self.router_id = router_id
         self.payload = payload
+        self.flow = flow
+
+    def __reduce__(self):
+        return (OSPFMessage, (self.type, self.router_id, self.payload, self.flow))
 
 class LSAData:
-    def __init__(self, neighbor_ids : list[int]) -> None:
+    # costs go along with neighbor_ids, None when every link costs 1, origin_id is the router the LSA is of
+    # when it is flooded by other routers, None when it comes straight from that router
+    __slots__ = ('neighbor_ids', 'sequence', 'costs', 'origin_id')
+
+    def __init__(self, neighbor_ids : list[int], sequence : int = 0, costs : list[int] = None, origin_id : int = None) -> None:
         self.neighbor_ids = neighbor_ids
+        self.sequence = sequence
+        self.costs = costs
+        self.origin_id = origin_id
+
+    def __reduce__(self):
+        return (LSAData, (self.neighbor_ids, self.sequence, self.costs, self.origin_id))
+
+    def links(self) -> dict[int, int]:
+        if self.costs is None:
+            return {neighbor_id: 1 for neighbor_id in self.neighbor_ids}
+        return dict(zip(self.neighbor_ids, self.costs))
 
 class DBData:
-    def __init__(self, topology) -> None:
+    # the whole topology as of DB version sequence
+    __slots__ = ('topology', 'sequence')
+
+    def __init__(self, topology, sequence : int = 0) -> None:
         self.topology = topology
+        self.sequence = sequence
+
+    def __reduce__(self):
+        return (DBData, (self.topology, self.sequence))
+
+class DBDeltaData:
+    # the topology entries of the routers that changed from DB version sequence - 1 to sequence
+    __slots__ = ('entries', 'sequence')
+
+    def __init__(self, entries : dict, sequence : int) -> None:
+        self.entries = entries
+        self.sequence = sequence
+
+    def __reduce__(self):
+        return (DBDeltaData, (self.entries, self.sequence))
+
+class DRHellowData:
+    # the hellow DR candidates send to each other, active is set by the one that acts as the DR
+    __slots__ = ('priority', 'active', 'db_sequence')
+
+    def __init__(self, priority : int, active : bool, db_sequence : int) -> None:
+        self.priority = priority
+        self.active = active
+        self.db_sequence = db_sequence
+
+    def __reduce__(self):
+        return (DRHellowData, (self.priority, self.active, self.db_sequence))
+
+
+# the wire format of the chanel records, a record is a chanel header and the payload. Integers are varints,
+# neighbor ids are zigzag deltas from the one before and the first from the router they are of, so a sorted
+# list of nearby routers takes a byte per neighbor, and a DB goes as a bitmap of its links when that is smaller.
+# The chanel only decodes its own header and passes the payload on as it came, the destination decodes it, DATA
+# is only decoded by the router it is for
+
+class WirePayload(enum.Enum):
+    NONE = 0
+    INT = 1
+    OSPF_MESSAGE = 2
+    LSA = 3
+    LSA_LIST = 4
+    DB_LISTS = 5
+    DB_BITMAP = 6
+    DB_LSAS = 7
+    DB_DELTA = 8
+    DR_HELLOW = 9
+    SELECTIVE_REPEAT = 10
+    PICKLE = 11
+
+WIRE_PAYLOADS = {kind.value: kind for kind in WirePayload}
+OSPF_MESSAGE_TYPES = {type.value: type for type in OSPFMessageType}
+
+class ChanelRecord(enum.Enum):
+    MESSAGE = 0
+    MULTICAST = 1
+    RANGE = 2
+
+# type of the message with FLOW_FLAG set when a flow follows, and the router id
+OSPF_HEADER = struct.Struct('<BI')
+FLOW_FLAG = 0x80
+
+class EncodedPayload:
+    # a payload as it came off the wire, it is written out again as it is and decoded only where it is used
+    __slots__ = ('data',)
+
+    def __init__(self, data : bytes) -> None:
+        self.data = data
+
+    def __reduce__(self):
+        return (EncodedPayload, (self.data,))
+
+    def decode(self):
+        return get_payload(self.data, 0)[0]
+
+def put_varint(out : bytearray, value : int) -> None:
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def get_varint(buf, pos : int) -> tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def zigzag(value : int) -> int:
+    return 2 * value if value >= 0 else -2 * value - 1
+
+def unzigzag(value : int) -> int:
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+def put_neighbor_ids(out : bytearray, neighbor_ids, costs = None, base : int = 0) -> None:
+    # the count goes with a flag for costs, every cost follows its neighbor id, the ids go as zigzag deltas from
+    # the router they are of, when every value fits into a byte they are written all at once
+    count = len(neighbor_ids)
+    values = []
+    previous = base
+    for neighbor_id in neighbor_ids:
+        delta = neighbor_id - previous
+        values.append((delta << 1) ^ (delta >> 63))
+        previous = neighbor_id
+    if not costs is None:
+        values = [value for pair in zip(values, costs) for value in pair]
+    if count < 0x40 and (count == 0 or max(values) < 0x80):
+        out.append(2 * count + (0 if costs is None else 1))
+        out += bytes(values)
+    else:
+        put_varint(out, 2 * count + (0 if costs is None else 1))
+        for value in values:
+            put_varint(out, value)
+
+def get_neighbor_ids(buf, pos : int, base : int = 0) -> tuple[list[int], list[int], int]:
+    count, pos = get_varint(buf, pos)
+    size = count // 2 if count % 2 == 0 else count - 1
+    values = buf[pos:pos + size]
+    if len(values) == size and max(values, default=0) < 0x80:
+        pos += size
+    else:
+        values = []
+        for i in range(size):
+            value, pos = get_varint(buf, pos)
+            values.append(value)
+    neighbor_ids = []
+    neighbor_id = base
+    for value in (values if count % 2 == 0 else values[::2]):
+        neighbor_id += (value >> 1) ^ -(value & 1)
+        neighbor_ids.append(neighbor_id)
+    return neighbor_ids, (None if count % 2 == 0 else list(values[1::2])), pos
+
+def put_entry(out : bytearray, entry, router_id : int) -> None:
+    if isinstance(entry, dict):
+        put_neighbor_ids(out, list(entry), list(entry.values()), router_id)
+    else:
+        put_neighbor_ids(out, entry, None, router_id)
+
+def get_entry(buf, pos : int, router_id : int):
+    neighbor_ids, costs, pos = get_neighbor_ids(buf, pos, router_id)
+    return (neighbor_ids if costs is None else dict(zip(neighbor_ids, costs))), pos
+
+def put_lsa(out : bytearray, data : LSAData) -> None:
+    put_varint(out, data.sequence)
+    put_varint(out, 0 if data.origin_id is None else data.origin_id + 1)
+    put_neighbor_ids(out, data.neighbor_ids, data.costs, 0 if data.origin_id is None else data.origin_id)
+
+def get_lsa(buf, pos : int) -> tuple[LSAData, int]:
+    sequence, pos = get_varint(buf, pos)
+    origin_id, pos = get_varint(buf, pos)
+    neighbor_ids, costs, pos = get_neighbor_ids(buf, pos, 0 if origin_id == 0 else origin_id - 1)
+    return LSAData(neighbor_ids, sequence, costs, None if origin_id == 0 else origin_id - 1), pos
+
+def put_db(out : bytearray, data : DBData) -> None:
+    # the DB of a router without a DR is a list of LSAs, a DB of neighbor lists goes as a bitmap of
+    # a row of bits per router when that is smaller
+    topology = data.topology
+    if len(topology) > 0 and all(isinstance(entry, LSAData) for entry in topology):
+        out.append(WirePayload.DB_LSAS.value)
+        put_varint(out, data.sequence)
+        put_varint(out, len(topology))
+        for lsa in topology:
+            put_lsa(out, lsa)
+        return
+    # the lists take at least a byte for every count and every neighbor id, a row only has bits for the routers
+    # of the DB
+    row_size = (len(topology) + 7) // 8
+    bitmap = len(topology) * row_size < sum(len(entry) for entry in topology) + len(topology) and not any(isinstance(entry, dict) for entry in topology)
+    if bitmap:
+        neighbor_ids = np.array([neighbor_id for entry in topology for neighbor_id in entry], dtype=np.intp)
+        bitmap = neighbor_ids.max(initial=0) < len(topology)
+    if bitmap:
+        out.append(WirePayload.DB_BITMAP.value)
+        put_varint(out, data.sequence)
+        put_varint(out, len(topology))
+        bits = np.zeros((len(topology), row_size * 8), dtype=np.uint8)
+        bits[np.repeat(np.arange(len(topology)), [len(entry) for entry in topology]), neighbor_ids] = 1
+        out += np.packbits(bits, axis=1, bitorder='little').tobytes()
+    else:
+        out.append(WirePayload.DB_LISTS.value)
+        put_varint(out, data.sequence)
+        put_varint(out, len(topology))
+        for router_id, entry in enumerate(topology):
+            put_entry(out, entry, router_id)
+
+def get_db(buf, pos : int, kind : WirePayload) -> tuple[DBData, int]:
+    sequence, pos = get_varint(buf, pos)
+    count, pos = get_varint(buf, pos)
+    topology = []
+    if kind == WirePayload.DB_LSAS:
+        for i in range(count):
+            lsa, pos = get_lsa(buf, pos)
+            topology.append(lsa)
+    elif kind == WirePayload.DB_BITMAP:
+        row_size = (count + 7) // 8
+        bits = np.unpackbits(np.frombuffer(buf, np.uint8, count * row_size, pos).reshape(count, row_size), axis=1, bitorder='little')
+        neighbor_ids = np.nonzero(bits)[1].tolist()
+        start = 0
+        for neighbor_count in bits.sum(axis=1).tolist():
+            topology.append(neighbor_ids[start:start + neighbor_count])
+            start += neighbor_count
+        pos += count * row_size
+    else:
+        for router_id in range(count):
+            entry, pos = get_entry(buf, pos, router_id)
+            topology.append(entry)
+    return DBData(topology, sequence), pos
+
+def put_payload(out : bytearray, payload) -> None:
+    # a kind byte and what that kind needs, payloads of any other type are pickled
+    if payload is None:
+        out.append(WirePayload.NONE.value)
+    elif isinstance(payload, EncodedPayload):
+        out += payload.data
+    elif isinstance(payload, int):
+        out.append(WirePayload.INT.value)
+        put_varint(out, zigzag(payload))
+    elif isinstance(payload, OSPFMessage):
+        out.append(WirePayload.OSPF_MESSAGE.value)
+        out += OSPF_HEADER.pack(payload.type.value | (0 if payload.flow is None else FLOW_FLAG), payload.router_id)
+        if not payload.flow is None:
+            put_varint(out, payload.flow[0])
+            put_varint(out, payload.flow[1])
+        if payload.type == OSPFMessageType.DATA:
+            # DATA goes with its length, the routers on its way pass it on without decoding it
+            data = bytearray()
+            put_payload(data, payload.payload)
+            put_varint(out, len(data))
+            out += data
+        else:
+            put_payload(out, payload.payload)
+    elif isinstance(payload, LSAData):
+        out.append(WirePayload.LSA.value)
+        put_lsa(out, payload)
+    elif isinstance(payload, list) and len(payload) > 0 and all(isinstance(lsa, LSAData) for lsa in payload):
+        out.append(WirePayload.LSA_LIST.value)
+        put_varint(out, len(payload))
+        for lsa in payload:
+            put_lsa(out, lsa)
+    elif isinstance(payload, DBData):
+        put_db(out, payload)
+    elif isinstance(payload, DBDeltaData):
+        out.append(WirePayload.DB_DELTA.value)
+        put_varint(out, payload.sequence)
+        put_varint(out, len(payload.entries))
+        for router_id, entry in payload.entries.items():
+            put_varint(out, router_id)
+            put_entry(out, entry, router_id)
+    elif isinstance(payload, DRHellowData):
+        out.append(WirePayload.DR_HELLOW.value)
+        put_varint(out, payload.priority)
+        out.append(1 if payload.active else 0)
+        put_varint(out, payload.db_sequence)
+    elif isinstance(payload, SelectiveRepeatMessage):
+        out.append(WirePayload.SELECTIVE_REPEAT.value)
+        out.append(payload.type.value)
+        put_varint(out, payload.index)
+        put_payload(out, payload.payload)
+    else:
+        data = pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+        out.append(WirePayload.PICKLE.value)
+        put_varint(out, len(data))
+        out += data
+
+def get_payload(buf, pos : int):
+    kind = WIRE_PAYLOADS[buf[pos]]
+    pos += 1
+    if kind == WirePayload.NONE:
+        return None, pos
+    if kind == WirePayload.INT:
+        value, pos = get_varint(buf, pos)
+        return unzigzag(value), pos
+    if kind == WirePayload.OSPF_MESSAGE:
+        type, router_id = OSPF_HEADER.unpack_from(buf, pos)
+        pos += OSPF_HEADER.size
+        flow = None
+        if type & FLOW_FLAG:
+            flow_router_id, pos = get_varint(buf, pos)
+            flow_id, pos = get_varint(buf, pos)
+            flow = (flow_router_id, flow_id)
+        type = OSPF_MESSAGE_TYPES[type & ~FLOW_FLAG]
+        if type == OSPFMessageType.DATA:
+            length, pos = get_varint(buf, pos)
+            return OSPFMessage(type, router_id, EncodedPayload(bytes(buf[pos:pos + length])), flow), pos + length
+        payload, pos = get_payload(buf, pos)
+        return OSPFMessage(type, router_id, payload, flow), pos
+    if kind == WirePayload.LSA:
+        return get_lsa(buf, pos)
+    if kind == WirePayload.LSA_LIST:
+        count, pos = get_varint(buf, pos)
+        lsas = []
+        for i in range(count):
+            lsa, pos = get_lsa(buf, pos)
+            lsas.append(lsa)
+        return lsas, pos
+    if kind in (WirePayload.DB_LISTS, WirePayload.DB_BITMAP, WirePayload.DB_LSAS):
+        return get_db(buf, pos, kind)
+    if kind == WirePayload.DB_DELTA:
+        sequence, pos = get_varint(buf, pos)
+        count, pos = get_varint(buf, pos)
+        entries = {}
+        for i in range(count):
+            router_id, pos = get_varint(buf, pos)
+            entries[router_id], pos = get_entry(buf, pos, router_id)
+        return DBDeltaData(entries, sequence), pos
+    if kind == WirePayload.DR_HELLOW:
+        priority, pos = get_varint(buf, pos)
+        active = buf[pos] == 1
+        db_sequence, pos = get_varint(buf, pos + 1)
+        return DRHellowData(priority, active, db_sequence), pos
+    if kind == WirePayload.SELECTIVE_REPEAT:
+        type = SELECTIVE_REPEAT_MESSAGE_TYPES[buf[pos]]
+        index, pos = get_varint(buf, pos + 1)
+        payload, pos = get_payload(buf, pos)
+        return SelectiveRepeatMessage(type, index, payload), pos
+    length, pos = get_varint(buf, pos)
+    return pickle.loads(buf[pos:pos + length]), pos + length
+
+def encode_record(message) -> bytes:
+    # a multicast to a range of adresses takes its two ends, a list all of its adresses
+    out = bytearray()
+    if isinstance(message, ChanelMulticast):
+        adress_ids = message.adress_ids
+        if isinstance(adress_ids, range) and adress_ids.step == 1:
+            out.append(ChanelRecord.RANGE.value)
+            put_varint(out, adress_ids.start)
+            put_varint(out, adress_ids.stop)
+        else:
+            out.append(ChanelRecord.MULTICAST.value)
+            put_varint(out, len(adress_ids))
+            for adress_id in adress_ids:
+                put_varint(out, adress_id)
+    else:
+        out.append(ChanelRecord.MESSAGE.value)
+        put_varint(out, message.adress_id)
+    put_payload(out, message.payload)
+    return bytes(out)
+
+def decode_record(record):
+    # for the chanel, the payload stays encoded
+    kind = record[0]
+    if kind == ChanelRecord.MESSAGE.value:
+        adress_id, pos = get_varint(record, 1)
+        return ChanelMessage(adress_id, EncodedPayload(bytes(record[pos:])))
+    if kind == ChanelRecord.RANGE.value:
+        start, pos = get_varint(record, 1)
+        stop, pos = get_varint(record, pos)
+        return ChanelMulticast(range(start, stop), EncodedPayload(bytes(record[pos:])))
+    count, pos = get_varint(record, 1)
+    adress_ids = []
+    for i in range(count):
+        adress_id, pos = get_varint(record, pos)
+        adress_ids.append(adress_id)
+    return ChanelMulticast(adress_ids, EncodedPayload(bytes(record[pos:])))
+
+def decode_delivered(record) -> ChanelMessage:
+    # at the destination, everything but DATA is decoded
+    adress_id, pos = get_varint(record, 1)
+    return ChanelMessage(adress_id, get_payload(record, pos)[0])
 
 
 HELLOW_INTERVAL = 0.5 * 1000000000
 DEAD_INTERVAL = 1.0 * 1000000000
 RESEND_INTERVAL = 0.2 * 1000000000
+LSA_REFRESH_INTERVAL = 30.0 * 1000000000
+LSA_MAX_AGE = 60.0 * 1000000000
+MAX_SPF_DELAY = 5.0 * 1000000000
+
+class OSPFIntervals:
+    # the timers of one interface, the ones of a router also go for its DR interface and its LSAs,
+    # probe_interval turns on BFD style probes and a neighbor is dead after detect_multiplier missed ones,
+    # lsa_delay is the least time between two new LSAs or DB versions, a failed link stays down for hold_down and
+    # the hold down doubles up to max_hold_down while the link keeps failing, 0 turns it off,
+    # without a DR every router floods its LSA again after refresh_interval, drops the LSAs older than max_age and
+    # waits lsa_delay between two SPF runs, twice as long up to max_spf_delay while the changes keep coming
+    def __init__(self, hellow_interval = HELLOW_INTERVAL, dead_interval = DEAD_INTERVAL, resend_interval = RESEND_INTERVAL, probe_interval = None, detect_multiplier : int = 3, lsa_delay = RESEND_INTERVAL, hold_down = 0, max_hold_down = 0, refresh_interval = LSA_REFRESH_INTERVAL, max_age = LSA_MAX_AGE, max_spf_delay = MAX_SPF_DELAY) -> None:
+        self.hellow_interval = hellow_interval
+        self.dead_interval = dead_interval
+        self.resend_interval = resend_interval
+        self.probe_interval = probe_interval
+        self.detect_multiplier = detect_multiplier
+        self.lsa_delay = lsa_delay
+        self.hold_down = hold_down
+        self.max_hold_down = max_hold_down
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.max_spf_delay = max_spf_delay
+
+    def liveness_interval(self):
+        if self.probe_interval is None:
+            return self.dead_interval
+        return self.probe_interval * self.detect_multiplier
+
+# 10 ms probes, LSAs and DB deltas as soon as a link changes, a flapping link is held down from 100 ms up to 1.6 s
+FAST_INTERVALS = OSPFIntervals(resend_interval = 0.05 * 1000000000, probe_interval = 0.01 * 1000000000, lsa_delay = 0, hold_down = 0.1 * 1000000000, max_hold_down = 1.6 * 1000000000)
+
+class OSPFTimer(enum.Enum):
+    HELLOW = enum.auto()
+    DEAD = enum.auto()
+    RESEND = enum.auto()
+    PROBE = enum.auto()
+    HOLD = enum.auto()
+    LSA = enum.auto()
+    SPF = enum.auto()
+
+class TimerScheduler:
+    # min heap of (due_ns, sequence, timer), scheduling a timer again replaces its due time and the
+    # entry left behind in the heap is dropped once it comes to the top
+    def __init__(self) -> None:
+        self.heap = []
+        self.pending = {}
+        self.count = 0
+
+    def schedule(self, timer, due_ns) -> None:
+        self.pending[timer] = (due_ns, self.count)
+        heapq.heappush(self.heap, (due_ns, self.count, timer))
+        self.count += 1
+
+    def schedule_before(self, timer, due_ns) -> None:
+        # keeps the timer if it is due earlier already
+        if (not timer in self.pending) or due_ns < self.pending[timer][0]:
+            self.schedule(timer, due_ns)
+
+    def cancel(self, timer) -> None:
+        self.pending.pop(timer, None)
+
+    def due(self, timer):
+        return self.pending[timer][0] if timer in self.pending else None
+
+    def next_due(self):
+        while len(self.heap) > 0 and self.pending.get(self.heap[0][2]) != self.heap[0][:2]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if len(self.heap) > 0 else None
+
+    def pop_due(self, now : int) -> list:
+        fired = []
+        while (not self.next_due() is None) and self.heap[0][0] <= now:
+            due_ns, count, timer = heapq.heappop(self.heap)
+            del self.pending[timer]
+            fired.append(timer)
+        return fired
+
+    def wait_time(self, now : int) -> float:
+        # seconds until the next timer, a node with none waits for messages only
+        next_due = self.next_due()
+        return None if next_due is None else max(0, next_due - now) / 1000000000
 
 
 class OSPFDesignatedRouter:
-    def __init__(self, chanel : ManyWayChanel, router_id : int) -> None:
+    def __init__(self, chanel : ManyWayChanel, router_id : int, event_driven : bool = False, intervals : OSPFIntervals = None, dr_ids : list[int] = None, priority : int = 0) -> None:
         self.chanel = chanel
         self.router_id = router_id
-        self.adress_count = self.chanel.adress_count - 1
-        self.last_hellow_sent = [None for i in range(self.adress_count)]
-        self.topology = [set() for i in range(self.adress_count)]
-        self.needSend = None
-        self.last_send_time = None
+        self.intervals = intervals if not intervals is None else OSPFIntervals()
+        # the DR candidates take the adresses after the routers, one of them acts as the DR and the others
+        # are backups that take the same LSAs and the deltas of the DR, so they can take over its DB version
+        self.dr_ids = dr_ids if not dr_ids is None else [router_id]
+        self.peer_ids = [dr_id for dr_id in self.dr_ids if dr_id != router_id]
+        self.priority = priority
+        self.adress_count = self.chanel.adress_count - len(self.dr_ids)
+        self.router_ids = range(self.adress_count)
+        # the links of every router as neighbor id to cost
+        self.topology = [{} for i in range(self.adress_count)]
+        # the last LSA sequence taken from every router, older and repeated LSAs are dropped
+        self.lsa_sequences = [-1 for i in range(self.adress_count)]
+        # every broadcast delta makes a new DB version, routers that miss one ask for a full sync
+        self.db_sequence = 0
+        self.changed = set()
+        self.full_sync = set()
+        # the entries as the routers got them in the last deltas, only entries that differ go into the next one
+        self.synced = {}
+        # a lone DR acts at once, a candidate waits a dead interval to hear from the others first
+        self.active = len(self.peer_ids) == 0
+        self.peer_hellows = {}
+        self.peer_hellow_got = {}
+        self.start_time = time.time_ns()
+        # the hellow is due at once, RESEND is pending while a DB send has to wait, DEAD when a peer may have died
+        self.timers = TimerScheduler()
+        self.timers.schedule(OSPFTimer.HELLOW, 0)
+        if not self.active:
+            self.timers.schedule(OSPFTimer.DEAD, self.start_time + self.intervals.dead_interval)
+        self.event_driven = event_driven
     
     def process(self):
-        time.sleep(0.0001)
-        self.send_hellow()
+        if not self.event_driven:
+            time.sleep(0.0001)
         self.process_messages()
+        now = time.time_ns()
+        for timer in self.timers.pop_due(now):
+            if timer == OSPFTimer.HELLOW:
+                self.send_hellow(now)
+            elif timer == OSPFTimer.DEAD:
+                self.elect(now)
         self.send_messages()
     
-    def send_hellow(self):
-        for router_id, hellow_sent in enumerate(self.last_hellow_sent):
-            if (hellow_sent is None) or (time.time_ns() >= hellow_sent + HELLOW_INTERVAL):
-                self.last_hellow_sent[router_id] = time.time_ns()
-                self.chanel.put(ChanelMessage(router_id, OSPFMessage(OSPFMessageType.HELLOW, self.router_id)))
+    def send_hellow(self, now : int):
+        # one hellow for all the routers, the chanel hands it to each of them, only the active DR sends it
+        if self.active:
+            self.chanel.put_multicast(self.router_ids, OSPFMessage(OSPFMessageType.HELLOW, self.router_id, self.db_sequence))
+        if len(self.peer_ids) > 0:
+            self.chanel.put_multicast(self.peer_ids, OSPFMessage(OSPFMessageType.HELLOW, self.router_id, DRHellowData(self.priority, self.active, self.db_sequence)))
+        self.timers.schedule(OSPFTimer.HELLOW, now + self.intervals.hellow_interval)
+
+    def elect(self, now : int):
+        # the live candidate with the highest priority and then id acts once no active DR is heard of,
+        # a live DR is not replaced by a better candidate that comes up later
+        live = [peer_id for peer_id, hellow_got in self.peer_hellow_got.items() if now < hellow_got + self.intervals.dead_interval]
+        rank = (self.priority, self.router_id)
+        active = [peer_id for peer_id in live if self.peer_hellows[peer_id].active]
+        if self.active:
+            # two active DRs after a partition or a late hellow, the lower one steps down and the other one
+            # skips past its DB versions, so the routers that took its deltas ask for a full sync
+            if any((self.peer_hellows[peer_id].priority, peer_id) > rank for peer_id in active):
+                self.active = False
+            elif len(active) > 0:
+                self.db_sequence = max([self.db_sequence] + [self.peer_hellows[peer_id].db_sequence for peer_id in active]) + 1
+        elif len(active) == 0 and (len(live) == len(self.peer_ids) or now >= self.start_time + self.intervals.dead_interval):
+            if all((self.peer_hellows[peer_id].priority, peer_id) < rank for peer_id in live):
+                self.take_over(now)
+        if len(live) > 0:
+            self.timers.schedule(OSPFTimer.DEAD, min(self.peer_hellow_got[peer_id] for peer_id in live) + self.intervals.dead_interval)
+
+    def take_over(self, now : int):
+        # the routers follow the first hellow, the changes the last DR did not send go out in the next delta
+        self.active = True
+        self.timers.schedule(OSPFTimer.HELLOW, now)
+        self.timers.cancel(OSPFTimer.RESEND)
+
+    def entry(self, router_id : int):
+        # a sorted list of neighbor ids while every link costs 1, a copy of the costs otherwise
+        links = self.topology[router_id]
+        if all(cost == 1 for cost in links.values()):
+            return sorted(links)
+        return dict(links)
+
+    def mark(self, router_id : int):
+        if self.entry(router_id) != self.synced.get(router_id):
+            self.changed.add(router_id)
+        else:
+            self.changed.discard(router_id)
+
+    def need_send(self) -> bool:
+        return self.active and (len(self.changed) > 0 or len(self.full_sync) > 0)
+
+    def wait_time(self) -> float:
+        # seconds until the next hellow or DB resend is due
+        return self.timers.wait_time(time.time_ns())
 
     def process_messages(self):
         try:
+            # the first message is waited for until the next timer when event driven
+            message : OSPFMessage = self.chanel.get(self.router_id, self.event_driven, self.wait_time()).payload
             while True:
-                message : OSPFMessage = self.chanel.get(self.router_id, False).payload
                 if message.type == OSPFMessageType.DATA:
                     pass
                 elif message.type == OSPFMessageType.HELLOW:
-                    pass
+                    if message.router_id in self.peer_ids:
+                        data : DRHellowData = message.payload
+                        self.peer_hellows[message.router_id] = data
+                        self.peer_hellow_got[message.router_id] = time.time_ns()
+                        self.db_sequence = max(self.db_sequence, data.db_sequence)
+                        self.elect(self.peer_hellow_got[message.router_id])
                 elif message.type == OSPFMessageType.LSA:
                     data : LSAData = message.payload
-                    if len(self.topology[message.router_id].symmetric_difference(data.neighbor_ids)) > 0:
-                        self.needSend = True
-                        self.topology[message.router_id] = set(data.neighbor_ids)
+                    if data.sequence > self.lsa_sequences[message.router_id]:
+                        self.lsa_sequences[message.router_id] = data.sequence
+                        self.topology[message.router_id] = data.links()
+                        # a new LSA with the same links means the router missed them, the DR sends them again
+                        if self.active:
+                            self.changed.add(message.router_id)
+                        else:
+                            self.mark(message.router_id)
                 elif message.type == OSPFMessageType.DB:
                     pass
                 elif message.type == OSPFMessageType.DB_REQUEST:
-                    self.needSend = True
+                    if self.active:
+                        self.full_sync.add(message.router_id)
+                elif message.type == OSPFMessageType.DB_DELTA:
+                    # a backup keeps up with what the routers got from the DR, a delta shows the DR is alive too
+                    data : DBDeltaData = message.payload
+                    if message.router_id in self.peer_hellow_got:
+                        self.peer_hellow_got[message.router_id] = time.time_ns()
+                    self.db_sequence = max(self.db_sequence, data.sequence)
+                    for router_id, entry in data.entries.items():
+                        self.synced[router_id] = entry
+                        self.mark(router_id)
+                message = self.chanel.get(self.router_id, False).payload
         except Empty:
             pass
 
     def send_messages(self):
-        if (not self.needSend):
+        if not self.need_send():
             return
-        if (self.last_send_time is None) or (time.time_ns() >= self.last_send_time + RESEND_INTERVAL):
-            for router_id in range(self.adress_count):
-                self.chanel.put(ChanelMessage(router_id, OSPFMessage(OSPFMessageType.DB, self.router_id, DBData(copy.deepcopy(self.topology)))))
-            self.last_send_time = time.time_ns()
-            self.needSend = False
+        if self.timers.due(OSPFTimer.RESEND) is None:
+            # changes go to everybody as one delta, the whole DB only to the routers that asked for it,
+            # both as one multicast, the entries are copies as the chanel may hand the same objects to the routers
+            batch = []
+            if len(self.changed) > 0:
+                self.db_sequence += 1
+                entries = {router_id: self.entry(router_id) for router_id in self.changed}
+                self.synced.update(entries)
+                delta = OSPFMessage(OSPFMessageType.DB_DELTA, self.router_id, DBDeltaData(entries, self.db_sequence))
+                batch.append(ChanelMulticast(self.router_ids, delta))
+                if len(self.peer_ids) > 0:
+                    batch.append(ChanelMulticast(self.peer_ids, delta))
+                self.changed = set()
+            if len(self.full_sync) > 0:
+                db = OSPFMessage(OSPFMessageType.DB, self.router_id, DBData([self.entry(router_id) for router_id in range(self.adress_count)], self.db_sequence))
+                batch.append(ChanelMulticast(sorted(self.full_sync), db))
+                self.full_sync = set()
+            self.chanel.put_batch(batch)
+            # changes that come in meanwhile wait for lsa_delay and go out together
+            self.timers.schedule(OSPFTimer.RESEND, time.time_ns() + self.intervals.lsa_delay)
         
 
+def link_items(entry):
+    # a topology entry is either a list of neighbor ids, every link costing 1, or a dict of neighbor id to cost
+    if isinstance(entry, dict):
+        return entry.items()
+    return ((neighbor_id, 1) for neighbor_id in entry)
+
+def link_cost(entry, neighbor_id):
+    if isinstance(entry, dict):
+        return entry[neighbor_id]
+    return 1
+
+class ShortestPathTree:
+    # Dijkstra over the links of topology from root, a BFS while every link costs 1, the first hop of every router
+    # is taken from its previous router as soon as it is settled. A change of some entries only searches again
+    # from the subtrees that lost their link and from the links that got cheaper, the rest of the tree is kept
+    # a change of this share of the entries or more builds the tree again instead
+    REBUILD_SHARE = 0.25
+
+    def __init__(self, root : int, size : int) -> None:
+        self.root = root
+        self.size = size
+        self.topology = None
+        # the lists are only changed in place, so others may keep them
+        self.distances = [math.inf] * size
+        self.previous = [None] * size
+        self.first = [None] * size
+        # children and incoming links are only needed by update, they are made there on first use
+        self.children = None
+        self.incoming = None
+        # the equal cost first hops of the routers asked for since the tree last changed
+        self.multipath = {}
+
+    def build(self, topology : list) -> None:
+        self.topology = topology
+        self.distances[:] = [math.inf] * self.size
+        self.previous[:] = [None] * self.size
+        self.first[:] = [None] * self.size
+        self.children = None
+        self.incoming = None
+        self.multipath = {}
+        if any(isinstance(entry, dict) for entry in topology):
+            self.search([(0, self.root, self.root)])
+        else:
+            self.breadth_first()
+
+    def breadth_first(self) -> None:
+        distances = self.distances
+        previous = self.previous
+        first = self.first
+        topology = self.topology
+        root = self.root
+        distances[root] = 0
+        previous[root] = root
+        first[root] = root
+        pending = deque([root])
+        while len(pending) > 0:
+            node_id = pending.popleft()
+            distance = distances[node_id] + 1
+            node_first = first[node_id]
+            for neighbor_id in topology[node_id]:
+                if distances[neighbor_id] == math.inf:
+                    distances[neighbor_id] = distance
+                    previous[neighbor_id] = node_id
+                    first[neighbor_id] = neighbor_id if node_id == root else node_first
+                    pending.append(neighbor_id)
+
+    def settle(self, node_id : int, previous : int, distance) -> None:
+        if not self.children is None:
+            if not self.previous[node_id] is None and self.previous[node_id] != node_id:
+                self.children[self.previous[node_id]].discard(node_id)
+            if previous != node_id:
+                self.children[previous].add(node_id)
+        self.distances[node_id] = distance
+        self.previous[node_id] = previous
+        if previous == node_id:
+            self.first[node_id] = node_id
+        else:
+            self.first[node_id] = node_id if previous == self.root else self.first[previous]
+
+    def search(self, pending : list) -> None:
+        heapq.heapify(pending)
+        distances = self.distances
+        topology = self.topology
+        while len(pending) > 0:
+            distance, node_id, previous = heapq.heappop(pending)
+            if distance >= distances[node_id]:
+                continue
+            self.settle(node_id, previous, distance)
+            entry = topology[node_id]
+            if isinstance(entry, dict):
+                for neighbor_id, cost in entry.items():
+                    if distance + cost < distances[neighbor_id]:
+                        heapq.heappush(pending, (distance + cost, neighbor_id, node_id))
+            else:
+                distance += 1
+                for neighbor_id in entry:
+                    if distance < distances[neighbor_id]:
+                        heapq.heappush(pending, (distance, neighbor_id, node_id))
+
+    def link_maps(self) -> None:
+        self.children = [set() for i in range(self.size)]
+        self.incoming = [set() for i in range(self.size)]
+        for node_id, previous in enumerate(self.previous):
+            if not previous is None and previous != node_id:
+                self.children[previous].add(node_id)
+        for node_id, entry in enumerate(self.topology):
+            for neighbor_id in entry:
+                self.incoming[neighbor_id].add(node_id)
+
+    def update(self, changes : dict) -> None:
+        # changes maps a router id to its entry before the change, topology already holds the new one
+        if len(changes) >= self.REBUILD_SHARE * self.size:
+            self.build(self.topology)
+            return
+        self.multipath = {}
+        if self.children is None:
+            # the maps are made from the new entries, so only links that were removed are left to drop
+            self.link_maps()
+        lost = []
+        for node_id, old_entry in changes.items():
+            old_links = dict(link_items(old_entry))
+            new_links = dict(link_items(self.topology[node_id]))
+            for neighbor_id, cost in old_links.items():
+                if not neighbor_id in new_links:
+                    self.incoming[neighbor_id].discard(node_id)
+                if self.previous[neighbor_id] == node_id and neighbor_id != self.root and new_links.get(neighbor_id, math.inf) > cost:
+                    lost.append(neighbor_id)
+            for neighbor_id in new_links:
+                self.incoming[neighbor_id].add(node_id)
+
+        # every router below a lost link has to find a new way
+        detached = []
+        while len(lost) > 0:
+            node_id = lost.pop()
+            if self.previous[node_id] is None:
+                continue
+            self.children[self.previous[node_id]].discard(node_id)
+            self.distances[node_id] = math.inf
+            self.previous[node_id] = None
+            self.first[node_id] = None
+            lost.extend(self.children[node_id])
+            self.children[node_id] = set()
+            detached.append(node_id)
+
+        pending = []
+        for node_id in detached:
+            for previous in self.incoming[node_id]:
+                if self.distances[previous] < math.inf:
+                    pending.append((self.distances[previous] + link_cost(self.topology[previous], node_id), node_id, previous))
+        for node_id in changes:
+            if self.distances[node_id] < math.inf:
+                for neighbor_id, cost in link_items(self.topology[node_id]):
+                    if self.distances[node_id] + cost < self.distances[neighbor_id]:
+                        pending.append((self.distances[node_id] + cost, neighbor_id, node_id))
+        self.search(pending)
+
+    def first_hops(self, node_id : int) -> list[int]:
+        # the first hops of every shortest path to node_id, the shortest paths are walked back from node_id
+        # and the routers on them are then visited by distance, each one joins the first hops of its previous ones.
+        # A link of cost 0 ties two routers in distance and may close a loop, so a router whose first hops grow
+        # after a tied router took them has that one visited again
+        if node_id == self.root or self.previous[node_id] is None:
+            return []
+        if node_id in self.multipath:
+            return self.multipath[node_id]
+        if self.incoming is None:
+            self.link_maps()
+        distances = self.distances
+        topology = self.topology
+        on_paths = {node_id}
+        pending = [node_id]
+        while len(pending) > 0:
+            current = pending.pop()
+            if current == self.root or current in self.multipath:
+                continue
+            for previous in self.incoming[current]:
+                if not previous in on_paths and distances[previous] + link_cost(topology[previous], current) == distances[current]:
+                    on_paths.add(previous)
+                    pending.append(previous)
+        hops = {}
+        # the routers that took the first hops of a router at the same distance, they are visited again when those grow
+        ties = {}
+        pending = [(distances[current], current) for current in on_paths]
+        heapq.heapify(pending)
+        while len(pending) > 0:
+            distance, current = heapq.heappop(pending)
+            if current == self.root or current in self.multipath:
+                continue
+            current_hops = set()
+            for previous in self.incoming[current]:
+                if previous in on_paths and distances[previous] + link_cost(topology[previous], current) == distance:
+                    if previous == self.root:
+                        current_hops.add(current)
+                    elif previous in self.multipath:
+                        current_hops.update(self.multipath[previous])
+                    else:
+                        current_hops.update(hops.get(previous, ()))
+                        if distances[previous] == distance:
+                            ties.setdefault(previous, set()).add(current)
+            if current_hops != hops.get(current):
+                hops[current] = current_hops
+                for next_id in ties.get(current, ()):
+                    heapq.heappush(pending, (distance, next_id))
+        for current, current_hops in hops.items():
+            self.multipath[current] = sorted(current_hops)
+        return self.multipath[node_id]
+
+class DataDrop(enum.Enum):
+    # why a router dropped DATA, NO_ROUTE when its shortest paths have no way to the destination and
+    # DEAD_NEIGHBOR when every first hop it has is dead
+    NO_ROUTE = enum.auto()
+    DEAD_NEIGHBOR = enum.auto()
+
+
+def check_cost(cost) -> int:
+    # the binary wire format sends a cost as a varint, so it has to be a whole number that is not negative,
+    # a link of cost 0 ties the routers at its ends in distance and first_hops takes that into account
+    if not float(cost).is_integer() or cost < 0:
+        raise ValueError(f"Invalid link cost {cost}")
+    return int(cost)
+
+
 class OSPFRouter:
-    def __init__(self, chanel : ManyWayChanel, router_id : int, dr_id : int, neighbor_ids : list[int]) -> None:
+    def __init__(self, chanel : ManyWayChanel, router_id : int, dr_id : int, neighbor_ids : list[int], event_driven : bool = False, neighbor_costs : list[int] = None, ecmp : bool = True, intervals : OSPFIntervals = None, neighbor_intervals : list[OSPFIntervals] = None, dr_ids : list[int] = None) -> None:
         self.chanel = chanel
         self.router_id = router_id
-        self.adress_count = self.chanel.adress_count - 1
+        # LSAs go to every DR candidate, the DR is the one whose hellow came last, dr_id until then
+        self.dr_ids = dr_ids if not dr_ids is None else [dr_id]
+        self.adress_count = self.chanel.adress_count - len(self.dr_ids)
         self.dr_id = dr_id
         self.dr_dead = True
-        self.dr_last_hellow_sent = None
         self.dr_last_hellow_got = None
         self.neighbor_ids = neighbor_ids
+        self.neighbor_index = {neighbor_id: id for id, neighbor_id in enumerate(neighbor_ids)}
+        self.neighbor_costs = None if neighbor_costs is None else [check_cost(cost) for cost in neighbor_costs]
+        # DATA of a flow goes to one of the equal cost first hops picked by the flow hash, not always the same one
+        self.ecmp = ecmp
         self.dead = [True for i in range(len(neighbor_ids))]
-        self.last_hellow_sent = [None for i in range(len(neighbor_ids))]
         self.last_hellow_got = [None for i in range(len(neighbor_ids))]
+        # the interface to the DR and every neighbor without its own intervals take the ones of the router
+        self.intervals = intervals if not intervals is None else OSPFIntervals()
+        self.neighbor_intervals = neighbor_intervals if not neighbor_intervals is None else [self.intervals for neighbor_id in neighbor_ids]
+        self.dead_intervals = [neighbor_intervals.liveness_interval() for neighbor_intervals in self.neighbor_intervals]
+        # a failed link is down at least until held_until, hold_downs grow while it keeps failing
+        self.hold_downs = [0 for i in range(len(neighbor_ids))]
+        self.held_until = [0 for i in range(len(neighbor_ids))]
+        # interfaces with the same interval get one multicast hellow or probe, the DR goes with the router intervals
+        self.hellow_ids = {self.intervals.hellow_interval: list(self.dr_ids)}
+        self.probe_ids = {}
+        for neighbor_id, neighbor_intervals in zip(neighbor_ids, self.neighbor_intervals):
+            self.hellow_ids.setdefault(neighbor_intervals.hellow_interval, []).append(neighbor_id)
+            if not neighbor_intervals.probe_interval is None:
+                self.probe_ids.setdefault(neighbor_intervals.probe_interval, []).append(neighbor_id)
         self.topology = None
+        self.db_sequence = None
         self.shortest_paths = None
         self.shortest_paths_first = None
-        self.last_send_time = None
+        self.spf = ShortestPathTree(self.router_id, self.adress_count)
+        # entries as they were before the deltas that the shortest paths do not know of yet
+        self.topology_changes = {}
+        # destination to the neighbor slots of its first hops, None until the first DATA for it after a change
+        self.forwarding = [None] * self.adress_count
+        self.data_drops = {reason: 0 for reason in DataDrop}
+        # hellows and probes are due at once, DEAD when the first live neighbor or the DR may have died,
+        # HOLD when a held down link may come back, RESEND while a lost LSA or DB_REQUEST waits to be sent
+        # again and LSA while a new LSA waits for lsa_delay, the LSA is checked only after a change,
+        # SPF only wakes the router up for changes that wait to be taken into the shortest paths
+        self.timers = TimerScheduler()
+        for hellow_interval in self.hellow_ids:
+            self.timers.schedule((OSPFTimer.HELLOW, hellow_interval), 0)
+        for probe_interval in self.probe_ids:
+            self.timers.schedule((OSPFTimer.PROBE, probe_interval), 0)
+        self.lsa_due = True
+        # the live neighbors of the last LSA, an LSA with the same ones is only sent again when it was lost
+        self.lsa_links = None
+        self.last_lsa_time = None
+        # starts from the clock so a restarted router is not taken for an old one
+        self.lsa_sequence = time.time_ns()
         self.pending_DB_request : OSPFMessage = OSPFMessage(OSPFMessageType.DB_REQUEST, self.router_id)
-        self.data_queue = Queue()
+        self.data_queue = LocalQueue() if self.chanel.transport == ChanelTransport.LOCAL else Queue()
+        self.event_driven = event_driven
     
     def process(self):
-        time.sleep(0.0001)
-        self.send_hellow()
+        if not self.event_driven:
+            time.sleep(0.0001)
         self.process_messages()
         if (not self.topology is None) and (self.shortest_paths is None):
             self.update_shortest_paths()
-        self.update_dead()
+        elif len(self.topology_changes) > 0:
+            self.apply_changes(time.time_ns())
+        self.fire_timers(time.time_ns())
         self.send_messages()
-    
-    def send_hellow(self):
-        if (self.dr_last_hellow_sent is None) or (time.time_ns() >= self.dr_last_hellow_sent + HELLOW_INTERVAL):
-            self.dr_last_hellow_sent = time.time_ns()
-            self.chanel.put(ChanelMessage(self.dr_id, OSPFMessage(OSPFMessageType.HELLOW, self.router_id)))
-        for id, neighbor_id in enumerate(self.neighbor_ids):
-            if (self.last_hellow_sent[id] is None) or (time.time_ns() >= self.last_hellow_sent[id] + HELLOW_INTERVAL):
-                self.last_hellow_sent[id] = time.time_ns()
-                self.chanel.put(ChanelMessage(neighbor_id, OSPFMessage(OSPFMessageType.HELLOW, self.router_id)))
+
+    def fire_timers(self, now : int):
+        for timer in self.timers.pop_due(now):
+            timer, key = timer if isinstance(timer, tuple) else (timer, None)
+            if timer == OSPFTimer.HELLOW:
+                self.send_hellow(key, now)
+            elif timer == OSPFTimer.PROBE:
+                self.send_probe(key, now)
+            elif timer == OSPFTimer.DEAD:
+                self.update_dead(now)
+            elif timer == OSPFTimer.HOLD:
+                # the link comes back if its hellows kept coming while it was held down
+                if self.dead[key] and (not self.last_hellow_got[key] is None) and now < self.last_hellow_got[key] + self.dead_intervals[key]:
+                    self.link_up(key)
+            elif timer == OSPFTimer.RESEND or timer == OSPFTimer.LSA:
+                # a lost LSA is sent again once the DB still does not have it
+                self.lsa_due = True
+
+    def send_hellow(self, hellow_interval, now : int):
+        self.chanel.put_multicast(self.hellow_ids[hellow_interval], OSPFMessage(OSPFMessageType.HELLOW, self.router_id))
+        self.timers.schedule((OSPFTimer.HELLOW, hellow_interval), now + hellow_interval)
+
+    def send_probe(self, probe_interval, now : int):
+        self.chanel.put_multicast(self.probe_ids[probe_interval], OSPFMessage(OSPFMessageType.PROBE, self.router_id))
+        self.timers.schedule((OSPFTimer.PROBE, probe_interval), now + probe_interval)
+
+    def neighbor_alive(self, id : int, now : int):
+        self.last_hellow_got[id] = now
+        if not self.dead[id]:
+            self.timers.schedule_before(OSPFTimer.DEAD, now + self.dead_intervals[id])
+        elif now < self.held_until[id]:
+            if self.timers.due((OSPFTimer.HOLD, id)) is None:
+                self.timers.schedule((OSPFTimer.HOLD, id), self.held_until[id])
+        else:
+            self.link_up(id)
+
+    def link_up(self, id : int):
+        self.dead[id] = False
+        self.lsa_due = True
+        self.timers.schedule_before(OSPFTimer.DEAD, self.last_hellow_got[id] + self.dead_intervals[id])
+
+    def neighbor_failed(self, id : int, now : int):
+        self.dead[id] = True
+        self.lsa_due = True
+        intervals = self.neighbor_intervals[id]
+        if intervals.hold_down > 0:
+            # a link that fails again soon after its last hold down ended is held down twice as long
+            if now < self.held_until[id] + intervals.max_hold_down:
+                self.hold_downs[id] = min(max(2 * self.hold_downs[id], intervals.hold_down), intervals.max_hold_down)
+            else:
+                self.hold_downs[id] = intervals.hold_down
+            self.held_until[id] = now + self.hold_downs[id]
 
     def skip_messages(self):
         try:
@@ -188,109 +1331,285 @@ class OSPFRouter:
         except Empty:
             pass
 
+    def wait_time(self) -> float:
+        # seconds until the next hellow, dead interval or resend is due
+        return self.timers.wait_time(time.time_ns())
+
     def process_messages(self):
         try:
+            # the first message is waited for until the next timer when event driven
+            message : OSPFMessage = self.chanel.get(self.router_id, self.event_driven, self.wait_time()).payload
             while True:
-                message : OSPFMessage = self.chanel.get(self.router_id, False).payload
-                if message.type == OSPFMessageType.DATA:
-                    self.send_data(message)
-
-                elif message.type == OSPFMessageType.HELLOW:
-                    if message.router_id == self.dr_id:
-                        self.dr_last_hellow_got = time.time_ns()
-                    else:
-                        try:
-                            id = self.neighbor_ids.index(message.router_id)
-                            self.last_hellow_got[id] = time.time_ns()
-                        except:
-                            pass
-                elif message.type == OSPFMessageType.LSA:
-                    pass
-                elif message.type == OSPFMessageType.DB:
-                    self.pending_DB_request = None
-                    self.topology = message.payload.topology
-                    self.shortest_paths = None
-                elif message.type == OSPFMessageType.DB_REQUEST:
-                    pass
+                self.process_message(message)
+                message = self.chanel.get(self.router_id, False).payload
         except Empty:
             pass
+
+    def process_message(self, message : OSPFMessage):
+        if message.type == OSPFMessageType.DATA:
+            self.send_data(message)
+
+        elif message.type == OSPFMessageType.HELLOW:
+            if message.router_id in self.dr_ids:
+                # only the active DR sends hellows to the routers, a backup that took over is followed at once
+                self.dr_id = message.router_id
+                self.dr_last_hellow_got = time.time_ns()
+                self.dr_dead = False
+                self.timers.schedule_before(OSPFTimer.DEAD, self.dr_last_hellow_got + self.intervals.dead_interval)
+                # the DR hellow carries its DB version, a router behind it missed the last delta
+                if (not message.payload is None) and (not self.db_sequence is None) and message.payload > self.db_sequence:
+                    self.request_DB()
+            else:
+                id = self.neighbor_index.get(message.router_id)
+                if not id is None:
+                    self.neighbor_alive(id, time.time_ns())
+        elif message.type == OSPFMessageType.PROBE:
+            id = self.neighbor_index.get(message.router_id)
+            if not id is None:
+                self.neighbor_alive(id, time.time_ns())
+        elif message.type == OSPFMessageType.LSA:
+            pass
+        elif message.type == OSPFMessageType.DB:
+            data : DBData = message.payload
+            # DB versions of a DR that has since stepped down do not count
+            if message.router_id != self.dr_id:
+                pass
+            elif (self.db_sequence is None) or data.sequence >= self.db_sequence:
+                self.pending_DB_request = None
+                # entries are only ever replaced, never changed in place, so they can be shared
+                self.topology = list(data.topology)
+                self.db_sequence = data.sequence
+                self.shortest_paths = None
+                self.topology_changes = {}
+                self.forwarding = [None] * self.adress_count
+                self.lsa_due = True
+        elif message.type == OSPFMessageType.DB_DELTA:
+            data : DBDeltaData = message.payload
+            if (self.db_sequence is None) or message.router_id != self.dr_id:
+                pass
+            elif data.sequence == self.db_sequence + 1:
+                for router_id, neighbor_ids in data.entries.items():
+                    if not self.shortest_paths is None:
+                        self.topology_changes.setdefault(router_id, self.topology[router_id])
+                    self.topology[router_id] = neighbor_ids
+                if self.router_id in data.entries:
+                    self.lsa_due = True
+                self.db_sequence = data.sequence
+            elif data.sequence > self.db_sequence + 1:
+                self.request_DB()
+        elif message.type == OSPFMessageType.DB_REQUEST:
+            pass
         
+    def request_DB(self):
+        if self.pending_DB_request is None:
+            self.pending_DB_request = OSPFMessage(OSPFMessageType.DB_REQUEST, self.router_id)
+            self.timers.cancel(OSPFTimer.RESEND)
+
     def update_shortest_paths(self):
-        self.shortest_paths = [None for i in range(self.adress_count)]
-
-        visited = set()
-        pending = SimpleQueue()
-        pending.put(self.router_id)
-        visited.add(self.router_id)
-        self.shortest_paths[self.router_id] = self.router_id
-
-        while not pending.empty():
-            cur_id = pending.get()
-            for node_id in self.topology[cur_id]:
-                if (node_id in visited):
-                    continue
-                visited.add(node_id)
-                pending.put(node_id)
-                self.shortest_paths[node_id] = cur_id
-        
-        self.shortest_paths_first = [None for i in range(self.adress_count)]
-        for node_id in range(self.adress_count):
-            prev = self.shortest_paths[node_id]
-            if prev is None:
-                continue
-            self.shortest_paths_first[node_id] = node_id
-            while prev != self.router_id:
-                self.shortest_paths_first[node_id] = prev
-                prev = self.shortest_paths[prev]
-
-    def update_dead(self):
-        if (self.dr_last_hellow_got is None) or (time.time_ns() >= self.dr_last_hellow_got + DEAD_INTERVAL):
-            self.dr_dead = True
+        # the lists of the tree are kept up to date in place by later deltas
+        self.spf.build(self.topology)
+        self.shortest_paths = self.spf.previous
+        self.shortest_paths_first = self.spf.first
+        self.topology_changes = {}
+        self.forwarding = [None] * self.adress_count
+
+    def apply_changes(self, now : int):
+        self.spf.update(self.topology_changes)
+        self.topology_changes = {}
+        self.forwarding = [None] * self.adress_count
+
+    def compile_route(self, router_id : int) -> tuple:
+        # the neighbor slots DATA for router_id can leave by, kept until the shortest paths change
+        if (self.shortest_paths is None) or (self.shortest_paths[router_id] is None):
+            slots = ()
         else:
-            self.dr_dead = False
+            hops = self.spf.first_hops(router_id) if self.ecmp else [self.shortest_paths_first[router_id]]
+            slots = tuple(self.neighbor_index[neighbor_id] for neighbor_id in hops if neighbor_id in self.neighbor_index)
+        self.forwarding[router_id] = slots
+        return slots
+
+    def update_dead(self, now : int):
+        # a hellow or a probe brings a neighbor back at once, DEAD is only due at the earliest end of a dead interval
+        self.dr_dead = (self.dr_last_hellow_got is None) or (now >= self.dr_last_hellow_got + self.intervals.dead_interval)
+        next_dead = math.inf if self.dr_dead else self.dr_last_hellow_got + self.intervals.dead_interval
         for id, hellow_got in enumerate(self.last_hellow_got):
-            if (hellow_got is None) or (time.time_ns() >= hellow_got + DEAD_INTERVAL):
-                self.dead[id] = True
+            if self.dead[id]:
+                continue
+            if now >= hellow_got + self.dead_intervals[id]:
+                self.neighbor_failed(id, now)
             else:
-                self.dead[id] = False
+                next_dead = min(next_dead, hellow_got + self.dead_intervals[id])
+        if next_dead != math.inf:
+            self.timers.schedule(OSPFTimer.DEAD, next_dead)
 
     def send_messages(self):
         if self.dr_dead:
             return
+        now = time.time_ns()
         if not self.pending_DB_request is None:
-            if (self.last_send_time is None) or (time.time_ns() >= self.last_send_time + RESEND_INTERVAL):
+            if self.timers.due(OSPFTimer.RESEND) is None:
                 self.chanel.put(ChanelMessage(self.dr_id, self.pending_DB_request))
-                self.last_send_time = time.time_ns()
-        elif (not self.topology is None) and ((self.last_send_time is None) or (time.time_ns() >= self.last_send_time + RESEND_INTERVAL)):
-            for neighbor_id, dead in zip(self.neighbor_ids, self.dead):
-                if dead == (neighbor_id in self.topology[self.router_id]):
-                    live = []
-                    for neighbor_id, dead in zip(self.neighbor_ids, self.dead):
-                        if not dead:
-                            live.append(neighbor_id)
-                    self.chanel.put(ChanelMessage(self.dr_id, OSPFMessage(OSPFMessageType.LSA, self.router_id, LSAData(live))))
-                    self.last_send_time = time.time_ns()
-                    break
+                self.timers.schedule(OSPFTimer.RESEND, now + self.intervals.resend_interval)
+        elif (not self.topology is None) and self.lsa_due:
+            self.lsa_due = False
+            links = self.topology[self.router_id]
+            links = links if isinstance(links, dict) else set(links)
+            if not any(dead == (neighbor_id in links) for neighbor_id, dead in zip(self.neighbor_ids, self.dead)):
+                return
+            self.send_LSA(now)
+
+    def send_LSA(self, now : int):
+        live = [neighbor_id for neighbor_id, dead in zip(self.neighbor_ids, self.dead) if not dead]
+        if live != self.lsa_links:
+            # a change goes out at once unless the last LSA was less than lsa_delay ago
+            if (not self.last_lsa_time is None) and now < self.last_lsa_time + self.intervals.lsa_delay:
+                self.timers.schedule_before(OSPFTimer.LSA, self.last_lsa_time + self.intervals.lsa_delay)
+                return
+        elif not self.timers.due(OSPFTimer.RESEND) is None:
+            return
+        costs = None if self.neighbor_costs is None else [cost for cost, dead in zip(self.neighbor_costs, self.dead) if not dead]
+        self.lsa_sequence += 1
+        self.lsa_links = live
+        self.last_lsa_time = now
+        self.put_LSA(LSAData(live, self.lsa_sequence, costs), now)
+
+    def put_LSA(self, data : LSAData, now : int):
+        self.chanel.put_multicast(self.dr_ids, OSPFMessage(OSPFMessageType.LSA, self.router_id, data))
+        self.timers.schedule(OSPFTimer.RESEND, now + self.intervals.resend_interval)
 
     def send_data(self, message):
         if message.router_id == self.router_id:
             self.data_queue.put(message.payload)
             return
-        if (self.shortest_paths is None) or (self.shortest_paths[message.router_id] is None):
+        slots = self.forwarding[message.router_id]
+        if slots is None:
+            slots = self.compile_route(message.router_id)
+        if len(slots) == 0:
+            self.data_drops[DataDrop.NO_ROUTE] += 1
             return
 
-        neighbor_id = self.shortest_paths_first[message.router_id]
-        id = self.neighbor_ids.index(neighbor_id)
-        if self.dead[id]:
-            return
+        if len(slots) == 1 or message.flow is None:
+            id = slots[0]
+            if self.dead[id]:
+                self.data_drops[DataDrop.DEAD_NEIGHBOR] += 1
+                return
+        else:
+            # this router goes into the hash too, otherwise every router on the way would pick the same way out
+            flow_hash = hash((message.flow, self.router_id))
+            id = slots[flow_hash % len(slots)]
+            if self.dead[id]:
+                slots = [id for id in slots if not self.dead[id]]
+                if len(slots) == 0:
+                    self.data_drops[DataDrop.DEAD_NEIGHBOR] += 1
+                    return
+                id = slots[flow_hash % len(slots)]
 
-        self.chanel.put(ChanelMessage(neighbor_id, message))
+        self.chanel.put(ChanelMessage(self.neighbor_ids[id], message))
     
-    def put(self, router_id, data):
-        self.chanel.put(ChanelMessage(self.router_id, OSPFMessage(OSPFMessageType.DATA, router_id, data)))
+    def put(self, router_id, data, flow_id = 0):
+        # a flow is one stream of DATA from this router, its messages stay on one path
+        self.chanel.put(ChanelMessage(self.router_id, OSPFMessage(OSPFMessageType.DATA, router_id, data, (self.router_id, flow_id))))
     
-    def get(self):
-        return self.data_queue.get(False)
+    def get(self, block=False, timeout = None):
+        payload = self.data_queue.get(block, timeout)
+        return payload.decode() if isinstance(payload, EncodedPayload) else payload
+
+
+class OSPFFloodingRouter(OSPFRouter):
+    # a router of a network without a DR, every router floods its own LSA to its live neighbors and they flood it on.
+    # Every router keeps the newest LSA of every router as its DB, an LSA that is not newer than the one in the DB
+    # was seen already and goes no further. The LSAs new to a router go out together as one LSA message with a list
+    # of them to all its live neighbors, the neighbor they came from drops them again. A link that comes up gets
+    # the whole DB of both its ends, every router floods its LSA again after refresh_interval and drops LSAs older
+    # than max_age
+    def __init__(self, chanel : ManyWayChanel, router_id : int, neighbor_ids : list[int], event_driven : bool = False, neighbor_costs : list[int] = None, ecmp : bool = True, intervals : OSPFIntervals = None, neighbor_intervals : list[OSPFIntervals] = None) -> None:
+        super().__init__(chanel, router_id, None, neighbor_ids, event_driven, neighbor_costs, ecmp, intervals, neighbor_intervals, [])
+        # the routers nothing was heard of yet have no links, there is no DB version as every router has its own DB
+        self.topology = [[] for i in range(self.adress_count)]
+        self.lsas = [None] * self.adress_count
+        self.lsa_got = [None] * self.adress_count
+        self.flooding = []
+        # a router without live neighbors has nothing to flood, its first LSA waits lsa_delay after the start
+        # so the links that come up with the first hellows go out in one LSA
+        self.lsa_links = []
+        self.last_lsa_time = time.time_ns()
+        self.timers.schedule(OSPFTimer.RESEND, self.last_lsa_time + self.intervals.refresh_interval)
+        # the LSAs of one change come in over many process calls, SPF is due while they wait for spf_delay
+        self.last_spf_time = None
+        self.spf_delay = self.intervals.lsa_delay
+
+    def process_message(self, message : OSPFMessage):
+        if message.type == OSPFMessageType.LSA:
+            now = time.time_ns()
+            self.flooding += [lsa for lsa in message.payload if self.take_LSA(lsa, now)]
+        elif message.type == OSPFMessageType.DB:
+            # the DB of a neighbor whose link came up, the LSAs in it that are new here are flooded on too
+            now = time.time_ns()
+            data : DBData = message.payload
+            self.flooding += [lsa for lsa in data.topology if self.take_LSA(lsa, now)]
+        else:
+            super().process_message(message)
+
+    def apply_changes(self, now : int):
+        if not self.last_spf_time is None:
+            spf_due = self.last_spf_time + self.spf_delay
+            if now < spf_due:
+                self.timers.schedule_before(OSPFTimer.SPF, spf_due)
+                return
+            # changes soon after the last SPF make the next one wait twice as long, a quiet max_spf_delay resets it
+            if now < spf_due + self.intervals.max_spf_delay:
+                self.spf_delay = min(max(2 * self.spf_delay, self.intervals.lsa_delay), self.intervals.max_spf_delay)
+            else:
+                self.spf_delay = self.intervals.lsa_delay
+        self.last_spf_time = now
+        super().apply_changes(now)
+
+    def take_LSA(self, data : LSAData, now : int) -> bool:
+        known = self.lsas[data.origin_id]
+        if (not known is None) and data.sequence <= known.sequence:
+            return False
+        self.lsas[data.origin_id] = data
+        self.lsa_got[data.origin_id] = now
+        self.set_entry(data.origin_id, data.neighbor_ids if data.costs is None else data.links())
+        return True
+
+    def set_entry(self, router_id : int, entry):
+        if not self.shortest_paths is None:
+            self.topology_changes.setdefault(router_id, self.topology[router_id])
+        self.topology[router_id] = entry
+
+    def age_LSAs(self, now : int):
+        # the LSA of a router that is gone is not flooded again, it leaves the DB once it is max_age old
+        for router_id, lsa_got in enumerate(self.lsa_got):
+            if (not lsa_got is None) and router_id != self.router_id and now >= lsa_got + self.intervals.max_age:
+                self.lsas[router_id] = None
+                self.lsa_got[router_id] = None
+                self.set_entry(router_id, [])
+
+    def link_up(self, id : int):
+        super().link_up(id)
+        lsas = [lsa for lsa in self.lsas if not lsa is None]
+        if len(lsas) > 0:
+            self.chanel.put(ChanelMessage(self.neighbor_ids[id], OSPFMessage(OSPFMessageType.DB, self.router_id, DBData(lsas))))
+
+    def send_messages(self):
+        if self.lsa_due:
+            self.lsa_due = False
+            self.send_LSA(time.time_ns())
+        if len(self.flooding) > 0:
+            # the LSAs are shared by every router on the way, none of them changes one
+            live = [neighbor_id for neighbor_id, dead in zip(self.neighbor_ids, self.dead) if not dead]
+            if len(live) > 0:
+                self.chanel.put_multicast(live, OSPFMessage(OSPFMessageType.LSA, self.router_id, self.flooding))
+            self.flooding = []
+
+    def put_LSA(self, data : LSAData, now : int):
+        # RESEND is the refresh here, the DB is aged at least as often
+        data.origin_id = self.router_id
+        self.age_LSAs(now)
+        self.take_LSA(data, now)
+        self.flooding.append(data)
+        self.timers.schedule(OSPFTimer.RESEND, now + self.intervals.refresh_interval)
 
 
 
@@ -306,90 +1625,338 @@ class SelectiveRepeatMessageState(enum.Enum):
     RECEIVED = enum.auto()
     CONFIRMED = enum.auto()
 
+SELECTIVE_REPEAT_MESSAGE_STATES = {state.value: state for state in SelectiveRepeatMessageState}
+
 class SelectiveRepeatMessageType(enum.Enum):
     DATA = enum.auto()
     CONFORMATION = enum.auto()
+    CUMULATIVE_CONFORMATION = enum.auto()
+
+SELECTIVE_REPEAT_MESSAGE_TYPES = {type.value: type for type in SelectiveRepeatMessageType}
 
 class SelectiveRepeatMessage:
+    __slots__ = ('type', 'index', 'payload')
+
     def __init__(self, type : SelectiveRepeatMessageType, index : int, payload = None) -> None:
         self.type = type
         self.index = index
         self.payload = payload
 
+    def __reduce__(self):
+        return (SelectiveRepeatMessage, (self.type, self.index, self.payload))
+
 def repeat_until(work, stop) -> None:
     while(not stop.is_set()):
         work()
     return
+
+def wait_message(get, event_driven : bool, timeout_ns):
+    # event driven callers block until a message comes or timeout_ns passes, the others only peek
+    if event_driven:
+        return get(True, max(timeout_ns, 0) / 1000000000)
+    return get(False)
     
+class MessageWindow:
+    def __init__(self, data_size : int, window_size : int) -> None:
+        self.data_size = data_size
+        self.size = window_size
+        self.start = 0
+        self.states = bytearray([SelectiveRepeatMessageState.PENDING.value]) * window_size
+
+    def __len__(self) -> int:
+        return self.data_size
+
+    def __getitem__(self, pos : int) -> SelectiveRepeatMessageState:
+        if pos < self.start:
+            return SelectiveRepeatMessageState.CONFIRMED
+        if pos >= self.start + self.size:
+            return SelectiveRepeatMessageState.PENDING
+        return SELECTIVE_REPEAT_MESSAGE_STATES[self.states[pos % self.size]]
+
+    def __setitem__(self, pos : int, state : SelectiveRepeatMessageState) -> None:
+        self.states[pos % self.size] = state.value
+
+    def slot(self, pos : int) -> int:
+        return pos % self.size
+
+    def end(self) -> int:
+        return min(self.start + self.size, self.data_size)
+
+    def advance(self) -> int:
+        while self.start < self.data_size and self.states[self.start % self.size] == SelectiveRepeatMessageState.CONFIRMED.value:
+            self.states[self.start % self.size] = SelectiveRepeatMessageState.PENDING.value
+            self.start += 1
+        return self.start
+
+
 class SelectiveRepeat:
     def name():
         return 'SelectiveRepeat'
     
-    def move_window(prev_pos, message_states) -> int:
-        for pos in range(prev_pos, len(message_states)):
-            if message_states[pos] != SelectiveRepeatMessageState.CONFIRMED:
-                return pos
-        return len(message_states)
+    def move_window(window : MessageWindow) -> int:
+        return window.advance()
             
     def need_send(state : SelectiveRepeatMessageState) -> bool:
         return state != SelectiveRepeatMessageState.CONFIRMED
 
+class TimeoutPolicy(abc.ABC):
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    MAX_BACKOFF = 16
+
+    def __init__(self) -> None:
+        self.srtt_ns = None
+        self.rttvar_ns = None
+        self.samples = 0
+        self.backoffs = 0
+        self.rto_count = 0
+        self.rto_sum = 0
+        self.rto_min = None
+        self.rto_max = None
+        # the RTO is backed off for the whole sender as in RFC 6298, the next message keeps the doubled RTO
+        # until a new sample or, once there is an estimate, an ACK for new data
+        self.backoff = 0
+
+    @abc.abstractmethod
+    def current(self, backoff : int) -> int:
+        pass
+
+    def timeout(self) -> int:
+        rto = self.current(self.backoff)
+        self.rto_count += 1
+        self.rto_sum += rto
+        self.rto_min = rto if self.rto_min is None else min(self.rto_min, rto)
+        self.rto_max = rto if self.rto_max is None else max(self.rto_max, rto)
+        return rto
+
+    def on_sample(self, rtt_ns : int) -> None:
+        self.samples += 1
+        if self.srtt_ns is None:
+            self.srtt_ns = rtt_ns
+            self.rttvar_ns = rtt_ns / 2
+        else:
+            self.rttvar_ns = (1 - self.BETA) * self.rttvar_ns + self.BETA * abs(self.srtt_ns - rtt_ns)
+            self.srtt_ns = (1 - self.ALPHA) * self.srtt_ns + self.ALPHA * rtt_ns
+        self.backoff = 0
+
+    def on_progress(self) -> None:
+        # with an estimate the timeouts come from loss, without one the RTO may still be too short
+        if not self.srtt_ns is None:
+            self.backoff = 0
+
+    def on_timeout(self, armed_backoff : int = None) -> None:
+        # a timer armed before the last back off does not back off again, timers that run out together double the RTO once
+        self.backoffs += 1
+        if armed_backoff is None or armed_backoff >= self.backoff:
+            self.backoff = min(self.backoff + 1, self.MAX_BACKOFF)
+
+    def stats(self) -> list:
+        return [self.samples, self.backoffs, self.rto_sum / max(self.rto_count, 1), self.rto_min or 0, self.rto_max or 0, self.srtt_ns or 0]
+
+RTO_STATS_SIZE = 6
+
+class FixedTimeout(TimeoutPolicy):
+    def __init__(self, timeout_ns : int) -> None:
+        super().__init__()
+        # the timers are kept in integer ns arrays, a timeout like 0.01 * 1000000000 is a float
+        self.timeout_ns = int(timeout_ns)
+
+    def name(self):
+        return 'Fixed'
+
+    def current(self, backoff : int) -> int:
+        return self.timeout_ns
+
+class AdaptiveTimeout(TimeoutPolicy):
+    K = 4
+
+    def __init__(self, initial_timeout_ns : int, min_timeout_ns : int = 100000, max_timeout_ns : int = 1000000000, granularity_ns : int = 100000) -> None:
+        super().__init__()
+        self.initial_timeout_ns = initial_timeout_ns
+        self.min_timeout_ns = min_timeout_ns
+        self.max_timeout_ns = max_timeout_ns
+        self.granularity_ns = granularity_ns
+
+    def name(self):
+        return 'Adaptive'
+
+    def current(self, backoff : int) -> int:
+        if self.srtt_ns is None:
+            rto = self.initial_timeout_ns
+        else:
+            rto = max(self.min_timeout_ns, self.srtt_ns + max(self.granularity_ns, self.K * self.rttvar_ns))
+        return int(min(self.max_timeout_ns, rto * (1 << min(backoff, self.MAX_BACKOFF))))
+
+def make_timeout_policy(timeout) -> TimeoutPolicy:
+    if isinstance(timeout, TimeoutPolicy):
+        return timeout
+    return FixedTimeout(timeout)
+
 class Sender:
-    def __init__(self, timeouts, message_count) -> None:
+    def __init__(self, timeouts, message_count, rto_stats = None, event_driven : bool = False) -> None:
         self.timeouts = timeouts
         self.message_count = message_count
+        self.rto_stats = rto_stats
+        self.event_driven = event_driven
 
     def run(self, data_size : int, window_size : int, timeout_ns : int, put, get, repeat_policy, senderStoped) -> None:
-        message_states = [SelectiveRepeatMessageState.PENDING for i in range(data_size)]
+        timeout_policy = make_timeout_policy(timeout_ns)
+        window = MessageWindow(data_size, window_size)
+        send_times = array('q', [-1]) * window_size
         timeouts = 0
         message_count = 0
-        window_start = 0
         while True:
-            window_start = repeat_policy.move_window(window_start, message_states)
-            window_end = min(window_start + window_size, data_size)
+            window_start = repeat_policy.move_window(window)
+            window_end = window.end()
 
             if window_start >= data_size:
                 break
 
-            window_states = [(SelectiveRepeatMessageState.PENDING if repeat_policy.need_send(message_states[pos]) else SelectiveRepeatMessageState.CONFIRMED) for pos in range(window_start, window_end)]
-
             current_send_count = 0
 
             for pos in range(window_start, window_end):
-                if window_states[pos - window_start] == SelectiveRepeatMessageState.PENDING:
+                state = window[pos]
+                if repeat_policy.need_send(state):
+                    send_times[window.slot(pos)] = time.time_ns() if state == SelectiveRepeatMessageState.PENDING else -1
                     put(1, SelectiveRepeatMessage(SelectiveRepeatMessageType.DATA, pos))
-                    window_states[pos - window_start] = message_states[pos] = SelectiveRepeatMessageState.SENT
+                    window[pos] = SelectiveRepeatMessageState.SENT
                     message_count += 1
                     current_send_count += 1
             
+            current_timeout_ns = timeout_policy.timeout()
             last_sync_time_ns = time.time_ns()
 
-            while time.time_ns() < last_sync_time_ns + timeout_ns and current_send_count > 0:
+            while time.time_ns() < last_sync_time_ns + current_timeout_ns and current_send_count > 0:
                 try:
-                    message : SelectiveRepeatMessage = get()
+                    message : SelectiveRepeatMessage = wait_message(get, self.event_driven, last_sync_time_ns + current_timeout_ns - time.time_ns())
                     if message.type == SelectiveRepeatMessageType.CONFORMATION:
-                        if message.index in range(window_start, window_end):
-                            if window_states[message.index - window_start] == SelectiveRepeatMessageState.SENT:
-                                window_states[message.index - window_start] = message_states[message.index] = SelectiveRepeatMessageState.CONFIRMED
-                                current_send_count -= 1
-                                last_sync_time_ns = time.time_ns()
+                        confirmed = [message.index] if message.index in range(window_start, window_end) else []
+                    elif message.type == SelectiveRepeatMessageType.CUMULATIVE_CONFORMATION:
+                        # every message before the index got through
+                        confirmed = range(window_start, min(message.index, window_end))
+                    else:
+                        confirmed = []
+                    for pos in confirmed:
+                        if window[pos] == SelectiveRepeatMessageState.SENT:
+                            window[pos] = SelectiveRepeatMessageState.CONFIRMED
+                            current_send_count -= 1
+                            last_sync_time_ns = time.time_ns()
+                            if send_times[window.slot(pos)] >= 0:
+                                timeout_policy.on_sample(last_sync_time_ns - send_times[window.slot(pos)])
+                            timeout_policy.on_progress()
+                            current_timeout_ns = timeout_policy.timeout()
                 except Empty:
                     pass
             if current_send_count > 0:
                 timeouts += 1
+                timeout_policy.on_timeout()
         senderStoped.set()
         with self.timeouts.get_lock():
             self.timeouts.value = timeouts
         with self.message_count.get_lock():
             self.message_count.value = message_count
+        if not self.rto_stats is None:
+            self.rto_stats[:] = timeout_policy.stats()
         
+class SlidingSender:
+    def __init__(self, timeouts, message_count, rto_stats = None, event_driven : bool = False) -> None:
+        self.timeouts = timeouts
+        self.message_count = message_count
+        self.rto_stats = rto_stats
+        self.event_driven = event_driven
+
+    def run(self, data_size : int, window_size : int, timeout_ns : int, put, get, repeat_policy, senderStoped) -> None:
+        timeout_policy = make_timeout_policy(timeout_ns)
+        window = MessageWindow(data_size, window_size)
+        deadlines = array('q', [-1]) * window_size
+        send_times = array('q', [-1]) * window_size
+        timers = []
+        go_back = repeat_policy.need_send(SelectiveRepeatMessageState.CONFIRMED)
+        timeouts = 0
+        message_count = 0
+        next_pos = 0
+
+        def send(pos):
+            now = time.time_ns()
+            slot = window.slot(pos)
+            # Karn's rule: only messages sent exactly once give a round trip sample
+            if window[pos] == SelectiveRepeatMessageState.PENDING:
+                send_times[slot] = now
+            else:
+                send_times[slot] = -1
+            put(1, SelectiveRepeatMessage(SelectiveRepeatMessageType.DATA, pos))
+            if window[pos] != SelectiveRepeatMessageState.CONFIRMED:
+                window[pos] = SelectiveRepeatMessageState.SENT
+            deadlines[slot] = now + timeout_policy.timeout()
+            heapq.heappush(timers, (deadlines[slot], pos, timeout_policy.backoff))
+
+        def confirm(pos):
+            if window[pos] == SelectiveRepeatMessageState.SENT:
+                if send_times[window.slot(pos)] >= 0:
+                    timeout_policy.on_sample(time.time_ns() - send_times[window.slot(pos)])
+                timeout_policy.on_progress()
+            window[pos] = SelectiveRepeatMessageState.CONFIRMED
+
+        while True:
+            window_start = repeat_policy.move_window(window)
+            if window_start >= data_size:
+                break
+
+            while next_pos < window.end():
+                send(next_pos)
+                message_count += 1
+                next_pos += 1
+
+            try:
+                message : SelectiveRepeatMessage = wait_message(get, self.event_driven, timers[0][0] - time.time_ns() if len(timers) > 0 else CHANEL_IDLE_WAIT_NS)
+                if message.type == SelectiveRepeatMessageType.CONFORMATION:
+                    if message.index in range(window_start, next_pos):
+                        confirm(message.index)
+                elif message.type == SelectiveRepeatMessageType.CUMULATIVE_CONFORMATION:
+                    for pos in range(window_start, min(message.index, next_pos)):
+                        confirm(pos)
+            except Empty:
+                pass
+
+            now = time.time_ns()
+            while len(timers) > 0 and timers[0][0] <= now:
+                deadline, pos, armed_backoff = heapq.heappop(timers)
+                if window[pos] != SelectiveRepeatMessageState.SENT or deadlines[window.slot(pos)] != deadline:
+                    continue
+                timeouts += 1
+                timeout_policy.on_timeout(armed_backoff)
+                for resend_pos in range(pos, next_pos if go_back else pos + 1):
+                    send(resend_pos)
+                    message_count += 1
+        senderStoped.set()
+        with self.timeouts.get_lock():
+            self.timeouts.value = timeouts
+        with self.message_count.get_lock():
+            self.message_count.value = message_count
+        if not self.rto_stats is None:
+            self.rto_stats[:] = timeout_policy.stats()
+
 class Receiver:
+    def __init__(self, cumulative : bool = False, event_driven : bool = False) -> None:
+        self.cumulative = cumulative
+        self.event_driven = event_driven
+
     def run(self, put, get, senderStoped) -> None:
+        received = set()
+        next_expected = 0
         while not senderStoped.is_set():
             try:
-                message : SelectiveRepeatMessage = get()
+                message : SelectiveRepeatMessage = wait_message(get, self.event_driven, CHANEL_IDLE_WAIT_NS)
                 if message.type == SelectiveRepeatMessageType.DATA:
-                    put(0, SelectiveRepeatMessage(SelectiveRepeatMessageType.CONFORMATION, message.index))
+                    if not self.cumulative:
+                        put(0, SelectiveRepeatMessage(SelectiveRepeatMessageType.CONFORMATION, message.index))
+                        continue
+                    if message.index >= next_expected:
+                        received.add(message.index)
+                    while next_expected in received:
+                        received.remove(next_expected)
+                        next_expected += 1
+                    put(0, SelectiveRepeatMessage(SelectiveRepeatMessageType.CUMULATIVE_CONFORMATION, next_expected))
             except Empty:
                 pass
 
@@ -400,8 +1967,9 @@ def main():
 
     timeouts = Value(ctypes.c_uint32)
     message_count = Value(ctypes.c_uint32)
+    rto_stats = Array(ctypes.c_double, RTO_STATS_SIZE)
 
-    sender = Sender(timeouts, message_count)
+    sender = Sender(timeouts, message_count, rto_stats)
     receiver = Receiver()
 
     data_size = 1000
@@ -414,13 +1982,15 @@ def main():
         
         resultsK = []
         resultsTime = []
+        resultsRTO = []
 
         for i, loss_prob in enumerate(loss_probs):
             resultsK.append([])
             resultsTime.append([])
+            resultsRTO.append([])
 
             chanelStoped.clear()
-            forwardChanel = ManyWayChanel(8, 0, loss_prob, np.random.rand)
+            forwardChanel = ManyWayChanel(8, 0, loss_prob, RandomBlock())
             forwardChanelThread = Process(target=repeat_until, args=(forwardChanel.process, chanelStoped))
             forwardChanelThread.start()
 
@@ -480,10 +2050,12 @@ def main():
 
                 resultsK[i].append(data_size / message_count.value)
                 resultsTime[i].append(time.time() - start_time)
+                resultsRTO[i].append(rto_stats[2] / 1000000)
             
             chanelStoped.set()
 
             forwardChanelThread.join()
+            forwardChanel.close()
             print("join forwardChanelThread")
             
         
@@ -495,6 +2067,10 @@ def main():
         for i, loss_prob in enumerate(loss_probs):
             print(*([loss_prob] + resultsTime[i]), sep = ';')
 
+        print(*([policy.name()] + window_sizes), sep = ';')
+        for i, loss_prob in enumerate(loss_probs):
+            print(*([loss_prob] + resultsRTO[i]), sep = ';')
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
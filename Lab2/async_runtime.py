@@ -0,0 +1,74 @@
+import asyncio
+from queue import Empty
+from OSPF import ManyWayChanel, OSPFRouter, ChanelTransport
+
+
+class AsyncRuntime:
+    # runs the chanel, the DR and the routers as coroutines of one event loop, a node sleeps until its
+    # queue gets a message or its own next timer is due, so hundreds of routers fit into one process
+    def __init__(self, chanel : ManyWayChanel) -> None:
+        if chanel.transport != ChanelTransport.LOCAL:
+            raise ValueError(f"Chanel has to use the local transport")
+        self.chanel = chanel
+        self.nodes = [(chanel, chanel.input_queue)]
+        self.wakeups = {}
+        self.tasks = []
+        self.stopped = False
+        self.stopped_nodes = set()
+
+    def add(self, node) -> None:
+        # a router or a DR, it is woken up by its own output queue of the chanel
+        self.nodes.append((node, self.chanel.output_queues[node.router_id]))
+
+    def wakeup(self, queue) -> asyncio.Event:
+        if not id(queue) in self.wakeups:
+            ready = asyncio.Event()
+            queue.notify = ready.set
+            self.wakeups[id(queue)] = ready
+        return self.wakeups[id(queue)]
+
+    def start(self) -> None:
+        for node, queue in self.nodes:
+            self.tasks.append(asyncio.create_task(self.run_node(node, self.wakeup(queue))))
+
+    async def run_node(self, node, ready : asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        while not self.stopped and not id(node) in self.stopped_nodes:
+            # nothing else runs until the next await, so process sees everything that woke the node up
+            ready.clear()
+            node.process()
+            timer = loop.call_later(node.wait_time(), ready.set)
+            await ready.wait()
+            timer.cancel()
+
+    async def get(self, router : OSPFRouter, timeout : float = None):
+        # waits for data delivered to the router without blocking the loop
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        ready = self.wakeup(router.data_queue)
+        while True:
+            try:
+                return router.get(False)
+            except Empty:
+                pass
+            if not deadline is None and loop.time() >= deadline:
+                raise Empty
+            ready.clear()
+            timer = None if deadline is None else loop.call_later(deadline - loop.time(), ready.set)
+            await ready.wait()
+            if not timer is None:
+                timer.cancel()
+
+    def stop_node(self, node) -> None:
+        # the node stops as if it failed, messages for it pile up in its queue
+        self.stopped_nodes.add(id(node))
+        for other, queue in self.nodes:
+            if other is node:
+                self.wakeup(queue).set()
+
+    async def stop(self) -> None:
+        self.stopped = True
+        for ready in self.wakeups.values():
+            ready.set()
+        await asyncio.gather(*self.tasks)
+        self.tasks = []
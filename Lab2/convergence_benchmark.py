@@ -0,0 +1,95 @@
+import asyncio
+import pickle
+import time
+from OSPF import ManyWayChanel, ChanelMessage, ChanelMulticast, OSPFMessageType, ChanelTransport
+from async_runtime import AsyncRuntime
+from topology import TOPOLOGIES, make_topology, make_network, link_count
+
+
+class CountingChanel(ManyWayChanel):
+    # counts the messages of every type that enter the chanel and the bytes they take pickled
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.counts = {message_type: 0 for message_type in OSPFMessageType}
+        self.sizes = {message_type: 0 for message_type in OSPFMessageType}
+
+    def schedule(self, msgs : list) -> None:
+        # a DB batch shares one payload, it is pickled once, a multicast counts once for every adress
+        sizes = {}
+        for msg in msgs:
+            if not id(msg.payload) in sizes:
+                sizes[id(msg.payload)] = len(pickle.dumps(ChanelMessage(0, msg.payload), pickle.HIGHEST_PROTOCOL))
+            deliveries = len(msg.adress_ids) if isinstance(msg, ChanelMulticast) else 1
+            self.counts[msg.payload.type] += deliveries
+            self.sizes[msg.payload.type] += sizes[id(msg.payload)] * deliveries
+        super().schedule(msgs)
+
+
+def converged(routers : list, expected : list[set], skip_ids : set = set()) -> bool:
+    # every router got the DB of the real topology and computed its shortest paths,
+    # routers at the same DB version hold the same DB so every version is compared once,
+    # routers that flood LSAs without a DR have no DB version, their entries are the neighbor lists of the LSAs
+    # they share so every list is compared once
+    checked = {}
+    checked_entries = {}
+    for router in routers:
+        if router.router_id in skip_ids:
+            continue
+        if router.topology is None or router.shortest_paths is None:
+            return False
+        if router.db_sequence is None:
+            for entry_id, (known, router_neighbors) in enumerate(zip(expected, router.topology)):
+                key = (entry_id, id(router_neighbors))
+                if not key in checked_entries:
+                    checked_entries[key] = set(router_neighbors) == known
+                if not checked_entries[key]:
+                    return False
+            continue
+        if not router.db_sequence in checked:
+            checked[router.db_sequence] = all(set(router_neighbors) == known for known, router_neighbors in zip(expected, router.topology))
+        if not checked[router.db_sequence]:
+            return False
+    return True
+
+
+async def run_convergence(neighbors : list[list[int]], timeout_s : float, check_interval : float):
+    start_time = time.time()
+    chanel, drs, routers = make_network(neighbors, ChanelTransport.LOCAL, True, chanel_type=CountingChanel)
+    runtime = AsyncRuntime(chanel)
+    for node in drs + routers:
+        runtime.add(node)
+    runtime.start()
+
+    expected = [set(router_neighbors) for router_neighbors in neighbors]
+    done = False
+    while not done and time.time() - start_time < timeout_s:
+        await asyncio.sleep(check_interval)
+        done = converged(routers, expected)
+    convergence_s = time.time() - start_time
+    counts = dict(chanel.counts)
+    sizes = dict(chanel.sizes)
+
+    await runtime.stop()
+    return done, convergence_s, counts, sizes
+
+
+def measure(name : str, router_count : int, seed = 0, timeout_s : float = 60.0, check_interval : float = 0.05):
+    neighbors = make_topology(name, router_count, seed)
+    done, convergence_s, counts, sizes = asyncio.run(run_convergence(neighbors, timeout_s, check_interval))
+    return link_count(neighbors), done, convergence_s, counts, sizes
+
+
+def main():
+    router_counts = [100, 300, 1000]
+
+    print('topology', 'routers', 'links', 'converged', 'convergence s', 'LSA', 'DB', 'DB_DELTA', 'DB_REQUEST', 'HELLOW', 'LSA bytes', 'DB bytes', 'DB_DELTA bytes', 'total bytes', sep = ';')
+    for name in TOPOLOGIES:
+        for router_count in router_counts:
+            links, done, convergence_s, counts, sizes = measure(name, router_count)
+            print(name, router_count, links, done, convergence_s,
+                  counts[OSPFMessageType.LSA], counts[OSPFMessageType.DB], counts[OSPFMessageType.DB_DELTA], counts[OSPFMessageType.DB_REQUEST], counts[OSPFMessageType.HELLOW],
+                  sizes[OSPFMessageType.LSA], sizes[OSPFMessageType.DB], sizes[OSPFMessageType.DB_DELTA], sum(sizes.values()), sep = ';')
+
+
+if __name__ == '__main__':
+    main()
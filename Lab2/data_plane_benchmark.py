@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import os
+import time
+import numpy as np
+from queue import Empty
+from OSPF import ManyWayChanel, ChanelMessage, OSPFMessageType, DataDrop, ChanelTransport
+from async_runtime import AsyncRuntime
+from topology import make_topology, make_network
+from db_volume_benchmark import wait_converged
+
+
+SUMMARY_FIELDS = ['label', 'scenario', 'routers', 'flows', 'sent', 'delivered', 'min flow goodput msg/s', 'median flow goodput msg/s', 'mean flow goodput msg/s',
+                  'mean hops', 'hop counts', 'latency p50 ms', 'latency p90 ms', 'latency p99 ms', 'latency max ms', 'no route', 'dead neighbor', 'chanel loss', 'not delivered else']
+FLOW_FIELDS = ['label', 'scenario', 'flow', 'source', 'destination', 'sent', 'delivered', 'goodput msg/s', 'mean hops', 'latency p50 ms', 'latency p99 ms']
+
+
+class DataChanel(ManyWayChanel):
+    # counts the times every DATA is put into the chanel and the DATA the chanel loses, a router puts new DATA
+    # to itself first so the hops of a DATA are one less than its count
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.crossings = {}
+        self.lost = 0
+
+    def schedule(self, msgs : list) -> None:
+        for msg in msgs:
+            if isinstance(msg, ChanelMessage) and msg.payload.type == OSPFMessageType.DATA:
+                key = msg.payload.payload
+                self.crossings[key] = self.crossings.get(key, 0) + 1
+                flying_count = self.flying_count
+                super().schedule([msg])
+                if self.flying_count == flying_count:
+                    self.lost += 1
+            else:
+                super().schedule([msg])
+
+
+async def send_flow(router, destination_id : int, flow_id : int, send_interval : float, sent : dict, stop : asyncio.Event):
+    sequence = 0
+    while not stop.is_set():
+        sent[(flow_id, sequence)] = time.perf_counter()
+        router.put(destination_id, (flow_id, sequence), flow_id)
+        sequence += 1
+        await asyncio.sleep(send_interval)
+
+
+async def receive_flows(runtime : AsyncRuntime, router, received : dict, stop : asyncio.Event):
+    # every flow that ends at the router, a DATA the chanel duplicated is taken once
+    while not stop.is_set():
+        try:
+            key = await runtime.get(router, 0.05)
+            received.setdefault(key, time.perf_counter())
+        except Empty:
+            pass
+
+
+def make_flows(router_count : int, flow_count : int, skip_ids : set, rng) -> list[tuple[int, int]]:
+    router_ids = [router_id for router_id in range(router_count) if not router_id in skip_ids]
+    flows = []
+    while len(flows) < flow_count:
+        source_id, destination_id = rng.choice(router_ids, 2, replace=False)
+        flows.append((int(source_id), int(destination_id)))
+    return flows
+
+
+async def run_scenario(neighbors : list[list[int]], flows : list[tuple[int, int]], cold : bool, loss_probability : float, failed_id : int, send_s : float, send_interval : float, drain_s : float, timeout_s : float, check_interval : float):
+    # the flows start once the routers converged or at once on a cold start, the loss of the chanel hits the
+    # control messages as well, a failed router stops a third into the flows
+    chanel, drs, routers = make_network(neighbors, ChanelTransport.LOCAL, True, loss_probability=loss_probability, chanel_type=DataChanel)
+    runtime = AsyncRuntime(chanel)
+    for node in drs + routers:
+        runtime.add(node)
+    runtime.start()
+    if not cold:
+        await wait_converged(routers, [set(router_neighbors) for router_neighbors in neighbors], set(), timeout_s, check_interval)
+
+    sent = {}
+    received = {}
+    stop_sending = asyncio.Event()
+    stop_receiving = asyncio.Event()
+    tasks = [asyncio.create_task(send_flow(routers[source_id], destination_id, flow_id, send_interval, sent, stop_sending)) for flow_id, (source_id, destination_id) in enumerate(flows)]
+    tasks += [asyncio.create_task(receive_flows(runtime, routers[destination_id], received, stop_receiving)) for destination_id in sorted({destination_id for source_id, destination_id in flows})]
+    if failed_id is None:
+        await asyncio.sleep(send_s)
+    else:
+        await asyncio.sleep(send_s / 3)
+        runtime.stop_node(routers[failed_id])
+        await asyncio.sleep(send_s - send_s / 3)
+    stop_sending.set()
+    # the DATA still on its way is not lost
+    await asyncio.sleep(drain_s)
+    stop_receiving.set()
+    await asyncio.gather(*tasks)
+    await runtime.stop()
+
+    drops = {reason: sum(router.data_drops[reason] for router in routers) for reason in DataDrop}
+    return sent, received, chanel.crossings, drops, chanel.lost
+
+
+def percentiles(values : list, qs : list) -> list:
+    return [float(value) for value in np.percentile(values, qs)] if len(values) > 0 else ['' for q in qs]
+
+
+def summarize(flows : list[tuple[int, int]], send_s : float, sent : dict, received : dict, crossings : dict, drops : dict, lost : int):
+    latencies = {flow_id: [] for flow_id in range(len(flows))}
+    hops = {flow_id: [] for flow_id in range(len(flows))}
+    sent_counts = [0] * len(flows)
+    for key in sent:
+        sent_counts[key[0]] += 1
+    for key, received_time in received.items():
+        latencies[key[0]].append((received_time - sent[key]) * 1000)
+        hops[key[0]].append(crossings[key] - 1)
+
+    flow_rows = []
+    for flow_id, (source_id, destination_id) in enumerate(flows):
+        flow_hops = hops[flow_id]
+        flow_rows.append([flow_id, source_id, destination_id, sent_counts[flow_id], len(latencies[flow_id]), len(latencies[flow_id]) / send_s,
+                          sum(flow_hops) / len(flow_hops) if len(flow_hops) > 0 else '', *percentiles(latencies[flow_id], [50, 99])])
+
+    goodputs = [row[5] for row in flow_rows]
+    all_hops = [hop for flow_hops in hops.values() for hop in flow_hops]
+    hop_counts = ' '.join(f'{hop}:{count}' for hop, count in zip(*np.unique(all_hops, return_counts=True)))
+    all_latencies = [latency for flow_latencies in latencies.values() for latency in flow_latencies]
+    # the DATA for a failed router or stuck in it and the DATA that is still on its way at the end
+    not_delivered = len(sent) - len(received) - sum(drops.values()) - lost
+    summary = [len(flows), len(sent), len(received), min(goodputs), float(np.median(goodputs)), sum(goodputs) / len(goodputs),
+               sum(all_hops) / len(all_hops) if len(all_hops) > 0 else '', hop_counts, *percentiles(all_latencies, [50, 90, 99, 100]),
+               drops[DataDrop.NO_ROUTE], drops[DataDrop.DEAD_NEIGHBOR], lost, not_delivered]
+    return summary, flow_rows
+
+
+def write_rows(path : str, fields : list[str], rows : list) -> None:
+    # the rows of every run are appended so runs of different changes can be compared, a new file gets the fields first
+    new = not os.path.exists(path)
+    with open(path, "at") as out:
+        if new:
+            print(*fields, sep = ';', file=out)
+        for row in rows:
+            print(*row, sep = ';', file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    # the rows only go to files when their paths are given, the summary is printed either way
+    parser.add_argument("--results", default=None)
+    parser.add_argument("--flows", default=None)
+    parser.add_argument("--label", default=time.strftime("%Y-%m-%d %H:%M:%S"))
+    args = parser.parse_args()
+
+    seed = 0
+    router_count = 100
+    flow_count = 50
+    send_s = 3.0
+    send_interval = 0.02
+    drain_s = 0.5
+    timeout_s = 30.0
+    check_interval = 0.05
+    # the router in the middle of the grid, the most flows go through it
+    width = int(np.ceil(np.sqrt(router_count)))
+    failed_id = width * (width // 2) + width // 2
+    scenarios = {
+        'steady': (False, 0.0, None),
+        'cold start': (True, 0.0, None),
+        'lossy chanel': (False, 0.02, None),
+        'router failure': (False, 0.0, failed_id),
+    }
+
+    neighbors = make_topology('grid', router_count, seed)
+    # every scenario has the same flows, none of them starts or ends at the router that fails
+    flows = make_flows(router_count, flow_count, {failed_id}, np.random.default_rng(seed))
+    summary_rows = []
+    flow_rows = []
+    print(*SUMMARY_FIELDS[1:], sep = ';')
+    for name, (cold, loss_probability, scenario_failed_id) in scenarios.items():
+        sent, received, crossings, drops, lost = asyncio.run(run_scenario(neighbors, flows, cold, loss_probability, scenario_failed_id, send_s, send_interval, drain_s, timeout_s, check_interval))
+        summary, rows = summarize(flows, send_s, sent, received, crossings, drops, lost)
+        print(name, router_count, *summary, sep = ';')
+        summary_rows.append([args.label, name, router_count, *summary])
+        flow_rows += [[args.label, name, *row] for row in rows]
+    if not args.results is None:
+        write_rows(args.results, SUMMARY_FIELDS, summary_rows)
+    if not args.flows is None:
+        write_rows(args.flows, FLOW_FIELDS, flow_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import asyncio
+import pickle
+import time
+from OSPF import ChanelMessage, OSPFMessage, OSPFMessageType, DBData, ChanelTransport
+from async_runtime import AsyncRuntime
+from topology import make_topology, make_network
+from convergence_benchmark import CountingChanel, converged
+
+
+async def wait_converged(routers : list, expected : list[set], skip_ids : set, timeout_s : float, check_interval : float) -> float:
+    start_time = time.time()
+    while time.time() - start_time < timeout_s:
+        await asyncio.sleep(check_interval)
+        if converged(routers, expected, skip_ids):
+            return time.time() - start_time
+    return None
+
+
+async def run_change(neighbors : list[list[int]], failed_id : int, timeout_s : float, check_interval : float):
+    # converges, fails one router and counts the DB traffic until the others agree on the new topology
+    chanel, drs, routers = make_network(neighbors, ChanelTransport.LOCAL, True, chanel_type=CountingChanel)
+    runtime = AsyncRuntime(chanel)
+    for node in drs + routers:
+        runtime.add(node)
+    runtime.start()
+
+    expected = [set(router_neighbors) for router_neighbors in neighbors]
+    initial_s = await wait_converged(routers, expected, set(), timeout_s, check_interval)
+    counts = dict(chanel.counts)
+    sizes = dict(chanel.sizes)
+
+    runtime.stop_node(routers[failed_id])
+    # the DR keeps the last LSA of the failed router, its neighbors drop it
+    for neighbor_id in neighbors[failed_id]:
+        expected[neighbor_id].discard(failed_id)
+    change_s = await wait_converged(routers, expected, {failed_id}, timeout_s, check_interval)
+    changes = {message_type: chanel.counts[message_type] - counts[message_type] for message_type in OSPFMessageType}
+    change_sizes = {message_type: chanel.sizes[message_type] - sizes[message_type] for message_type in OSPFMessageType}
+
+    # what broadcasting the whole DB to every router would cost per DB version
+    dr = drs[0]
+    full_db = ChanelMessage(0, OSPFMessage(OSPFMessageType.DB, dr.router_id, DBData([sorted(neighbor_ids) for neighbor_ids in dr.topology], dr.db_sequence)))
+    full_broadcast = len(pickle.dumps(full_db, pickle.HIGHEST_PROTOCOL)) * len(routers)
+
+    await runtime.stop()
+    return initial_s, change_s, changes, change_sizes, full_broadcast
+
+
+def main():
+    router_counts = [100, 300, 1000]
+    name = 'grid'
+    seed = 0
+    timeout_s = 60.0
+    check_interval = 0.05
+
+    print('topology', 'routers', 'initial convergence s', 'change convergence s', 'DB versions', 'DB_DELTA bytes', 'DB bytes', 'LSA bytes', 'full DB broadcast bytes', 'full DB bytes per version / delta bytes per version', sep = ';')
+    for router_count in router_counts:
+        neighbors = make_topology(name, router_count, seed)
+        initial_s, change_s, changes, change_sizes, full_broadcast = asyncio.run(run_change(neighbors, router_count // 2, timeout_s, check_interval))
+        versions = changes[OSPFMessageType.DB_DELTA] // router_count
+        delta_per_version = change_sizes[OSPFMessageType.DB_DELTA] / max(versions, 1)
+        print(name, router_count, initial_s, change_s, versions, change_sizes[OSPFMessageType.DB_DELTA], change_sizes[OSPFMessageType.DB], change_sizes[OSPFMessageType.LSA], full_broadcast, full_broadcast / max(delta_per_version, 1), sep = ';')
+
+
+if __name__ == '__main__':
+    main()
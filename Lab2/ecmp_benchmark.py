@@ -0,0 +1,105 @@
+import time
+import ctypes
+from multiprocessing import Process, Event, Value
+from queue import Empty
+from impairments import Bandwidth
+from OSPF import SlidingSender, Receiver, SelectiveRepeat, AdaptiveTimeout, repeat_until
+from topology import parallel_paths, make_network
+
+
+class PortBandwidth(Bandwidth):
+    # only the given ports are slow links, the routers in the middle here
+    def __init__(self, bandwidth_bps : int, message_size : int, ports) -> None:
+        super().__init__(bandwidth_bps, message_size)
+        self.ports = set(ports)
+
+    def apply(self, deliveries : list, rand, port : int = 0) -> list:
+        if not port in self.ports:
+            return deliveries
+        return super().apply(deliveries, rand, port)
+
+
+class FlowPort:
+    # the Sender and the Receiver put to routers 1 and 0, a flow port sends to its peer instead
+    def __init__(self, router, peer_id : int) -> None:
+        self.router = router
+        self.peer_id = peer_id
+
+    def put(self, router_id, data) -> None:
+        self.router.put(self.peer_id, data)
+
+    def get(self, block=False, timeout = None):
+        return self.router.get(block, timeout)
+
+
+def measure(pair_count : int, path_count : int, ecmp : bool, data_size : int, window : int, bandwidth_bps : int, converge_timeout_s : float = 30.0):
+    neighbors = parallel_paths(pair_count, path_count)
+    middle_ids = range(2 * pair_count, 2 * pair_count + path_count)
+    chanel, drs, routers = make_network(neighbors, event_driven=True, ecmp=ecmp, impairments=[PortBandwidth(bandwidth_bps, 64, middle_ids)])
+    stop = Event()
+    threads = [Process(target=repeat_until, args=(node.process, stop)) for node in [chanel] + drs + routers]
+    for thread in threads:
+        thread.start()
+
+    # every pair has to reach each other before the transfers start
+    start_time = time.time()
+    for source_id in range(pair_count):
+        converged = False
+        while not converged and time.time() - start_time < converge_timeout_s:
+            routers[source_id].put(pair_count + source_id, None)
+            try:
+                routers[pair_count + source_id].get(True, 0.1)
+                converged = True
+            except Empty:
+                pass
+        while True:
+            try:
+                routers[pair_count + source_id].get(True, 0.1)
+            except Empty:
+                break
+
+    flows = []
+    message_counts = []
+    for source_id in range(pair_count):
+        sender_port = FlowPort(routers[source_id], pair_count + source_id)
+        receiver_port = FlowPort(routers[pair_count + source_id], source_id)
+        senderStoped = Event()
+        message_count = Value(ctypes.c_uint32)
+        message_counts.append(message_count)
+        sender = SlidingSender(Value(ctypes.c_uint32), message_count, None, True)
+        # the timeout does not go below 200 ms, the queues in the middle keep the round trip near the adapted
+        # timeout and each spurious resend only adds to them
+        flows.append((Process(target=sender.run, args=(data_size, window, AdaptiveTimeout(200000000, 200000000), sender_port.put, sender_port.get, SelectiveRepeat, senderStoped)), senderStoped))
+        flows.append((Process(target=Receiver(False, True).run, args=(receiver_port.put, receiver_port.get, senderStoped)), senderStoped))
+
+    start_time = time.time()
+    for thread, senderStoped in flows:
+        thread.start()
+    for thread, senderStoped in flows:
+        thread.join()
+    elapsed = time.time() - start_time
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    sent = sum(message_count.value for message_count in message_counts)
+    return elapsed, pair_count * data_size / elapsed, pair_count * data_size / sent
+
+
+def main():
+    pair_count = 4
+    data_size = 200
+    window = 4
+    # 5 ms to send one message through a router in the middle, the queue in front of it has no limit
+    # so a larger load only piles up delay there and the hellows behind it make the routers flap
+    bandwidth_bps = 102400
+
+    print('paths', 'ecmp', 'transfer s', 'aggregate goodput messages/s', 'K', sep = ';')
+    for path_count in [1, 2, 4]:
+        for ecmp in [False, True]:
+            elapsed, goodput, k = measure(pair_count, path_count, ecmp, data_size, window, bandwidth_bps)
+            print(path_count, ecmp, elapsed, goodput, k, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
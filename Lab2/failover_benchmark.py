@@ -0,0 +1,77 @@
+import asyncio
+import time
+from OSPF import OSPFIntervals, ChanelTransport
+from async_runtime import AsyncRuntime
+from topology import make_topology, make_network
+from convergence_benchmark import converged
+
+
+async def wait_until(condition, timeout_s : float, check_interval : float) -> float:
+    start_time = time.time()
+    while time.time() - start_time < timeout_s:
+        if condition():
+            return time.time() - start_time
+        await asyncio.sleep(check_interval)
+    return None
+
+
+async def run_failover(neighbors : list[list[int]], dr_count : int, intervals : OSPFIntervals, failed_id : int, settle_s : float, timeout_s : float, check_interval : float):
+    # converges, stops the DR and a moment later a router, the routers have to learn of the router through the backup
+    chanel, drs, routers = make_network(neighbors, ChanelTransport.LOCAL, True, intervals=intervals, dr_count=dr_count)
+    runtime = AsyncRuntime(chanel)
+    for node in drs + routers:
+        runtime.add(node)
+    runtime.start()
+
+    expected = [set(router_neighbors) for router_neighbors in neighbors]
+    initial_s = await wait_until(lambda: converged(routers, expected), timeout_s, check_interval)
+    # the first SPF builds of a large network hold up the loop for about a dead interval, some hellows come
+    # late then and links flap for a while, the DR only fails once that is over
+    await asyncio.sleep(settle_s)
+    await wait_until(lambda: converged(routers, expected), timeout_s, check_interval)
+
+    runtime.stop_node(drs[0])
+    start_time = time.time()
+    await asyncio.sleep(0.1)
+    runtime.stop_node(routers[failed_id])
+    for neighbor_id in neighbors[failed_id]:
+        expected[neighbor_id].discard(failed_id)
+
+    live = [router for router in routers if router.router_id != failed_id]
+    backup_ids = {backup.router_id for backup in drs[1:]}
+    takeover_s = None
+    follow_s = None
+    if len(backup_ids) > 0:
+        await wait_until(lambda: any(backup.active for backup in drs[1:]), timeout_s, check_interval)
+        takeover_s = time.time() - start_time
+        await wait_until(lambda: all(router.dr_id in backup_ids and not router.dr_dead for router in live), timeout_s, check_interval)
+        follow_s = time.time() - start_time
+    change_s = await wait_until(lambda: converged(routers, expected, {failed_id}), timeout_s, check_interval)
+    change_s = None if change_s is None else time.time() - start_time
+
+    await runtime.stop()
+    return initial_s, takeover_s, follow_s, change_s
+
+
+def main():
+    seed = 0
+    settle_s = 3.0
+    timeout_s = 15.0
+    check_interval = 0.02
+    # a thousand routers in one loop hold it up for longer than the default dead interval now and then
+    intervals = {
+        100: OSPFIntervals(),
+        300: OSPFIntervals(),
+        1000: OSPFIntervals(hellow_interval = 1.0 * 1000000000, dead_interval = 4.0 * 1000000000),
+    }
+
+    print('routers', 'DR candidates', 'dead interval s', 'initial convergence s', 'backup takes over s', 'all routers follow s', 'router failure known s', sep = ';')
+    for router_count, router_intervals in intervals.items():
+        neighbors = make_topology('grid', router_count, seed)
+        for dr_count in [1, 2]:
+            initial_s, takeover_s, follow_s, change_s = asyncio.run(run_failover(neighbors, dr_count, router_intervals, router_count // 2, settle_s, timeout_s, check_interval))
+            print(router_count, dr_count, router_intervals.dead_interval / 1000000000, initial_s, takeover_s if not takeover_s is None else '', follow_s if not follow_s is None else '', change_s if not change_s is None else 'frozen', sep = ';')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from queue import Empty
+from OSPF import ManyWayChanel, OSPFIntervals, OSPFMessageType, ChanelTransport, FAST_INTERVALS
+from async_runtime import AsyncRuntime
+from topology import make_topology, make_network
+from convergence_benchmark import CountingChanel
+from db_volume_benchmark import wait_converged
+
+
+class CutPort:
+    # stands in for the chanel of a router and drops what it sends over a cut link, a link is cut both ways
+    def __init__(self, chanel : ManyWayChanel, router_id : int, cut_links : set) -> None:
+        self.chanel = chanel
+        self.router_id = router_id
+        self.cut_links = cut_links
+
+    def cut(self, adress_id : int) -> bool:
+        return (min(self.router_id, adress_id), max(self.router_id, adress_id)) in self.cut_links
+
+    def put(self, msg, block=True):
+        if not self.cut(msg.adress_id):
+            self.chanel.put(msg, block)
+
+    def put_multicast(self, adress_ids, payload, block=True):
+        self.chanel.put_multicast([adress_id for adress_id in adress_ids if not self.cut(adress_id)], payload, block)
+
+    def get(self, adress_id, block=True, timeout = None):
+        return self.chanel.get(adress_id, block, timeout)
+
+
+async def send_flow(router, destination_id : int, send_interval : float, sent : list, stop : asyncio.Event):
+    while not stop.is_set():
+        sent.append(time.time())
+        router.put(destination_id, len(sent) - 1)
+        await asyncio.sleep(send_interval)
+
+
+async def receive_flow(runtime : AsyncRuntime, router, received : set, stop : asyncio.Event):
+    while not stop.is_set():
+        try:
+            received.add(await runtime.get(router, 0.05))
+        except Empty:
+            pass
+
+
+async def run_failure(neighbors : list[list[int]], intervals : OSPFIntervals, send_interval : float, flap_interval : float, flap_count : int, timeout_s : float, check_interval : float):
+    chanel, drs, routers = make_network(neighbors, ChanelTransport.LOCAL, True, chanel_type=CountingChanel, ecmp=False, intervals=intervals)
+    cut_links = set()
+    for router in routers:
+        router.chanel = CutPort(chanel, router.router_id, cut_links)
+    runtime = AsyncRuntime(chanel)
+    for node in drs + routers:
+        runtime.add(node)
+    runtime.start()
+
+    expected = [set(router_neighbors) for router_neighbors in neighbors]
+    await wait_converged(routers, expected, set(), timeout_s, check_interval)
+
+    # DATA from the first router to the last one, the link in the middle of its path fails
+    source_id = 0
+    destination_id = len(routers) - 1
+    path = [source_id]
+    while path[-1] != destination_id:
+        path.append(routers[path[-1]].shortest_paths_first[destination_id])
+    a, b = path[len(path) // 2 - 1], path[len(path) // 2]
+    link = (min(a, b), max(a, b))
+
+    sent = []
+    received = set()
+    stop_sending = asyncio.Event()
+    stop_receiving = asyncio.Event()
+    flows = [asyncio.create_task(send_flow(routers[source_id], destination_id, send_interval, sent, stop_sending)),
+             asyncio.create_task(receive_flow(runtime, routers[destination_id], received, stop_receiving))]
+    await asyncio.sleep(0.3)
+    cut_count = len(sent)
+    cut_links.add(link)
+    expected[a].discard(b)
+    expected[b].discard(a)
+    reconverge_s = await wait_converged(routers, expected, set(), timeout_s, check_interval)
+    await asyncio.sleep(0.3)
+    # the DATA still on its way is not lost
+    stop_sending.set()
+    await asyncio.sleep(0.1)
+    stop_receiving.set()
+    await asyncio.gather(*flows)
+
+    lost = [seq for seq in range(cut_count, len(sent)) if not seq in received]
+    loss_window = 0 if len(lost) == 0 else sent[lost[-1]] - sent[lost[0]] + send_interval
+
+    # the link comes back and then flaps, every change the routers take for real costs LSAs and DB deltas
+    cut_links.discard(link)
+    await asyncio.sleep(1.0)
+    lsa_count = chanel.counts[OSPFMessageType.LSA]
+    delta_count = chanel.counts[OSPFMessageType.DB_DELTA]
+    for i in range(flap_count):
+        cut_links.add(link)
+        await asyncio.sleep(flap_interval)
+        cut_links.discard(link)
+        await asyncio.sleep(flap_interval)
+    flap_lsas = chanel.counts[OSPFMessageType.LSA] - lsa_count
+    flap_deltas = (chanel.counts[OSPFMessageType.DB_DELTA] - delta_count) // len(routers)
+
+    await runtime.stop()
+    return len(lost), loss_window, reconverge_s, flap_lsas, flap_deltas
+
+
+def main():
+    router_count = 49
+    send_interval = 0.005
+    flap_interval = 0.1
+    flap_count = 10
+    timeout_s = 30.0
+    check_interval = 0.01
+    modes = {
+        'default': OSPFIntervals(),
+        'fast': FAST_INTERVALS,
+        'fast without hold down': OSPFIntervals(resend_interval = FAST_INTERVALS.resend_interval, probe_interval = FAST_INTERVALS.probe_interval, lsa_delay = 0),
+    }
+
+    neighbors = make_topology('grid', router_count)
+    print('mode', 'routers', 'lost DATA', 'loss window ms', 'reconvergence ms', 'LSAs while flapping', 'DB versions while flapping', sep = ';')
+    for name, intervals in modes.items():
+        lost, loss_window, reconverge_s, flap_lsas, flap_deltas = asyncio.run(run_failure(neighbors, intervals, send_interval, flap_interval, flap_count, timeout_s, check_interval))
+        print(name, router_count, lost, loss_window * 1000, reconverge_s * 1000 if not reconverge_s is None else '', flap_lsas, flap_deltas, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
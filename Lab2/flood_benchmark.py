@@ -0,0 +1,91 @@
+import pickle
+import time
+from impairments import RandomBlock
+from OSPF import ManyWayChanel, ChanelMessage, OSPFMessage, OSPFMessageType, DBData, DBDeltaData, ChanelTransport
+from topology import make_topology
+
+
+class PickleCount:
+    # counts the objects of type that get pickled, __reduce__ is called once for every one of them
+    def __init__(self, type) -> None:
+        self.type = type
+        self.count = 0
+
+    def __enter__(self):
+        reduce = self.type.__reduce__
+        def counting_reduce(obj):
+            self.count += 1
+            return reduce(obj)
+        self.type.__reduce__ = counting_reduce
+        self.reduce = reduce
+        return self
+
+    def __exit__(self, *args):
+        self.type.__reduce__ = self.reduce
+
+
+def flood(chanel : ManyWayChanel, payload, router_count : int, multicast : bool):
+    # from the DR into the chanel and out to the flying queue of every router
+    if multicast:
+        chanel.put_multicast(range(router_count), payload)
+    else:
+        chanel.put_batch([ChanelMessage(router_id, payload) for router_id in range(router_count)])
+    chanel.schedule(chanel.input_queue.get(True, 1.0))
+
+
+def measure(transport : ChanelTransport, payload, router_count : int, multicast : bool, repeat : int):
+    # payloads are pickled per record in shared memory and per queue item otherwise, a record has to fit
+    # the whole DB, the flood is only timed once per transport after a first run to start the queue feeder,
+    # the chanel pickles here instead of using the wire format as the pickles are what is counted
+    chanel = ManyWayChanel(router_count + 1, 0, 0.0, RandomBlock(), transport, capacity=2 * router_count, record_size=len(pickle.dumps(payload)) + 256, binary=False)
+    flood(chanel, payload, router_count, multicast)
+    chanel.flying_messages.clear()
+    with PickleCount(OSPFMessage) as pickles:
+        start_time = time.perf_counter()
+        for i in range(repeat):
+            flood(chanel, payload, router_count, multicast)
+            chanel.flying_messages.clear()
+        elapsed = (time.perf_counter() - start_time) / repeat
+    chanel.close()
+    return elapsed, pickles.count / repeat
+
+
+def delivered_share(router_count : int, loss_probability : float, repeat : int) -> tuple[float, float]:
+    # every router of a multicast loses its copy on its own, the share that got both of two floods
+    # is the square of the share that got one
+    chanel = ManyWayChanel(router_count + 1, 0, loss_probability, RandomBlock(), ChanelTransport.LOCAL)
+    got = [0 for i in range(router_count)]
+    for i in range(repeat):
+        chanel.put_multicast(range(router_count), OSPFMessage(OSPFMessageType.HELLOW, router_count))
+        chanel.schedule(chanel.input_queue.get())
+        for deliver_time_ns, count, message in chanel.flying_messages:
+            got[message.adress_id] += 1
+        chanel.flying_messages.clear()
+    return sum(got) / (router_count * repeat), sum(count * (count - 1) for count in got) / (router_count * repeat * (repeat - 1))
+
+
+def main():
+    repeat = 20
+    seed = 0
+
+    print('transport', 'routers', 'flood', 'per router ms', 'multicast ms', 'per router pickles', 'multicast pickles', sep = ';')
+    for router_count in [100, 300, 1000]:
+        neighbors = make_topology('grid', router_count, seed)
+        floods = {
+            'DB_DELTA': OSPFMessage(OSPFMessageType.DB_DELTA, router_count, DBDeltaData({router_id: neighbors[router_id] for router_id in range(4)}, 1)),
+            'DB': OSPFMessage(OSPFMessageType.DB, router_count, DBData(neighbors, 1)),
+        }
+        for transport in [ChanelTransport.QUEUE, ChanelTransport.SHARED_MEMORY]:
+            for name, payload in floods.items():
+                batch_s, batch_pickles = measure(transport, payload, router_count, False, repeat)
+                multicast_s, multicast_pickles = measure(transport, payload, router_count, True, repeat)
+                print(transport.name, router_count, name, batch_s * 1000, multicast_s * 1000, batch_pickles, multicast_pickles, sep = ';')
+
+    print('routers', 'loss', 'delivered share', 'share that got two floods', sep = ';')
+    for loss_probability in [0.1, 0.3]:
+        share, both = delivered_share(1000, loss_probability, repeat)
+        print(1000, loss_probability, share, both, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from OSPF import OSPFIntervals, OSPFMessageType, ChanelTransport
+from async_runtime import AsyncRuntime
+from topology import make_topology, make_network
+from convergence_benchmark import CountingChanel
+from db_volume_benchmark import wait_converged
+
+
+CONTROL_TYPES = [OSPFMessageType.LSA, OSPFMessageType.DB, OSPFMessageType.DB_REQUEST, OSPFMessageType.DB_DELTA]
+
+class BusyTime:
+    # sums the time every node spends in process, all nodes share one loop so this is the CPU each of them takes
+    def __init__(self, nodes : list) -> None:
+        self.busy = {}
+        for node in nodes:
+            self.wrap(node)
+
+    def wrap(self, node) -> None:
+        process = node.process
+        self.busy[node.router_id] = 0.0
+        def timed_process():
+            start_time = time.perf_counter()
+            process()
+            self.busy[node.router_id] += time.perf_counter() - start_time
+        node.process = timed_process
+
+
+def control_traffic(chanel : CountingChanel) -> tuple[int, int]:
+    return sum(chanel.counts[message_type] for message_type in CONTROL_TYPES), sum(chanel.sizes[message_type] for message_type in CONTROL_TYPES)
+
+
+async def run_mode(neighbors : list[list[int]], dr_count : int, intervals : OSPFIntervals, failed_id : int, timeout_s : float, check_interval : float):
+    # converges from a cold start and then stops a router, with no DR candidates the routers flood their LSAs
+    chanel, drs, routers = make_network(neighbors, ChanelTransport.LOCAL, True, chanel_type=CountingChanel, intervals=intervals, dr_count=dr_count)
+    busy = BusyTime(drs + routers)
+    runtime = AsyncRuntime(chanel)
+    for node in drs + routers:
+        runtime.add(node)
+    runtime.start()
+
+    expected = [set(router_neighbors) for router_neighbors in neighbors]
+    initial_s = await wait_converged(routers, expected, set(), timeout_s, check_interval)
+    initial_messages, initial_bytes = control_traffic(chanel)
+
+    runtime.stop_node(routers[failed_id])
+    for neighbor_id in neighbors[failed_id]:
+        expected[neighbor_id].discard(failed_id)
+    change_s = await wait_converged(routers, expected, {failed_id}, timeout_s, check_interval)
+    messages, bytes = control_traffic(chanel)
+
+    await runtime.stop()
+    busiest_id = max(busy.busy, key=lambda node_id: busy.busy[node_id])
+    mean_router_s = sum(busy.busy[router.router_id] for router in routers) / len(routers)
+    dr_s = sum(busy.busy[node.router_id] for node in drs) if len(drs) > 0 else None
+    return initial_s, initial_messages, initial_bytes, change_s, messages - initial_messages, bytes - initial_bytes, busiest_id, busy.busy[busiest_id], mean_router_s, dr_s
+
+
+def main():
+    seed = 0
+    timeout_s = 300.0
+    check_interval = 0.05
+    modes = {'DR': 1, 'flooding': 0}
+    # all routers share one loop, while a thousand of them flood their first LSAs it is held up for longer than
+    # the default dead interval and the links flap
+    intervals = {
+        100: OSPFIntervals(),
+        300: OSPFIntervals(),
+        1000: OSPFIntervals(hellow_interval = 1.0 * 1000000000, dead_interval = 4.0 * 1000000000),
+    }
+
+    print('routers', 'mode', 'dead interval s', 'converged s', 'control messages', 'control bytes', 'router failure known s', 'failure control messages', 'failure control bytes', 'busiest node', 'busiest node CPU s', 'mean router CPU s', 'DR CPU s', sep = ';')
+    for router_count, router_intervals in intervals.items():
+        neighbors = make_topology('grid', router_count, seed)
+        for name, dr_count in modes.items():
+            initial_s, initial_messages, initial_bytes, change_s, change_messages, change_bytes, busiest_id, busiest_s, mean_router_s, dr_s = asyncio.run(run_mode(neighbors, dr_count, router_intervals, router_count // 2, timeout_s, check_interval))
+            print(router_count, name, router_intervals.dead_interval / 1000000000, initial_s if not initial_s is None else 'timeout', initial_messages, initial_bytes,
+                  change_s if not change_s is None else 'timeout', change_messages, change_bytes, 'DR' if busiest_id >= router_count else 'router ' + str(busiest_id), busiest_s, mean_router_s, dr_s if not dr_s is None else '', sep = ';')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import time
+from impairments import RandomBlock
+from OSPF import ManyWayChanel, OSPFRouter, OSPFMessage, OSPFMessageType, ChanelMessage, ChanelTransport, DEAD_INTERVAL
+from topology import links_to_neighbors
+
+
+def index_send_data(router : OSPFRouter, message : OSPFMessage):
+    # send_data as it was before the forwarding table, the neighbor slot is looked up on every DATA
+    if (router.shortest_paths is None) or (router.shortest_paths[message.router_id] is None):
+        return
+    if router.ecmp and not message.flow is None:
+        flow_hash = hash((message.flow, router.router_id))
+        hops = router.spf.first_hops(message.router_id)
+        neighbor_id = hops[flow_hash % len(hops)]
+        if router.dead[router.neighbor_ids.index(neighbor_id)]:
+            hops = [neighbor_id for neighbor_id in hops if not router.dead[router.neighbor_ids.index(neighbor_id)]]
+            if len(hops) == 0:
+                return
+            neighbor_id = hops[flow_hash % len(hops)]
+    else:
+        neighbor_id = router.shortest_paths_first[message.router_id]
+        id = router.neighbor_ids.index(neighbor_id)
+        if router.dead[id]:
+            return
+    router.chanel.put(ChanelMessage(neighbor_id, message))
+
+
+def scan_update_dead(router : OSPFRouter):
+    # update_dead as it was, every neighbor with its own clock read on every tick
+    if (router.dr_last_hellow_got is None) or (time.time_ns() >= router.dr_last_hellow_got + DEAD_INTERVAL):
+        router.dr_dead = True
+    else:
+        router.dr_dead = False
+    for id, hellow_got in enumerate(router.last_hellow_got):
+        if (hellow_got is None) or (time.time_ns() >= hellow_got + DEAD_INTERVAL):
+            router.dead[id] = True
+        else:
+            router.dead[id] = False
+
+
+def high_degree(degree : int) -> list[list[int]]:
+    # router 0 is linked to 1..degree, each of them has its own leaf behind it and all of them reach
+    # the last router, so the leaves have one way out of 0 and the last router has degree equal ones
+    hub_id = 2 * degree + 1
+    links = [(0, i) for i in range(1, degree + 1)]
+    links += [(i, degree + i) for i in range(1, degree + 1)]
+    links += [(i, hub_id) for i in range(1, degree + 1)]
+    return links_to_neighbors(hub_id + 1, links)
+
+
+def make_router(neighbors : list[list[int]], ecmp : bool) -> OSPFRouter:
+    # router 0 with the whole topology known and every neighbor alive, nothing else runs
+    chanel = ManyWayChanel(len(neighbors) + 1, 0, 0.0, RandomBlock(), ChanelTransport.LOCAL)
+    router = OSPFRouter(chanel, 0, len(neighbors), neighbors[0], True, None, ecmp)
+    router.topology = list(neighbors)
+    router.update_shortest_paths()
+    for id in range(len(router.neighbor_ids)):
+        router.neighbor_alive(id, time.time_ns())
+    return router
+
+
+def time_per_call(call, arguments : list, repeat : int, drain) -> float:
+    start_time = time.perf_counter()
+    for i in range(repeat):
+        for argument in arguments:
+            call(argument)
+        drain()
+    return (time.perf_counter() - start_time) / (repeat * len(arguments))
+
+
+def measure(degree : int, ecmp : bool, packet_count : int, repeat : int):
+    neighbors = high_degree(degree)
+    router = make_router(neighbors, ecmp)
+    hub_id = len(neighbors) - 1
+    # half of the DATA goes to the leaves, half to the last router, each message is its own flow
+    destinations = [degree + 1 + i % degree if i % 2 == 0 else hub_id for i in range(packet_count)]
+    messages = [OSPFMessage(OSPFMessageType.DATA, destination, None, (1, i)) for i, destination in enumerate(destinations)]
+    drain = router.chanel.input_queue.items.clear
+
+    # the first pass fills the forwarding table and the multipath cache, both are kept until a change
+    time_per_call(router.send_data, messages, 1, drain)
+    index_s = time_per_call(lambda message: index_send_data(router, message), messages, repeat, drain)
+    table_s = time_per_call(router.send_data, messages, repeat, drain)
+
+    ticks = [None] * packet_count
+    scan_s = time_per_call(lambda tick: scan_update_dead(router), ticks, repeat, drain)
+    timers_s = time_per_call(lambda tick: router.fire_timers(time.time_ns()), ticks, repeat, drain)
+    return index_s, table_s, scan_s, timers_s
+
+
+def main():
+    packet_count = 2000
+    repeat = 5
+
+    print('neighbors', 'ecmp', 'index lookup ns/packet', 'forwarding table ns/packet', 'lookup / table', 'scan update_dead ns/tick', 'timers ns/tick', sep = ';')
+    for degree in [4, 32, 256, 1024]:
+        for ecmp in [False, True]:
+            index_s, table_s, scan_s, timers_s = measure(degree, ecmp, packet_count, repeat)
+            print(degree, ecmp, index_s * 1e9, table_s * 1e9, index_s / table_s, scan_s * 1e9, timers_s * 1e9, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import pickle
+import time
+from OSPF import ChanelMessage, OSPFMessage, OSPFMessageType, HELLOW_INTERVAL
+from forwarding_benchmark import high_degree, make_router
+
+
+def per_neighbor_hellow(router, last_hellow_sent : list) -> list:
+    # send_hellow as it was, every neighbor has its own due time and its own message
+    batch = []
+    for id, neighbor_id in enumerate(router.neighbor_ids):
+        if (last_hellow_sent[id] is None) or (time.time_ns() >= last_hellow_sent[id] + HELLOW_INTERVAL):
+            last_hellow_sent[id] = time.time_ns()
+            batch.append(ChanelMessage(neighbor_id, OSPFMessage(OSPFMessageType.HELLOW, router.router_id)))
+    return batch
+
+
+def measure(degree : int, round_count : int, tick_count : int):
+    router = make_router(high_degree(degree), False)
+    chanel = router.chanel
+    queue = chanel.input_queue.items
+
+    # a round is one hellow to every neighbor, from the router into the chanel and out to the flying queue
+    old_s = 0
+    old_bytes = 0
+    for i in range(round_count):
+        start_time = time.perf_counter()
+        batch = per_neighbor_hellow(router, [None] * degree)
+        chanel.put_batch(batch)
+        chanel.schedule(queue.popleft())
+        old_s += time.perf_counter() - start_time
+        old_bytes += len(pickle.dumps(batch, pickle.HIGHEST_PROTOCOL))
+        chanel.flying_messages.clear()
+
+    new_s = 0
+    new_bytes = 0
+    for i in range(round_count):
+        start_time = time.perf_counter()
+        router.send_hellow(router.intervals.hellow_interval, time.time_ns())
+        items = queue.popleft()
+        chanel.schedule(items)
+        new_s += time.perf_counter() - start_time
+        new_bytes += len(pickle.dumps(items, pickle.HIGHEST_PROTOCOL))
+        chanel.flying_messages.clear()
+
+    # a tick with no hellow due, the old loop still looks at every neighbor
+    last_hellow_sent = [time.time_ns() for i in range(degree)]
+    start_time = time.perf_counter()
+    for i in range(tick_count):
+        per_neighbor_hellow(router, last_hellow_sent)
+    old_tick_s = (time.perf_counter() - start_time) / tick_count
+    start_time = time.perf_counter()
+    for i in range(tick_count):
+        router.fire_timers(time.time_ns())
+    new_tick_s = (time.perf_counter() - start_time) / tick_count
+    return old_s / round_count, new_s / round_count, old_bytes / round_count, new_bytes / round_count, old_tick_s, new_tick_s
+
+
+def main():
+    round_count = 200
+    tick_count = 2000
+
+    print('neighbors', 'per neighbor round us', 'multicast round us', 'per neighbor bytes', 'multicast bytes', 'per neighbor idle tick us', 'timers idle tick us', sep = ';')
+    for degree in [4, 32, 256, 1024]:
+        old_s, new_s, old_bytes, new_bytes, old_tick_s, new_tick_s = measure(degree, round_count, tick_count)
+        print(degree, old_s * 1e6, new_s * 1e6, old_bytes, new_bytes, old_tick_s * 1e6, new_tick_s * 1e6, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import os
+import time
+import numpy as np
+from multiprocessing import Process, Event
+from queue import Empty
+from impairments import RandomBlock
+from OSPF import ManyWayChanel, OSPFDesignatedRouter, OSPFRouter, repeat_until, CHANEL_IDLE_WAIT_NS
+
+
+def cpu_seconds(pids : list[int]) -> float:
+    # utime and stime of running processes, getrusage only counts children that already exited
+    ticks = 0
+    for pid in pids:
+        with open(f'/proc/{pid}/stat') as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+        ticks += int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+def measure(event_driven : bool, ping_count : int, idle_s : float, converge_timeout_s : float = 10.0):
+    # the topology of OSPF.main: DR 7, routers 0 and 1 reach each other through any of 2..6
+    stop = Event()
+    chanel = ManyWayChanel(8, 0, 0.0, RandomBlock())
+    dr = OSPFDesignatedRouter(chanel, 7, event_driven)
+    routers = [OSPFRouter(chanel, router_id, 7, [2, 3, 4, 5, 6], event_driven) for router_id in [0, 1]]
+    routers += [OSPFRouter(chanel, router_id, 7, [0, 1], event_driven) for router_id in [2, 3, 4, 5, 6]]
+    threads = [Process(target=repeat_until, args=(node.process, stop)) for node in [chanel, dr] + routers]
+    for thread in threads:
+        thread.start()
+
+    # data is only forwarded once the routers got the DB, until then pings are dropped
+    start_time = time.time()
+    converged = False
+    while not converged and time.time() - start_time < converge_timeout_s:
+        routers[0].put(1, None)
+        try:
+            routers[1].get(True, 0.1)
+            converged = True
+        except Empty:
+            pass
+    convergence_s = time.time() - start_time
+
+    latencies = []
+    for index in range(ping_count):
+        start_time_ns = time.time_ns()
+        routers[0].put(1, index)
+        try:
+            while routers[1].get(True, CHANEL_IDLE_WAIT_NS / 1000000000 * 10) != index:
+                pass
+            latencies.append(time.time_ns() - start_time_ns)
+        except Empty:
+            pass
+
+    pids = [thread.pid for thread in threads]
+    cpu_start = cpu_seconds(pids)
+    time.sleep(idle_s)
+    idle_cpu = (cpu_seconds(pids) - cpu_start) / idle_s
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return convergence_s, np.array(latencies) / 1000000, idle_cpu
+
+
+def main():
+    ping_count = 200
+    idle_s = 2.0
+
+    print('mode', 'convergence s', 'delivered', 'latency mean ms', 'latency p50 ms', 'latency p99 ms', 'idle cpu share', sep = ';')
+    for name, event_driven in [('spin', False), ('event driven', True)]:
+        convergence_s, latencies, idle_cpu = measure(event_driven, ping_count, idle_s)
+        print(name, convergence_s, len(latencies), latencies.mean(), np.percentile(latencies, 50), np.percentile(latencies, 99), idle_cpu, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from multiprocessing import Process, Event
+from queue import Empty
+from impairments import RandomBlock
+from OSPF import ManyWayChanel, OSPFDesignatedRouter, OSPFRouter, ChanelTransport, repeat_until
+from async_runtime import AsyncRuntime
+
+
+def make_network(router_count : int, transport : ChanelTransport, event_driven : bool):
+    # the topology of OSPF.main grown to router_count: routers 0 and 1 reach each other through any of
+    # the routers 2.. router_count - 1, the DR takes the last adress
+    dr_id = router_count
+    chanel = ManyWayChanel(router_count + 1, 0, 0.0, RandomBlock(), transport)
+    dr = OSPFDesignatedRouter(chanel, dr_id, event_driven)
+    middle_ids = list(range(2, router_count))
+    routers = [OSPFRouter(chanel, router_id, dr_id, middle_ids, event_driven) for router_id in [0, 1]]
+    routers += [OSPFRouter(chanel, router_id, dr_id, [0, 1], event_driven) for router_id in middle_ids]
+    return chanel, dr, routers
+
+
+def measure_processes(router_count : int, data_count : int, burst : int, converge_timeout_s : float = 30.0):
+    start_time = time.time()
+    stop = Event()
+    chanel, dr, routers = make_network(router_count, ChanelTransport.QUEUE, True)
+    threads = [Process(target=repeat_until, args=(node.process, stop)) for node in [chanel, dr] + routers]
+    for thread in threads:
+        thread.start()
+    setup_s = time.time() - start_time
+
+    # data is only forwarded once the routers got the DB, until then it is dropped
+    converged = False
+    while not converged and time.time() - start_time < converge_timeout_s:
+        routers[0].put(1, None)
+        try:
+            routers[1].get(True, 0.1)
+            converged = True
+        except Empty:
+            pass
+    convergence_s = time.time() - start_time
+    while True:
+        try:
+            routers[1].get(False)
+        except Empty:
+            break
+
+    delivered = 0
+    data_start = time.time()
+    for burst_start in range(0, data_count, burst):
+        burst_end = min(burst_start + burst, data_count)
+        for index in range(burst_start, burst_end):
+            routers[0].put(1, index)
+        try:
+            for index in range(burst_start, burst_end):
+                routers[1].get(True, 1.0)
+                delivered += 1
+        except Empty:
+            pass
+    data_s = time.time() - data_start
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    chanel.close()
+    return setup_s, convergence_s, delivered, delivered / data_s, time.time() - start_time
+
+
+async def run_async(router_count : int, data_count : int, burst : int, converge_timeout_s : float):
+    start_time = time.time()
+    chanel, dr, routers = make_network(router_count, ChanelTransport.LOCAL, True)
+    runtime = AsyncRuntime(chanel)
+    for node in [dr] + routers:
+        runtime.add(node)
+    runtime.start()
+    setup_s = time.time() - start_time
+
+    converged = False
+    while not converged and time.time() - start_time < converge_timeout_s:
+        routers[0].put(1, None)
+        try:
+            await runtime.get(routers[1], 0.1)
+            converged = True
+        except Empty:
+            pass
+    convergence_s = time.time() - start_time
+    while True:
+        try:
+            routers[1].get(False)
+        except Empty:
+            break
+
+    delivered = 0
+    chanel_start = chanel.flying_count
+    data_start = time.time()
+    for burst_start in range(0, data_count, burst):
+        burst_end = min(burst_start + burst, data_count)
+        for index in range(burst_start, burst_end):
+            routers[0].put(1, index)
+        try:
+            for index in range(burst_start, burst_end):
+                await runtime.get(routers[1], 1.0)
+                delivered += 1
+        except Empty:
+            pass
+    data_s = time.time() - data_start
+    chanel_rate = (chanel.flying_count - chanel_start) / data_s
+
+    await runtime.stop()
+    return setup_s, convergence_s, delivered, delivered / data_s, time.time() - start_time, chanel_rate
+
+
+def measure_async(router_count : int, data_count : int, burst : int, converge_timeout_s : float = 30.0):
+    return asyncio.run(run_async(router_count, data_count, burst, converge_timeout_s))
+
+
+def main():
+    data_count = 5000
+    burst = 100
+
+    # every process of the multiprocessing runtime is event driven, spinning ones would starve each other
+    print('runtime', 'routers', 'setup s', 'convergence s', 'delivered', 'data messages/s', 'chanel messages/s', 'total s', sep = ';')
+    for router_count in [8, 32]:
+        setup_s, convergence_s, delivered, rate, total_s = measure_processes(router_count, data_count, burst)
+        print('processes', router_count, setup_s, convergence_s, delivered, rate, '', total_s, sep = ';')
+    for router_count in [8, 32, 128, 512]:
+        setup_s, convergence_s, delivered, rate, total_s, chanel_rate = measure_async(router_count, data_count, burst)
+        print('asyncio', router_count, setup_s, convergence_s, delivered, rate, chanel_rate, total_s, sep = ';')
+
+
+if __name__ == '__main__':
+    main()
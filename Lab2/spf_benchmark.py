@@ -0,0 +1,129 @@
+import time
+import numpy as np
+from queue import Queue as SimpleQueue
+from OSPF import ShortestPathTree
+from topology import make_topology, link_count, weighted
+
+
+def bfs_shortest_paths(topology : list, root : int):
+    # the search OSPFRouter used to run on every DB: a BFS and then a walk back to root from every router
+    shortest_paths = [None for i in range(len(topology))]
+    pending = SimpleQueue()
+    pending.put(root)
+    visited = {root}
+    shortest_paths[root] = root
+    while not pending.empty():
+        cur_id = pending.get()
+        for node_id in topology[cur_id]:
+            if node_id in visited:
+                continue
+            visited.add(node_id)
+            pending.put(node_id)
+            shortest_paths[node_id] = cur_id
+    shortest_paths_first = [None for i in range(len(topology))]
+    for node_id in range(len(topology)):
+        prev = shortest_paths[node_id]
+        if prev is None:
+            continue
+        shortest_paths_first[node_id] = node_id
+        while prev != root:
+            shortest_paths_first[node_id] = prev
+            prev = shortest_paths[prev]
+    return shortest_paths, shortest_paths_first
+
+
+def make_flaps(neighbors : list[list[int]], flap_count : int, rng) -> list:
+    # a flap takes a link down and brings it back, both of its routers send a new entry each time
+    links = [(a, b) for a, router_neighbors in enumerate(neighbors) for b in router_neighbors if a < b]
+    return [links[i] for i in rng.integers(len(links), size=flap_count)]
+
+
+def flap_changes(topology : list, a : int, b : int, down : bool) -> dict:
+    changes = {a: topology[a], b: topology[b]}
+    if down:
+        topology[a] = [neighbor_id for neighbor_id in topology[a] if neighbor_id != b]
+        topology[b] = [neighbor_id for neighbor_id in topology[b] if neighbor_id != a]
+    else:
+        topology[a] = sorted(topology[a] + [b])
+        topology[b] = sorted(topology[b] + [a])
+    return changes
+
+
+def measure(neighbors : list[list[int]], flap_count : int, seed = 0, check : bool = True):
+    rng = np.random.default_rng(seed)
+    topology = list(neighbors)
+    root = 0
+
+    start_time = time.time()
+    bfs_shortest_paths(topology, root)
+    bfs_s = time.time() - start_time
+
+    tree = ShortestPathTree(root, len(topology))
+    start_time = time.time()
+    tree.build(topology)
+    build_s = time.time() - start_time
+
+    incremental_s = 0
+    mismatches = 0
+    for a, b in make_flaps(neighbors, flap_count, rng):
+        for down in [True, False]:
+            changes = flap_changes(topology, a, b, down)
+            start_time = time.time()
+            tree.update(changes)
+            incremental_s += time.time() - start_time
+            if check:
+                full = ShortestPathTree(root, len(topology))
+                full.build(list(topology))
+                mismatches += full.distances != tree.distances
+    updates = 2 * flap_count
+    return bfs_s, build_s, incremental_s / updates, mismatches
+
+
+def measure_weighted(neighbors : list[list[int]], flap_count : int, seed = 0, check : bool = True):
+    rng = np.random.default_rng(seed)
+    topology = weighted(neighbors, rng)
+    root = 0
+
+    tree = ShortestPathTree(root, len(topology))
+    start_time = time.time()
+    tree.build(topology)
+    build_s = time.time() - start_time
+
+    incremental_s = 0
+    mismatches = 0
+    for a, b in make_flaps(neighbors, flap_count, rng):
+        # the link cost goes up tenfold and back, entries are replaced and not changed in place
+        for up in [True, False]:
+            changes = {a: topology[a], b: topology[b]}
+            cost = topology[a][b] * 10 if up else topology[a][b] // 10
+            topology[a] = dict(topology[a])
+            topology[b] = dict(topology[b])
+            topology[a][b] = cost
+            topology[b][a] = cost
+            start_time = time.time()
+            tree.update(changes)
+            incremental_s += time.time() - start_time
+            if check:
+                full = ShortestPathTree(root, len(topology))
+                full.build(list(topology))
+                mismatches += full.distances != tree.distances
+    return build_s, incremental_s / (2 * flap_count), mismatches
+
+
+def main():
+    flap_count = 100
+    seed = 0
+
+    print('topology', 'routers', 'links', 'BFS and walk back ms', 'full Dijkstra ms', 'incremental update ms', 'BFS / incremental', 'mismatches', 'weighted full ms', 'weighted incremental ms', 'weighted mismatches', sep = ';')
+    for name in ['grid', 'random geometric', 'scale free']:
+        for router_count in [1000, 3000, 10000]:
+            neighbors = make_topology(name, router_count, seed)
+            check = router_count <= 3000
+            bfs_s, build_s, incremental_s, mismatches = measure(neighbors, flap_count, seed, check)
+            weighted_build_s, weighted_incremental_s, weighted_mismatches = measure_weighted(neighbors, flap_count, seed, check)
+            print(name, router_count, link_count(neighbors), bfs_s * 1000, build_s * 1000, incremental_s * 1000, bfs_s / incremental_s,
+                  mismatches if check else '', weighted_build_s * 1000, weighted_incremental_s * 1000, weighted_mismatches if check else '', sep = ';')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import os
+
+
+def test_impairments_match_lab1():
+    lab2 = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(lab2, 'impairments.py')) as lab2_module, open(os.path.join(lab2, '..', 'Lab1', 'impairments.py')) as lab1_module:
+        assert lab2_module.read() == lab1_module.read()
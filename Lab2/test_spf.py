@@ -0,0 +1,103 @@
+import math
+import random
+import pytest
+from impairments import RandomBlock
+from OSPF import ShortestPathTree, OSPFRouter, ManyWayChanel, ChanelTransport, check_cost, link_items
+
+
+def distances_from(topology : list, root : int, skip_id : int = None) -> list:
+    # Bellman-Ford, slow but with nothing in common with the tree, paths through skip_id are left out
+    distances = [math.inf] * len(topology)
+    distances[root] = 0
+    for i in range(len(topology)):
+        for node_id, entry in enumerate(topology):
+            if node_id == skip_id:
+                continue
+            for neighbor_id, cost in link_items(entry):
+                distances[neighbor_id] = min(distances[neighbor_id], distances[node_id] + cost)
+    return distances
+
+
+def expected_first_hops(topology : list, root : int, node_id : int) -> list:
+    # a neighbor of the root is a first hop when a shortest path to node_id goes through it and not back
+    # through the root, which a link of cost 0 would make just as short
+    distance = distances_from(topology, root)[node_id]
+    if node_id == root or distance == math.inf:
+        return []
+    return sorted(hop for hop, cost in link_items(topology[root]) if cost + distances_from(topology, hop, root)[node_id] == distance)
+
+
+def check_tree(topology : list, root : int) -> None:
+    tree = ShortestPathTree(root, len(topology))
+    tree.build(topology)
+    for node_id in range(len(topology)):
+        assert tree.first_hops(node_id) == expected_first_hops(topology, root, node_id)
+
+
+def test_first_hops_of_root():
+    tree = ShortestPathTree(0, 3)
+    tree.build([[1], [0, 2], [1]])
+    assert tree.first_hops(0) == []
+    tree.build([{1: 2}, {0: 2, 2: 1}, {1: 1}])
+    assert tree.first_hops(0) == []
+
+
+def test_first_hops_with_zero_cost_ties():
+    check_tree([{1: 1, 2: 1}, {0: 1, 3: 0, 2: 0}, {0: 1, 1: 0, 3: 1}, {1: 0, 2: 1}], 0)
+
+
+def test_first_hops_with_zero_cost_loop():
+    # 2, 3 and 4 are one router as far as distances go, every one of them is reached by both first hops
+    topology = [{1: 1, 5: 1}, {0: 1, 2: 1}, {1: 1, 3: 0}, {2: 0, 4: 0}, {3: 0, 2: 0, 5: 1}, {0: 1, 4: 1}]
+    topology[2][4] = 0
+    check_tree(topology, 0)
+
+
+def test_first_hops_of_random_topologies():
+    rand = random.Random(0)
+    for i in range(200):
+        size = rand.randint(2, 8)
+        topology = [{} for node_id in range(size)]
+        for a in range(size):
+            for b in range(a + 1, size):
+                if rand.random() < 0.4:
+                    topology[a][b] = topology[b][a] = rand.choice([0, 0, 1, 2])
+        check_tree(topology, rand.randrange(size))
+
+
+def test_first_hops_after_update():
+    rand = random.Random(1)
+    for i in range(100):
+        size = rand.randint(3, 8)
+        topology = [{} for node_id in range(size)]
+        for a in range(size):
+            for b in range(a + 1, size):
+                if rand.random() < 0.5:
+                    topology[a][b] = topology[b][a] = rand.choice([0, 1, 2])
+        tree = ShortestPathTree(0, size)
+        tree.build(topology)
+        tree.first_hops(size - 1)
+        # one router changes the costs of its links or drops them, the others still list them
+        node_id = rand.randrange(size)
+        old_entry = topology[node_id]
+        topology[node_id] = {neighbor_id: rand.choice([0, 1, 2]) for neighbor_id in old_entry if rand.random() < 0.7}
+        tree.update({node_id: old_entry})
+        for target_id in range(size):
+            assert tree.first_hops(target_id) == expected_first_hops(topology, 0, target_id)
+
+
+def test_check_cost():
+    assert [check_cost(cost) for cost in [0, 1, 2.0]] == [0, 1, 2]
+    for cost in [1.5, -1]:
+        with pytest.raises(ValueError):
+            check_cost(cost)
+
+
+def test_routes_over_zero_cost_links():
+    topology = [{1: 1, 2: 1}, {0: 1, 3: 0, 2: 0}, {0: 1, 1: 0, 3: 1}, {1: 0, 2: 1}]
+    chanel = ManyWayChanel(5, 0, 0.0, RandomBlock(), ChanelTransport.LOCAL)
+    router = OSPFRouter(chanel, 1, 4, list(topology[1]), True, list(topology[1].values()))
+    router.topology = topology
+    router.update_shortest_paths()
+    # the neighbor slots of 0, 3 and 2, no way out to the router itself
+    assert [router.compile_route(router_id) for router_id in range(4)] == [(0, 2), (), (2,), (1,)]
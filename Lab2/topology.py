@@ -0,0 +1,117 @@
+import numpy as np
+from OSPF import ManyWayChanel, OSPFDesignatedRouter, OSPFRouter, OSPFFloodingRouter, OSPFIntervals, ChanelTransport
+from impairments import RandomBlock
+
+
+# every generator returns the neighbor ids of every router, links go both ways
+
+
+def links_to_neighbors(router_count : int, links) -> list[list[int]]:
+    neighbors = [set() for i in range(router_count)]
+    for a, b in links:
+        if a != b:
+            neighbors[a].add(int(b))
+            neighbors[b].add(int(a))
+    return [sorted(router_neighbors) for router_neighbors in neighbors]
+
+def ring(router_count : int) -> list[list[int]]:
+    return links_to_neighbors(router_count, [(i, (i + 1) % router_count) for i in range(router_count)])
+
+def grid(router_count : int, width : int = None) -> list[list[int]]:
+    # rows of width routers, the last row may be short
+    width = width if not width is None else int(np.ceil(np.sqrt(router_count)))
+    links = []
+    for i in range(router_count):
+        if (i + 1) % width != 0 and i + 1 < router_count:
+            links.append((i, i + 1))
+        if i + width < router_count:
+            links.append((i, i + width))
+    return links_to_neighbors(router_count, links)
+
+def random_geometric(router_count : int, radius = None, rng = None) -> list[list[int]]:
+    # routers are points in the unit square, linked when closer than radius,
+    # the default radius is a bit above the one that makes the graph connected
+    rng = rng if not rng is None else np.random.default_rng()
+    radius = radius if not radius is None else 1.5 * np.sqrt(np.log(router_count) / (np.pi * router_count))
+    points = rng.random((router_count, 2))
+    links = []
+    for i in range(router_count):
+        distances = np.hypot(*(points[i + 1:] - points[i]).T)
+        links += [(i, j) for j in np.nonzero(distances < radius)[0] + i + 1]
+    return links_to_neighbors(router_count, links)
+
+def erdos_renyi(router_count : int, link_probability = None, rng = None) -> list[list[int]]:
+    # every pair is linked independently, the default probability gives about 2 ln(n) links per router
+    rng = rng if not rng is None else np.random.default_rng()
+    link_probability = link_probability if not link_probability is None else min(1.0, 2 * np.log(router_count) / router_count)
+    links = []
+    for i in range(router_count):
+        links += [(i, j) for j in np.nonzero(rng.random(router_count - i - 1) < link_probability)[0] + i + 1]
+    return links_to_neighbors(router_count, links)
+
+def scale_free(router_count : int, links_per_router : int = 2, rng = None) -> list[list[int]]:
+    # Barabasi-Albert, every new router links to links_per_router routers picked by their degree
+    rng = rng if not rng is None else np.random.default_rng()
+    links = [(i, j) for i in range(links_per_router + 1) for j in range(i + 1, links_per_router + 1)]
+    # every router is in ends once per link, so a uniform pick from it is a pick by degree
+    ends = [router_id for link in links for router_id in link]
+    for router_id in range(links_per_router + 1, router_count):
+        targets = set()
+        while len(targets) < links_per_router:
+            targets.add(ends[rng.integers(len(ends))])
+        for target in targets:
+            links.append((router_id, target))
+            ends += [router_id, target]
+    return links_to_neighbors(router_count, links)
+
+def parallel_paths(pair_count : int, path_count : int) -> list[list[int]]:
+    # pair_count sources 0.. and as many destinations after them, every source and every destination
+    # is linked to each of the path_count routers in the middle, so every pair has path_count equal paths
+    middle_ids = range(2 * pair_count, 2 * pair_count + path_count)
+    return links_to_neighbors(2 * pair_count + path_count, [(i, j) for i in range(2 * pair_count) for j in middle_ids])
+
+TOPOLOGIES = {
+    'ring': ring,
+    'grid': grid,
+    'random geometric': random_geometric,
+    'erdos renyi': erdos_renyi,
+    'scale free': scale_free,
+}
+
+def make_topology(name : str, router_count : int, seed = None) -> list[list[int]]:
+    if name in ['ring', 'grid']:
+        return TOPOLOGIES[name](router_count)
+    return TOPOLOGIES[name](router_count, rng=np.random.default_rng(seed))
+
+def link_count(neighbors : list[list[int]]) -> int:
+    return sum(len(router_neighbors) for router_neighbors in neighbors) // 2
+
+def weighted(neighbors : list[list[int]], rng = None, max_cost : int = 10) -> list[dict]:
+    # the same links with a random cost from 1 to max_cost, equal both ways
+    rng = rng if not rng is None else np.random.default_rng()
+    costs = {}
+    for a, router_neighbors in enumerate(neighbors):
+        for b in router_neighbors:
+            costs.setdefault((min(a, b), max(a, b)), int(rng.integers(1, max_cost + 1)))
+    return [{b: costs[(min(a, b), max(a, b))] for b in router_neighbors} for a, router_neighbors in enumerate(neighbors)]
+
+
+def make_routers(chanel : ManyWayChanel, neighbors : list, event_driven : bool = False, ecmp : bool = True, intervals : OSPFIntervals = None, dr_count : int = 1):
+    # the DR takes the adress after the last router, a dict of neighbor id to cost gives the links their costs,
+    # the DR candidates come in the order of their priority, the first one is the DR and the others its backups,
+    # with none the routers flood their LSAs to each other and the list is empty
+    dr_ids = list(range(len(neighbors), len(neighbors) + dr_count))
+    drs = [OSPFDesignatedRouter(chanel, dr_id, event_driven, intervals, dr_ids, dr_count - i) for i, dr_id in enumerate(dr_ids)]
+    routers = []
+    for router_id, router_neighbors in enumerate(neighbors):
+        costs = list(router_neighbors.values()) if isinstance(router_neighbors, dict) else None
+        if dr_count == 0:
+            routers.append(OSPFFloodingRouter(chanel, router_id, list(router_neighbors), event_driven, costs, ecmp, intervals))
+        else:
+            routers.append(OSPFRouter(chanel, router_id, dr_ids[0], list(router_neighbors), event_driven, costs, ecmp, intervals, None, dr_ids))
+    return drs, routers
+
+def make_network(neighbors : list, transport : ChanelTransport = ChanelTransport.QUEUE, event_driven : bool = False, time_to_pass_ns : int = 0, loss_probability = 0.0, rand = None, chanel_type = ManyWayChanel, ecmp : bool = True, impairments : list = None, intervals : OSPFIntervals = None, dr_count : int = 1):
+    chanel = chanel_type(len(neighbors) + dr_count, time_to_pass_ns, loss_probability, rand if not rand is None else RandomBlock(), transport, impairments=impairments)
+    drs, routers = make_routers(chanel, neighbors, event_driven, ecmp, intervals, dr_count)
+    return chanel, drs, routers
@@ -0,0 +1,110 @@
+import pickle
+import time
+import numpy as np
+from multiprocessing import Process, Event
+from impairments import RandomBlock
+from OSPF import (ManyWayChanel, ChanelMessage, ChanelMulticast, OSPFMessage, OSPFMessageType, LSAData, DBData, DBDeltaData, DRHellowData,
+                  SelectiveRepeatMessage, SelectiveRepeatMessageType, ChanelTransport, encode_record, decode_record, decode_delivered, repeat_until)
+from topology import make_topology, weighted
+
+
+def make_messages(seed : int) -> dict:
+    # one of every kind the routers send, the DBs are of grid networks and of a dense one that goes as a bitmap
+    rand = np.random.default_rng(seed)
+    grid = make_topology('grid', 100, seed)
+    large_grid = make_topology('grid', 1000, seed)
+    dense = [sorted(int(neighbor_id) for neighbor_id in rand.choice([id for id in range(100) if id != router_id], 60, replace=False)) for router_id in range(100)]
+    lsas = [LSAData(router_neighbors, time.time_ns(), None, router_id) for router_id, router_neighbors in enumerate(grid[:20])]
+    data = SelectiveRepeatMessage(SelectiveRepeatMessageType.DATA, 1234)
+    return {
+        'HELLOW': ChanelMessage(7, OSPFMessage(OSPFMessageType.HELLOW, 3)),
+        'HELLOW multicast 4': ChanelMulticast([2, 4, 13, 23], OSPFMessage(OSPFMessageType.HELLOW, 3)),
+        'DR HELLOW': ChanelMessage(101, OSPFMessage(OSPFMessageType.HELLOW, 100, DRHellowData(2, True, 77))),
+        'LSA': ChanelMessage(100, OSPFMessage(OSPFMessageType.LSA, 3, LSAData([2, 4, 13, 23], time.time_ns()))),
+        'LSA with costs': ChanelMessage(100, OSPFMessage(OSPFMessageType.LSA, 3, LSAData([2, 4, 13, 23], time.time_ns(), [3, 1, 7, 2]))),
+        'LSA list 20': ChanelMulticast([2, 4, 13, 23], OSPFMessage(OSPFMessageType.LSA, 3, lsas)),
+        'DB grid 100': ChanelMulticast(range(100), OSPFMessage(OSPFMessageType.DB, 100, DBData(grid, 5))),
+        'DB weighted grid 100': ChanelMulticast(range(100), OSPFMessage(OSPFMessageType.DB, 100, DBData(weighted(grid, rand), 5))),
+        'DB grid 1000': ChanelMulticast(range(1000), OSPFMessage(OSPFMessageType.DB, 1000, DBData(large_grid, 5))),
+        'DB dense 100': ChanelMulticast(range(100), OSPFMessage(OSPFMessageType.DB, 100, DBData(dense, 5))),
+        'DB_DELTA': ChanelMulticast(range(100), OSPFMessage(OSPFMessageType.DB_DELTA, 100, DBDeltaData({12: grid[12], 13: grid[13]}, 6))),
+        'DB_REQUEST': ChanelMessage(100, OSPFMessage(OSPFMessageType.DB_REQUEST, 3)),
+        'DATA': ChanelMessage(9, OSPFMessage(OSPFMessageType.DATA, 3, data, (3, 0))),
+        'DATA int': ChanelMessage(9, OSPFMessage(OSPFMessageType.DATA, 3, 1234)),
+    }
+
+
+def per_call(work, repeat : int) -> float:
+    start_time = time.perf_counter()
+    for i in range(repeat):
+        work()
+    return (time.perf_counter() - start_time) / repeat
+
+
+def measure_codec(message, repeat : int):
+    # a message is encoded by its router, the chanel only reads the header, and it is encoded again and decoded
+    # whole by the router it goes to, a pickle is loaded whole both times
+    record = encode_record(message)
+    header = decode_record(memoryview(record))
+    delivered = header.messages()[0] if isinstance(header, ChanelMulticast) else header
+    delivered_record = encode_record(delivered)
+    pickled = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+
+    binary_s = [
+        per_call(lambda: encode_record(message), repeat),
+        per_call(lambda: decode_record(memoryview(record)), repeat),
+        per_call(lambda: encode_record(delivered), repeat),
+        per_call(lambda: decode_delivered(memoryview(delivered_record)), repeat),
+    ]
+    pickle_s = [
+        per_call(lambda: pickle.dumps(message, pickle.HIGHEST_PROTOCOL), repeat),
+        per_call(lambda: pickle.loads(pickled), repeat),
+    ]
+    return len(record), len(pickled), binary_s, pickle_s
+
+
+def produce(put_batch, message_count : int, batch_size : int) -> None:
+    for start in range(0, message_count, batch_size):
+        put_batch([ChanelMessage(1, OSPFMessage(OSPFMessageType.DATA, 0, SelectiveRepeatMessage(SelectiveRepeatMessageType.DATA, pos), (0, 1)))
+                   for pos in range(start, min(start + batch_size, message_count))])
+
+
+def measure_chanel(message_count : int, batch_size : int, transport : ChanelTransport, binary : bool) -> float:
+    chanelStoped = Event()
+    chanel = ManyWayChanel(2, 0, 0.0, RandomBlock(), transport, binary=binary)
+    producerThread = Process(target=produce, args=(chanel.put_batch, message_count, batch_size))
+    chanelThread = Process(target=repeat_until, args=(chanel.process, chanelStoped))
+
+    start_time = time.perf_counter()
+    chanelThread.start()
+    producerThread.start()
+    for i in range(message_count):
+        chanel.get(1)
+    elapsed = time.perf_counter() - start_time
+
+    chanelStoped.set()
+    producerThread.join()
+    chanelThread.join()
+    chanel.close()
+    return message_count / elapsed
+
+
+def main():
+    seed = 0
+    repeat = 200
+    message_count = 50000
+    batch_size = 64
+
+    print('message', 'binary bytes', 'pickle bytes', 'binary encode us', 'chanel header decode us', 'delivered encode us', 'delivered decode us', 'pickle dumps us', 'pickle loads us', sep = ';')
+    for name, message in make_messages(seed).items():
+        binary_bytes, pickle_bytes, binary_s, pickle_s = measure_codec(message, repeat)
+        print(name, binary_bytes, pickle_bytes, *[s * 1e6 for s in binary_s], *[s * 1e6 for s in pickle_s], sep = ';')
+
+    print()
+    print('transport', 'binary DATA/s', 'pickle DATA/s', sep = ';')
+    for transport in [ChanelTransport.QUEUE, ChanelTransport.SHARED_MEMORY]:
+        print(transport.name, measure_chanel(message_count, batch_size, transport, True), measure_chanel(message_count, batch_size, transport, False), sep = ';')
+
+
+if __name__ == '__main__':
+    main()